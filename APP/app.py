@@ -1,14 +1,19 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import duckdb
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from utils import (
     format_number,
     create_scatter_plot,
     create_bar_chart,
     create_line_chart,
+    create_box_from_stats,
+    create_prebinned_histogram,
     categorize_performance,
     create_comparison_selector,
     section_card,
@@ -16,9 +21,48 @@ from utils import (
     create_comparison_suggestions,
     clean_numeric_column
 )
+from query_cache import QueryCache
+from db import DEFAULT_POOL_SIZE, ConnectionPool, PoolClosedError, run_batch
+from fragments import fragment_timings, timed_fragment
+from instrumentation import (
+    begin_run, explain_analyze, note_execution, record_event, run_events,
+    set_log_path, set_result, track_query,
+)
+from arrow_utils import create_arrow_line_chart, fetch_arrow, filter_isin
+from downsampling import DEFAULT_MAX_POINTS, downsample_frame
+from catalog import load_catalog
+from kpi_registry import kpi_query, run_kpi, validate_registry
+from distribution import box_outliers, box_stats, histogram_bins
+from queries import (
+    HOLIDAY_IMPACT_TOP_K, connect_parquet, ev_where,
+    walmart_fused_queries, walmart_split_frames, walmart_store_metrics_queries, walmart_where,
+)
+from lazy_imports import lazy_import
+from figure_cache import CachedExpress, figure_cache
+
+# Plotly n'est importé qu'au premier graphique : au démarrage à froid, la barre latérale
+# et les cartes KPI s'affichent avant le chargement des bibliothèques de graphiques
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
+# Mêmes graphiques que px, construits une seule fois par données / options (cache partagé entre sessions)
+cpx = CachedExpress()
 
 # Get the parent directory of APP folder to access data
-DB_PATH = "data/project.db"
+# (KPI_DB_PATH : autre base, ex. données synthétiques de sql/generate_data.py)
+DB_PATH = os.environ.get("KPI_DB_PATH", "data/project.db")
+# Export Parquet (python sql/duckdb_loader.py ... --parquet)
+PARQUET_DIR = "data/parquet"
+PARQUET_MARKER = os.path.join(PARQUET_DIR, "_export.json")
+DATA_SOURCES = {"duckdb": f"DuckDB ({os.path.basename(DB_PATH)})", "parquet": "Parquet (data/parquet)"}
+# Nombre de curseurs DuckDB partagés par toutes les sessions (défaut : un par cœur)
+POOL_SIZE = int(os.environ.get("KPI_POOL_SIZE", DEFAULT_POOL_SIZE))
+# Journal JSON lines des requêtes / sections (KPI_PERF_LOG="" pour le désactiver)
+PERF_LOG_PATH = os.environ.get("KPI_PERF_LOG", "logs/perf.jsonl")
+# Rafraîchissement du panneau Performance (secondes) : les reruns d'un seul onglet y apparaissent
+PERF_PANEL_REFRESH_S = 2
+
+run_start = time.perf_counter()
+set_log_path(PERF_LOG_PATH)
 
 # ---------------------------
 # Page config
@@ -150,15 +194,105 @@ st.markdown(
 # ---------------------------
 # DuckDB helpers
 # ---------------------------
-@st.cache_resource
-def get_con():
+def _source_version(source: str):
+    # Un nouvel export Parquet réécrit le marqueur : on rouvre alors la connexion
+    return os.path.getmtime(PARQUET_MARKER) if source == "parquet" else None
+
+def _connect(source: str):
+    if source == "parquet":
+        return connect_parquet(PARQUET_DIR)
     return duckdb.connect(DB_PATH, read_only=True)
 
-def q(sql: str, params=None) -> pd.DataFrame:
-    con = get_con()
-    if params is None:
-        return con.execute(sql).fetchdf()
-    return con.execute(sql, params).fetchdf()
+def _data_version(source: str):
+    # Change à chaque chargement : fichier de la base ou marqueur de l'export Parquet
+    return os.path.getmtime(PARQUET_MARKER if source == "parquet" else DB_PATH)
+
+@st.cache_resource
+def _pool_slot(source: str):
+    # Un seul pool par source, remplacé quand la version change (voir get_pool)
+    return {"lock": threading.Lock(), "pool": None, "version": None}
+
+def get_pool(source: str = "duckdb"):
+    # Curseurs d'une même base : les sessions s'exécutent en parallèle au lieu de se sérialiser.
+    # Nouvel export Parquet : nouveau pool, l'ancien est fermé dès que ses curseurs sont rendus
+    slot = _pool_slot(source)
+    version = _source_version(source)
+    with slot["lock"]:
+        if slot["pool"] is None or slot["version"] != version:
+            if slot["pool"] is not None:
+                slot["pool"].retire()
+            slot["pool"] = ConnectionPool(lambda: _connect(source), size=POOL_SIZE)
+            slot["version"] = version
+        return slot["pool"]
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+@st.cache_resource
+def get_query_cache(source: str = "duckdb"):
+    # Résultats partagés entre reruns / sessions, invalidés si la source change
+    version_path = PARQUET_MARKER if source == "parquet" else DB_PATH
+    return QueryCache(version_path, max_entries=256, max_bytes=256 * 1024 * 1024, ttl_seconds=600)
+
+def _run_query(sql: str, params=None, arrow: bool = False):
+    while True:
+        try:
+            with get_pool(data_source).connection(owner=_session_id()) as con:
+                start = time.perf_counter()
+                cursor = con.execute(sql) if params is None else con.execute(sql, params)
+                result = fetch_arrow(cursor) if arrow else cursor.fetchdf()
+                note_execution(time.perf_counter() - start)
+                return result
+        except PoolClosedError:
+            # Pool remplacé entre get_pool() et l'emprunt du curseur : on prend le nouveau
+            continue
+
+def q(sql: str, params=None, arrow: bool = False):
+    # arrow=True : pyarrow.Table sans conversion pandas (résultats volumineux, lignes brutes)
+    fmt = "arrow" if arrow else "pandas"
+    # Empreinte, lignes, octets, durée (cache compris) et exécution DuckDB : panneau Performance + journal
+    with track_query(sql, params, fmt) as record:
+        result = get_query_cache(data_source).get_or_run(
+            sql, params, lambda: _run_query(sql, params, arrow), fmt=fmt
+        )
+        set_result(record, result)
+    return result
+
+@st.cache_data(show_spinner=False)
+def get_catalog(source: str, table_name: str, version=None):
+    # Options de la barre latérale (valeurs distinctes, bornes de dates) : catalogue du loader,
+    # lu une fois par version des données au lieu de DISTINCT / MIN / MAX à chaque rerun
+    return load_catalog(lambda sql, params: _run_query(sql, params), table_name)
+
+@st.cache_resource
+def get_kpi_errors(source: str, version=None):
+    # Registre des KPI (sql/kpis_*.sql) validé contre le schéma une fois par version des données :
+    # colonnes des filtres déclarés, requêtes préparées (PREPARE) sans être exécutées
+    with get_pool(source).connection() as con:
+        return validate_registry(con)
+
+@st.cache_resource
+def get_executor():
+    # Threads partagés par les sessions ; chaque requête prend son propre curseur du pool
+    return ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="kpi-query")
+
+def q_batch(queries: dict) -> dict:
+    """
+    Exécute des requêtes indépendantes en parallèle
+    - queries : {nom: (sql, params) | (sql, params, arrow) | callable sans argument}
+    - retourne {nom: résultat} ; la durée est celle de la requête la plus lente
+    """
+    ctx = get_script_run_ctx()
+
+    def job(spec):
+        def run():
+            # Rattache le thread à la session (session_id du pool, caches Streamlit)
+            add_script_run_ctx(threading.current_thread(), ctx)
+            return spec() if callable(spec) else q(*spec)
+        return run
+
+    return run_batch({name: job(spec) for name, spec in queries.items()}, get_executor())
 
 def money(x):
     """Simple wrapper around format_number for backward compatibility"""
@@ -174,6 +308,16 @@ st.sidebar.markdown("**Walmart Sales** & **Electric Vehicles**")
 st.sidebar.markdown("---")
 
 dataset = st.sidebar.selectbox("Dataset", ["walmart", "ev"], index=0)
+
+# Source des requêtes : la base DuckDB ou l'export Parquet partitionné (s'il existe)
+available_sources = ["duckdb"] + (["parquet"] if os.path.exists(PARQUET_MARKER) else [])
+data_source = st.sidebar.selectbox(
+    "Source des données", available_sources, index=0, format_func=DATA_SOURCES.get
+)
+begin_run(dataset=dataset, source=data_source)
+kpi_errors = get_kpi_errors(data_source, _data_version(data_source))
+if kpi_errors:
+    st.sidebar.error("KPI invalides (sql/kpis_*.sql) :\n\n" + "\n\n".join(kpi_errors))
 st.sidebar.markdown("---")
 
 # ---------------------------
@@ -191,74 +335,44 @@ with colB:
 # ---------------------------
 if dataset == "walmart":
     # Filters
-    stores = q("SELECT DISTINCT Store_Number FROM walmart ORDER BY Store_Number")["Store_Number"].tolist()
+    catalog = get_catalog(data_source, "walmart", _data_version(data_source))
+    stores = catalog["values"]["Store_Number"]
     store_sel = st.sidebar.multiselect("Store_Number", stores, default=stores)
 
-    dmin = q("SELECT MIN(Date) AS dmin FROM walmart")["dmin"][0]
-    dmax = q("SELECT MAX(Date) AS dmax FROM walmart")["dmax"][0]
+    dmin = catalog["columns"]["Date"]["min"]
+    dmax = catalog["columns"]["Date"]["max"]
     date_range = st.sidebar.date_input("Période (min, max)", value=(dmin, dmax))
 
     holiday_sel = st.sidebar.multiselect("Holiday_Flag", [0, 1], default=[0, 1])
 
     # Base WHERE reused
-    # IMPORTANT: Weekly_Sales is VARCHAR => CAST + REPLACE
+    # Weekly_Sales est typé DOUBLE par le loader (sql/duckdb_loader.py)
     where_params = [store_sel, holiday_sel, date_range[0], date_range[1]]
+    # Requêtes sur les lignes brutes : WHERE compilé une fois pour tout le rerun (filters.py :
+    # filtres « tout sélectionné » supprimés, stores contigus en plages, grandes sélections en table temporaire)
+    # et prédicat `year` en plus sur Parquet (élagage des partitions)
+    raw_where, raw_params = walmart_where(where_params, partitioned=data_source == "parquet",
+                                          stores=stores, date_bounds=(dmin, dmax))
 
-    # KPI: total, avg, max week, nb rows
-    sql_kpis = """
-    SELECT
-      SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales,
-      AVG(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS avg_sales,
-      MAX(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS max_sales,
-      COUNT(*) AS nb_rows
-    FROM walmart
-    WHERE Store_Number IN (SELECT UNNEST(?))
-      AND Holiday_Flag IN (SELECT UNNEST(?))
-      AND Date BETWEEN ? AND ?;
-    """
-    k = q(sql_kpis, where_params).iloc[0]
-
-    # Trend over time
-    sql_time = """
-    SELECT
-      Date,
-      SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales
-    FROM walmart
-    WHERE Store_Number IN (SELECT UNNEST(?))
-      AND Holiday_Flag IN (SELECT UNNEST(?))
-      AND Date BETWEEN ? AND ?
-    GROUP BY Date
-    ORDER BY Date;
-    """
-    df_time = q(sql_time, where_params)
-
-    # Store ranking
-    sql_store = """
-    SELECT
-      Store_Number,
-      SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales
-    FROM walmart
-    WHERE Store_Number IN (SELECT UNNEST(?))
-      AND Holiday_Flag IN (SELECT UNNEST(?))
-      AND Date BETWEEN ? AND ?
-    GROUP BY Store_Number
-    ORDER BY total_sales DESC;
-    """
-    df_store = q(sql_store, where_params)
-
-    # Holiday split
-    sql_holiday = """
-    SELECT
-      Holiday_Flag,
-      SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales
-    FROM walmart
-    WHERE Store_Number IN (SELECT UNNEST(?))
-      AND Holiday_Flag IN (SELECT UNNEST(?))
-      AND Date BETWEEN ? AND ?
-    GROUP BY Holiday_Flag
-    ORDER BY Holiday_Flag;
-    """
-    df_holiday = q(sql_holiday, where_params)
+    # KPI, évolution, classement, split holiday et métriques par store :
+    # requêtes GROUPING SETS routées vers le plus petit rollup (walmart_week,
+    # walmart_store_holiday, ...) capable d'y répondre
+    fused_queries = walmart_fused_queries(q, where_params, stores=stores, date_bounds=(dmin, dmax))
+    # Métriques par store (impact holiday, comparateur) : une requête FILTER sur un rollup,
+    # top / bottom impact coupés côté DuckDB ; mises en cache par état des filtres (q)
+    store_metric_queries = walmart_store_metrics_queries(q, where_params, stores=stores,
+                                                         date_bounds=(dmin, dmax))
+
+    # Requêtes du registre (sql/kpis_walmart.sql) : filtre compilé une fois, passé par nom de KPI
+    raw_filter = (raw_where, raw_params)
+
+    # Requêtes indépendantes exécutées en parallèle (un curseur chacune)
+    walmart_results = q_batch(fused_queries)
+    walmart_frames = walmart_split_frames([walmart_results[name] for name in fused_queries])
+    k = walmart_frames["kpis"]
+    df_time = walmart_frames["time"]
+    df_store = walmart_frames["store"]
+    df_holiday = walmart_frames["holiday"]
 
     # KPI cards row
     st.markdown(
@@ -289,74 +403,18 @@ if dataset == "walmart":
         unsafe_allow_html=True,
     )
 
-    # Nouvelles requêtes pour visualisations avancées
-    # 1. Performance hebdomadaire par store
-    sql_weekly_perf = """
-    SELECT
-      Date,
-      Store_Number,
-      CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE) AS sales
-    FROM walmart
-    WHERE Store_Number IN (SELECT UNNEST(?))
-      AND Holiday_Flag IN (SELECT UNNEST(?))
-      AND Date BETWEEN ? AND ?
-    ORDER BY Date, Store_Number;
-    """
-    df_weekly_perf = q(sql_weekly_perf, where_params)
-
-    # 2. Top et Bottom performers
-    sql_performance = """
-    SELECT
-      Store_Number,
-      SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales,
-      AVG(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS avg_sales,
-      COUNT(*) AS nb_weeks
-    FROM walmart
-    WHERE Store_Number IN (SELECT UNNEST(?))
-      AND Holiday_Flag IN (SELECT UNNEST(?))
-      AND Date BETWEEN ? AND ?
-    GROUP BY Store_Number
-    ORDER BY total_sales DESC;
-    """
-    df_performance = q(sql_performance, where_params)
-
-    # 3. Analyse Holiday Impact
-    sql_holiday_impact = """
-    SELECT
-      Store_Number,
-      Holiday_Flag,
-      AVG(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS avg_sales
-    FROM walmart
-    WHERE Store_Number IN (SELECT UNNEST(?))
-      AND Holiday_Flag IN (SELECT UNNEST(?))
-      AND Date BETWEEN ? AND ?
-    GROUP BY Store_Number, Holiday_Flag
-    ORDER BY Store_Number, Holiday_Flag;
-    """
-    df_holiday_impact = q(sql_holiday_impact, where_params)
-
-    # 4. Distribution temporelle
-    sql_distribution = """
-    SELECT
-      CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE) AS sales,
-      Holiday_Flag,
-      Store_Number
-    FROM walmart
-    WHERE Store_Number IN (SELECT UNNEST(?))
-      AND Holiday_Flag IN (SELECT UNNEST(?))
-      AND Date BETWEEN ? AND ?;
-    """
-    df_distribution = q(sql_distribution, where_params)
-
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 Vue KPI", "🏬 Comparaison Stores", "📊 Analyses Avancées", "🔬 Comparateur", "🧾 Détails"])
-
-    with tab1:
+    # Chaque onglet est un fragment : ses widgets ne relancent que lui,
+    # et seul l'onglet ouvert exécute ses requêtes (on_change="rerun")
+    @timed_fragment("walmart · Vue KPI")
+    def walmart_tab_kpis():
         c1, c2 = st.columns([0.65, 0.35], gap="large")
 
         with c1:
-            with section_card():
+            with section_card("walmart · Évolution des ventes"):
                 st.markdown("### Évolution des ventes")
-                fig = px.line(df_time, x="Date", y="total_sales", markers=True)
+                # Plafond de points par série (LTTB : conserve la forme de la courbe)
+                fig = cpx.line(downsample_frame(df_time, "Date", "total_sales", DEFAULT_MAX_POINTS),
+                              x="Date", y="total_sales", markers=True)
                 fig.update_layout(
                     height=420,
                     margin=dict(l=10, r=10, t=50, b=10),
@@ -368,243 +426,243 @@ if dataset == "walmart":
                 st.plotly_chart(fig, use_container_width=True)
 
         with c2:
-            with section_card():
+            with section_card("walmart · Holiday vs Non-Holiday"):
                 st.markdown("### Holiday vs Non-Holiday")
                 # Make labels nicer
                 df_holiday2 = df_holiday.copy()
                 df_holiday2["Holiday"] = df_holiday2["Holiday_Flag"].map({0: "Non-Holiday", 1: "Holiday"})
-                fig2 = px.pie(df_holiday2, names="Holiday", values="total_sales", hole=0.45,
+                fig2 = cpx.pie(df_holiday2, names="Holiday", values="total_sales", hole=0.45,
                              color_discrete_sequence=['#1E78FF', '#5AA9FF'])
                 fig2.update_layout(height=420, margin=dict(l=10, r=10, t=50, b=10))
                 st.plotly_chart(fig2, use_container_width=True)
 
-    with tab2:
-        with section_card():
+
+    @timed_fragment("walmart · Comparaison Stores")
+    def walmart_tab_stores():
+        with section_card("walmart · Classement des stores (ventes totales)"):
             st.markdown("### Classement des stores (ventes totales)")
-            fig3 = px.bar(df_store.head(15), x="Store_Number", y="total_sales",
+            fig3 = cpx.bar(df_store.head(15), x="Store_Number", y="total_sales",
                          color="total_sales", color_continuous_scale="Blues")
             fig3.update_layout(height=420, margin=dict(l=10, r=10, t=50, b=10), 
                               xaxis_title="Store", yaxis_title="Total ventes")
             st.plotly_chart(fig3, use_container_width=True)
 
-    with tab3:
+
+    @timed_fragment("walmart · Analyses Avancées")
+    def walmart_tab_advanced():
+        # Top / Bottom performers et impact holiday (requête fusionnée)
+        df_performance = walmart_frames["performance"].copy()
+        # Top / bottom HOLIDAY_IMPACT_TOP_K stores (rang depuis chaque extrémité)
+        df_holiday_impact = q(*store_metric_queries["holiday_impact"])
+        # Lignes brutes (walmart.weekly_sales, triées par store : chaque courbe de fig_trend est
+        # une tranche contiguë des colonnes Arrow) : lues seulement quand cet onglet est ouvert
+        tbl_weekly_perf = run_kpi(q, "walmart.weekly_sales", raw_filter, arrow=True)
+
         st.markdown("### 📊 Analyses Avancées")
         
         # Ligne 1: Top/Bottom Performers et Holiday Impact
         col1, col2 = st.columns(2, gap="large")
         
         with col1:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 🏆 Performance des Stores (Interactif)")
-            
-            # Widget pour choisir combien de top/bottom stores afficher
-            n_stores = st.slider("Nombre de stores à afficher (Top & Bottom)", 
-                               min_value=3, max_value=15, value=10, key="n_stores_perf")
-            
-            # Préparer top et bottom
-            top_n = df_performance.head(n_stores).copy()
-            top_n['Category'] = f'Top {n_stores}'
-            bottom_n = df_performance.tail(n_stores).copy()
-            bottom_n['Category'] = f'Bottom {n_stores}'
-            
-            df_top_bottom = pd.concat([top_n, bottom_n])
-            
-            fig_perf = px.bar(df_top_bottom, 
-                             x="Store_Number", 
-                             y="total_sales",
-                             color="Category",
-                             color_discrete_map={f'Top {n_stores}': '#1E78FF', f'Bottom {n_stores}': '#FF6B6B'},
-                             barmode='group')
-            
-            fig_perf.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
-            fig_perf.update_xaxes(title_text="Store Number")
-            fig_perf.update_yaxes(title_text="Total Ventes ($)")
-            
-            st.plotly_chart(fig_perf, use_container_width=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+            with section_card("walmart · Performance des Stores"):
+                st.markdown("#### 🏆 Performance des Stores (Interactif)")
+            
+                # Widget pour choisir combien de top/bottom stores afficher
+                n_stores = st.slider("Nombre de stores à afficher (Top & Bottom)", 
+                                   min_value=3, max_value=15, value=10, key="n_stores_perf")
+            
+                # Préparer top et bottom
+                top_n = df_performance.head(n_stores).copy()
+                top_n['Category'] = f'Top {n_stores}'
+                bottom_n = df_performance.tail(n_stores).copy()
+                bottom_n['Category'] = f'Bottom {n_stores}'
+            
+                df_top_bottom = pd.concat([top_n, bottom_n])
+            
+                fig_perf = cpx.bar(df_top_bottom, 
+                                 x="Store_Number", 
+                                 y="total_sales",
+                                 color="Category",
+                                 color_discrete_map={f'Top {n_stores}': '#1E78FF', f'Bottom {n_stores}': '#FF6B6B'},
+                                 barmode='group')
+            
+                fig_perf.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
+                fig_perf.update_xaxes(title_text="Store Number")
+                fig_perf.update_yaxes(title_text="Total Ventes ($)")
+            
+                st.plotly_chart(fig_perf, use_container_width=True)
         
         with col2:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 🎉 Impact des Jours Fériés par Store")
-            
-            # Widget pour trier
-            sort_option = st.radio(
-                "Trier par",
-                ["Impact le plus fort", "Impact le plus faible"],
-                horizontal=True,
-                key="holiday_sort"
-            )
+            with section_card("walmart · Impact des Jours Fériés par Store"):
+                st.markdown("#### 🎉 Impact des Jours Fériés par Store")
             
-            # Pivot pour comparer
-            df_pivot = df_holiday_impact.pivot(index="Store_Number", columns="Holiday_Flag", values="avg_sales")
-            if 0 in df_pivot.columns and 1 in df_pivot.columns:
-                df_pivot['Impact'] = ((df_pivot[1] - df_pivot[0]) / df_pivot[0] * 100).round(1)
-                
-                if sort_option == "Impact le plus fort":
-                    df_pivot = df_pivot.sort_values('Impact', ascending=False).head(10)
-                else:
-                    df_pivot = df_pivot.sort_values('Impact', ascending=True).head(10)
+                # Widget pour trier
+                sort_option = st.radio(
+                    "Trier par",
+                    ["Impact le plus fort", "Impact le plus faible"],
+                    horizontal=True,
+                    key="holiday_sort"
+                )
+            
+                # Impact (%) = vente moyenne holiday vs non-holiday, calculé en SQL
+                rank_column = "impact_rank_high" if sort_option == "Impact le plus fort" else "impact_rank_low"
+                df_impact = df_holiday_impact[df_holiday_impact[rank_column] <= HOLIDAY_IMPACT_TOP_K]
+                if len(df_impact) > 0:
+                    df_impact = df_impact.sort_values(rank_column)
                 
-                fig_impact = px.bar(df_pivot.reset_index(), 
-                                   x="Store_Number", 
-                                   y="Impact",
-                                   color="Impact",
-                                   color_continuous_scale=["#FF6B6B", "#FFEB3B", "#4ECDC4"])
+                    fig_impact = cpx.bar(df_impact, 
+                                       x="Store_Number", 
+                                       y="Impact",
+                                       color="Impact",
+                                       color_continuous_scale=["#FF6B6B", "#FFEB3B", "#4ECDC4"])
                 
-                fig_impact.update_layout(height=250, margin=dict(l=10, r=10, t=10, b=10))
-                fig_impact.update_xaxes(title_text="Store Number")
-                fig_impact.update_yaxes(title_text="Impact Holiday (%)")
+                    fig_impact.update_layout(height=250, margin=dict(l=10, r=10, t=10, b=10))
+                    fig_impact.update_xaxes(title_text="Store Number")
+                    fig_impact.update_yaxes(title_text="Impact Holiday (%)")
                 
-                st.plotly_chart(fig_impact, use_container_width=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+                    st.plotly_chart(fig_impact, use_container_width=True)
         
         # Ligne 2: Distribution et Tendance comparative
         col3, col4 = st.columns(2, gap="large")
         
         with col3:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### � Catégories de Performance des Stores")
-            
-            st.caption("💡 **Classification**: Les stores sont classés en 3 catégories selon leurs ventes totales")
+            with section_card("walmart · Catégories de Performance des Stores"):
+                st.markdown("#### � Catégories de Performance des Stores")
             
-            # Utiliser la fonction utils pour classifier
-            df_performance, q33, q66 = categorize_performance(df_performance, 'total_sales', categories=3)
+                st.caption("💡 **Classification**: Les stores sont classés en 3 catégories selon leurs ventes totales")
             
-            # Sélecteur pour voir soit le résumé, soit les détails
-            view_mode = st.radio(
-                "Vue",
-                ["📊 Résumé", "🏬 Détails par Store"],
-                horizontal=True,
-                key="perf_category_view"
-            )
+                # Utiliser la fonction utils pour classifier
+                df_performance, q33, q66 = categorize_performance(df_performance, 'total_sales', categories=3)
             
-            if view_mode == "📊 Résumé":
-                # Compter les stores par catégorie
-                category_counts = df_performance['Catégorie'].value_counts().reset_index()
-                category_counts.columns = ['Catégorie', 'Nombre de Stores']
-                
-                # Graphique en barres avec couleurs
-                fig_cat = create_bar_chart(
-                    category_counts,
-                    x='Catégorie',
-                    y='Nombre de Stores',
-                    color='Catégorie',
-                    color_map={
-                        '⚠️ Faible': '#FF6B6B',
-                        '✅ Moyen': '#FFD93D',
-                        '🌟 Élevé': '#4ECDC4'
-                    },
-                    title_x="Niveau de Performance",
-                    title_y="Nombre de Stores",
-                    height=200
+                # Sélecteur pour voir soit le résumé, soit les détails
+                view_mode = st.radio(
+                    "Vue",
+                    ["📊 Résumé", "🏬 Détails par Store", "📦 Distribution"],
+                    horizontal=True,
+                    key="perf_category_view"
                 )
-                fig_cat.update_layout(showlegend=False)
-                st.plotly_chart(fig_cat, use_container_width=True)
             
-            else:
-                # Afficher tous les stores avec leur catégorie
-                df_display = df_performance[['Store_Number', 'total_sales', 'Catégorie']].copy()
-                df_display = df_display.sort_values('total_sales', ascending=False)
+                if view_mode == "📊 Résumé":
+                    # Compter les stores par catégorie
+                    category_counts = df_performance['Catégorie'].value_counts().reset_index()
+                    category_counts.columns = ['Catégorie', 'Nombre de Stores']
                 
-                # Graphique avec tous les stores colorés par catégorie
-                fig_stores = px.bar(
-                    df_display,
-                    x='Store_Number',
-                    y='total_sales',
-                    color='Catégorie',
-                    color_discrete_map={
-                        '⚠️ Faible': '#FF6B6B',
-                        '✅ Moyen': '#FFD93D',
-                        '🌟 Élevé': '#4ECDC4'
-                    },
-                    hover_data=['total_sales']
-                )
-                fig_stores.update_layout(
-                    height=200,
-                    margin=dict(l=10, r=10, t=10, b=10),
-                    xaxis_title="Store Number",
-                    yaxis_title="Ventes Totales ($)"
-                )
-                st.plotly_chart(fig_stores, use_container_width=True)
+                    # Graphique en barres avec couleurs
+                    fig_cat = create_bar_chart(
+                        category_counts,
+                        x='Catégorie',
+                        y='Nombre de Stores',
+                        color='Catégorie',
+                        color_map={
+                            '⚠️ Faible': '#FF6B6B',
+                            '✅ Moyen': '#FFD93D',
+                            '🌟 Élevé': '#4ECDC4'
+                        },
+                        title_x="Niveau de Performance",
+                        title_y="Nombre de Stores",
+                        height=200
+                    )
+                    fig_cat.update_layout(showlegend=False)
+                    st.plotly_chart(fig_cat, use_container_width=True)
+            
+                elif view_mode == "📦 Distribution":
+                    # Quartiles / moustaches / outliers (top 20) calculés en SQL : quelques lignes transférées
+                    df_dist = box_stats(q, "walmart", "Weekly_Sales", raw_where, raw_params, group="Holiday_Flag")
+                    df_dist_out = box_outliers(q, "walmart", "Weekly_Sales", raw_where, raw_params, group="Holiday_Flag")
+                    holiday_labels = {0: "Non-Holiday", 1: "Holiday"}
+                    df_dist["Holiday_Flag"] = df_dist["Holiday_Flag"].map(holiday_labels)
+                    df_dist_out["Holiday_Flag"] = df_dist_out["Holiday_Flag"].map(holiday_labels)
+                
+                    fig_dist = create_box_from_stats(
+                        df_dist, "Holiday_Flag", df_dist_out,
+                        colors=['#1E78FF', '#FF6B6B'],
+                        title_y="Ventes hebdo ($)",
+                        height=200
+                    )
+                    st.plotly_chart(fig_dist, use_container_width=True)
             
-            # Statistiques simples
-            col_a, col_b, col_c = st.columns(3)
-            with col_a:
-                faible = len(df_performance[df_performance['Catégorie'] == '⚠️ Faible'])
-                st.metric("⚠️ Faible", faible, help=f"< ${q33:,.0f}")
-            with col_b:
-                moyen = len(df_performance[df_performance['Catégorie'] == '✅ Moyen'])
-                st.metric("✅ Moyen", moyen, help=f"${q33:,.0f} - ${q66:,.0f}")
-            with col_c:
-                eleve = len(df_performance[df_performance['Catégorie'] == '🌟 Élevé'])
-                st.metric("🌟 Élevé", eleve, help=f"> ${q66:,.0f}")
+                else:
+                    # Afficher tous les stores avec leur catégorie
+                    df_display = df_performance[['Store_Number', 'total_sales', 'Catégorie']].copy()
+                    df_display = df_display.sort_values('total_sales', ascending=False)
+                
+                    # Graphique avec tous les stores colorés par catégorie
+                    fig_stores = cpx.bar(
+                        df_display,
+                        x='Store_Number',
+                        y='total_sales',
+                        color='Catégorie',
+                        color_discrete_map={
+                            '⚠️ Faible': '#FF6B6B',
+                            '✅ Moyen': '#FFD93D',
+                            '🌟 Élevé': '#4ECDC4'
+                        },
+                        hover_data=['total_sales']
+                    )
+                    fig_stores.update_layout(
+                        height=200,
+                        margin=dict(l=10, r=10, t=10, b=10),
+                        xaxis_title="Store Number",
+                        yaxis_title="Ventes Totales ($)"
+                    )
+                    st.plotly_chart(fig_stores, use_container_width=True)
+            
+                # Statistiques simples
+                category_sizes = df_performance['Catégorie'].value_counts()
+                col_a, col_b, col_c = st.columns(3)
+                with col_a:
+                    st.metric("⚠️ Faible", int(category_sizes.get('⚠️ Faible', 0)), help=f"< ${q33:,.0f}")
+                with col_b:
+                    st.metric("✅ Moyen", int(category_sizes.get('✅ Moyen', 0)), help=f"${q33:,.0f} - ${q66:,.0f}")
+                with col_c:
+                    st.metric("🌟 Élevé", int(category_sizes.get('🌟 Élevé', 0)), help=f"> ${q66:,.0f}")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         with col4:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📈 Comparaison de Stores (Interactif)")
-            
-            # Widget pour choisir les stores à comparer
-            all_stores = df_performance['Store_Number'].tolist()
-            top_5_default = df_performance.head(5)['Store_Number'].tolist()
-            
-            selected_stores = st.multiselect(
-                "Sélectionnez les stores à comparer",
-                options=all_stores,
-                default=top_5_default,
-                key="store_comparison"
-            )
+            with section_card("walmart · Comparaison de Stores"):
+                st.markdown("#### 📈 Comparaison de Stores (Interactif)")
+            
+                # Widget pour choisir les stores à comparer
+                all_stores = df_performance['Store_Number'].tolist()
+                top_5_default = df_performance.head(5)['Store_Number'].tolist()
+            
+                selected_stores = st.multiselect(
+                    "Sélectionnez les stores à comparer",
+                    options=all_stores,
+                    default=top_5_default,
+                    key="store_comparison"
+                )
             
-            if selected_stores:
-                df_selected_trend = df_weekly_perf[df_weekly_perf['Store_Number'].isin(selected_stores)]
+                if selected_stores:
+                    tbl_selected_trend = filter_isin(tbl_weekly_perf, "Store_Number", selected_stores)
                 
-                fig_trend = px.line(df_selected_trend, 
-                                   x="Date", 
-                                   y="sales",
-                                   color="Store_Number",
-                                   color_discrete_sequence=px.colors.sequential.Blues_r)
+                    fig_trend = create_arrow_line_chart(tbl_selected_trend,
+                                                        x="Date",
+                                                        y="sales",
+                                                        color="Store_Number",
+                                                        colors=px.colors.sequential.Blues_r,
+                                                        # min/max par bucket : les pics (semaines fériées) restent visibles
+                                                        max_points=DEFAULT_MAX_POINTS,
+                                                        method="minmax")
                 
-                fig_trend.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
-                fig_trend.update_xaxes(title_text="Date")
-                fig_trend.update_yaxes(title_text="Ventes ($)")
+                    fig_trend.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
+                    fig_trend.update_xaxes(title_text="Date")
+                    fig_trend.update_yaxes(title_text="Ventes ($)")
                 
-                st.plotly_chart(fig_trend, use_container_width=True)
-            else:
-                st.info("👆 Sélectionnez au moins un store pour voir la tendance")
+                    st.plotly_chart(fig_trend, use_container_width=True)
+                else:
+                    st.info("👆 Sélectionnez au moins un store pour voir la tendance")
             
-            st.markdown("</div>", unsafe_allow_html=True)
 
-    with tab4:
+
+    @timed_fragment("walmart · Comparateur")
+    def walmart_tab_comparator():
         st.markdown("### 🔬 Comparateur de Caractéristiques (Personnalisable)")
         
         st.info("💡 Créez vos propres graphiques en choisissant les axes X et Y pour chaque visualisation!")
         
-        # Requête pour obtenir toutes les données avec moyennes par store
-        sql_all_walmart = """
-        SELECT 
-            Store_Number,
-            AVG(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) as avg_weekly_sales,
-            AVG(Temperature) as avg_temperature,
-            AVG(Fuel_Price) as avg_fuel_price,
-            AVG(CPI) as avg_cpi,
-            AVG(Unemployment) as avg_unemployment,
-            SUM(CASE WHEN Holiday_Flag = 1 THEN CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE) ELSE 0 END) as holiday_sales,
-            SUM(CASE WHEN Holiday_Flag = 0 THEN CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE) ELSE 0 END) as regular_sales,
-            COUNT(*) as num_records,
-            COUNT(CASE WHEN Holiday_Flag = 1 THEN 1 END) as num_holidays
-        FROM walmart
-        WHERE Store_Number IN (SELECT UNNEST(?))
-          AND Holiday_Flag IN (SELECT UNNEST(?))
-          AND Date BETWEEN ? AND ?
-        GROUP BY Store_Number;
-        """
-        df_all_walmart = q(sql_all_walmart, where_params)
-        
-        # Calculer des métriques dérivées
-        df_all_walmart['total_sales'] = df_all_walmart['holiday_sales'] + df_all_walmart['regular_sales']
-        df_all_walmart['holiday_impact_pct'] = ((df_all_walmart['holiday_sales'] / df_all_walmart['num_holidays']) / 
-                                                 (df_all_walmart['regular_sales'] / (df_all_walmart['num_records'] - df_all_walmart['num_holidays'])) * 100 - 100).round(1)
+        # Moyennes et métriques dérivées par store (total, impact holiday) calculées en SQL
+        df_all_walmart = q(*store_metric_queries["store_metrics"])
         
         # Liste des caractéristiques numériques disponibles
         numeric_features_walmart = {
@@ -628,128 +686,124 @@ if dataset == "walmart":
         col1, col2 = st.columns(2, gap="large")
         
         with col1:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📊 Graphique 1")
-            
-            col_x1, col_y1 = st.columns(2)
-            with col_x1:
-                x_axis_w1 = st.selectbox("Axe X", list(numeric_features_walmart.keys()), 
-                                       format_func=lambda x: numeric_features_walmart[x],
-                                       key="xw1", index=0)  # avg_weekly_sales
-            with col_y1:
-                y_axis_w1 = st.selectbox("Axe Y", list(numeric_features_walmart.keys()),
-                                       format_func=lambda x: numeric_features_walmart[x],
-                                       key="yw1", index=8)  # holiday_impact_pct
-            
-            # Filtrer les données avec valeurs non nulles
-            df_plot_w1 = df_all_walmart.dropna(subset=[x_axis_w1, y_axis_w1])
-            
-            if len(df_plot_w1) > 0:
-                fig_w1 = px.scatter(df_plot_w1, x=x_axis_w1, y=y_axis_w1,
-                                   hover_data=["Store_Number"],
-                                   color="Store_Number",
-                                   color_continuous_scale="Blues")
-                fig_w1.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
-                fig_w1.update_xaxes(title_text=numeric_features_walmart[x_axis_w1])
-                fig_w1.update_yaxes(title_text=numeric_features_walmart[y_axis_w1])
-                st.plotly_chart(fig_w1, use_container_width=True)
-            else:
-                st.warning("Pas assez de données pour ces axes")
+            with section_card("walmart · Graphique 1"):
+                st.markdown("#### 📊 Graphique 1")
+            
+                col_x1, col_y1 = st.columns(2)
+                with col_x1:
+                    x_axis_w1 = st.selectbox("Axe X", list(numeric_features_walmart.keys()), 
+                                           format_func=lambda x: numeric_features_walmart[x],
+                                           key="xw1", index=0)  # avg_weekly_sales
+                with col_y1:
+                    y_axis_w1 = st.selectbox("Axe Y", list(numeric_features_walmart.keys()),
+                                           format_func=lambda x: numeric_features_walmart[x],
+                                           key="yw1", index=8)  # holiday_impact_pct
+            
+                # Filtrer les données avec valeurs non nulles
+                df_plot_w1 = df_all_walmart.dropna(subset=[x_axis_w1, y_axis_w1])
+            
+                if len(df_plot_w1) > 0:
+                    fig_w1 = cpx.scatter(df_plot_w1, x=x_axis_w1, y=y_axis_w1,
+                                       hover_data=["Store_Number"],
+                                       color="Store_Number",
+                                       color_continuous_scale="Blues")
+                    fig_w1.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
+                    fig_w1.update_xaxes(title_text=numeric_features_walmart[x_axis_w1])
+                    fig_w1.update_yaxes(title_text=numeric_features_walmart[y_axis_w1])
+                    st.plotly_chart(fig_w1, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour ces axes")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         with col2:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📊 Graphique 2")
-            
-            col_x2, col_y2 = st.columns(2)
-            with col_x2:
-                x_axis_w2 = st.selectbox("Axe X", list(numeric_features_walmart.keys()),
-                                       format_func=lambda x: numeric_features_walmart[x],
-                                       key="xw2", index=5)  # avg_unemployment
-            with col_y2:
-                y_axis_w2 = st.selectbox("Axe Y", list(numeric_features_walmart.keys()),
-                                       format_func=lambda x: numeric_features_walmart[x],
-                                       key="yw2", index=0)  # avg_weekly_sales
-            
-            df_plot_w2 = df_all_walmart.dropna(subset=[x_axis_w2, y_axis_w2])
-            
-            if len(df_plot_w2) > 0:
-                fig_w2 = px.scatter(df_plot_w2, x=x_axis_w2, y=y_axis_w2,
-                                   hover_data=["Store_Number"],
-                                   color="Store_Number",
-                                   color_continuous_scale="Teal")
-                fig_w2.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
-                fig_w2.update_xaxes(title_text=numeric_features_walmart[x_axis_w2])
-                fig_w2.update_yaxes(title_text=numeric_features_walmart[y_axis_w2])
-                st.plotly_chart(fig_w2, use_container_width=True)
-            else:
-                st.warning("Pas assez de données pour ces axes")
+            with section_card("walmart · Graphique 2"):
+                st.markdown("#### 📊 Graphique 2")
+            
+                col_x2, col_y2 = st.columns(2)
+                with col_x2:
+                    x_axis_w2 = st.selectbox("Axe X", list(numeric_features_walmart.keys()),
+                                           format_func=lambda x: numeric_features_walmart[x],
+                                           key="xw2", index=5)  # avg_unemployment
+                with col_y2:
+                    y_axis_w2 = st.selectbox("Axe Y", list(numeric_features_walmart.keys()),
+                                           format_func=lambda x: numeric_features_walmart[x],
+                                           key="yw2", index=0)  # avg_weekly_sales
+            
+                df_plot_w2 = df_all_walmart.dropna(subset=[x_axis_w2, y_axis_w2])
+            
+                if len(df_plot_w2) > 0:
+                    fig_w2 = cpx.scatter(df_plot_w2, x=x_axis_w2, y=y_axis_w2,
+                                       hover_data=["Store_Number"],
+                                       color="Store_Number",
+                                       color_continuous_scale="Teal")
+                    fig_w2.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
+                    fig_w2.update_xaxes(title_text=numeric_features_walmart[x_axis_w2])
+                    fig_w2.update_yaxes(title_text=numeric_features_walmart[y_axis_w2])
+                    st.plotly_chart(fig_w2, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour ces axes")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         # Ligne 2
         col3, col4 = st.columns(2, gap="large")
         
         with col3:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📊 Graphique 3")
-            
-            col_x3, col_y3 = st.columns(2)
-            with col_x3:
-                x_axis_w3 = st.selectbox("Axe X", list(numeric_features_walmart.keys()),
-                                       format_func=lambda x: numeric_features_walmart[x],
-                                       key="xw3", index=3)  # avg_fuel_price
-            with col_y3:
-                y_axis_w3 = st.selectbox("Axe Y", list(numeric_features_walmart.keys()),
-                                       format_func=lambda x: numeric_features_walmart[x],
-                                       key="yw3", index=1)  # total_sales
-            
-            df_plot_w3 = df_all_walmart.dropna(subset=[x_axis_w3, y_axis_w3])
-            
-            if len(df_plot_w3) > 0:
-                fig_w3 = px.scatter(df_plot_w3, x=x_axis_w3, y=y_axis_w3,
-                                   hover_data=["Store_Number"],
-                                   color="Store_Number",
-                                   color_continuous_scale="Sunset")
-                fig_w3.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
-                fig_w3.update_xaxes(title_text=numeric_features_walmart[x_axis_w3])
-                fig_w3.update_yaxes(title_text=numeric_features_walmart[y_axis_w3])
-                st.plotly_chart(fig_w3, use_container_width=True)
-            else:
-                st.warning("Pas assez de données pour ces axes")
+            with section_card("walmart · Graphique 3"):
+                st.markdown("#### 📊 Graphique 3")
+            
+                col_x3, col_y3 = st.columns(2)
+                with col_x3:
+                    x_axis_w3 = st.selectbox("Axe X", list(numeric_features_walmart.keys()),
+                                           format_func=lambda x: numeric_features_walmart[x],
+                                           key="xw3", index=3)  # avg_fuel_price
+                with col_y3:
+                    y_axis_w3 = st.selectbox("Axe Y", list(numeric_features_walmart.keys()),
+                                           format_func=lambda x: numeric_features_walmart[x],
+                                           key="yw3", index=1)  # total_sales
+            
+                df_plot_w3 = df_all_walmart.dropna(subset=[x_axis_w3, y_axis_w3])
+            
+                if len(df_plot_w3) > 0:
+                    fig_w3 = cpx.scatter(df_plot_w3, x=x_axis_w3, y=y_axis_w3,
+                                       hover_data=["Store_Number"],
+                                       color="Store_Number",
+                                       color_continuous_scale="Sunset")
+                    fig_w3.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
+                    fig_w3.update_xaxes(title_text=numeric_features_walmart[x_axis_w3])
+                    fig_w3.update_yaxes(title_text=numeric_features_walmart[y_axis_w3])
+                    st.plotly_chart(fig_w3, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour ces axes")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         with col4:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📊 Graphique 4")
-            
-            col_x4, col_y4 = st.columns(2)
-            with col_x4:
-                x_axis_w4 = st.selectbox("Axe X", list(numeric_features_walmart.keys()),
-                                       format_func=lambda x: numeric_features_walmart[x],
-                                       key="xw4", index=4)  # avg_cpi
-            with col_y4:
-                y_axis_w4 = st.selectbox("Axe Y", list(numeric_features_walmart.keys()),
-                                       format_func=lambda x: numeric_features_walmart[x],
-                                       key="yw4", index=0)  # avg_weekly_sales
-            
-            df_plot_w4 = df_all_walmart.dropna(subset=[x_axis_w4, y_axis_w4])
-            
-            if len(df_plot_w4) > 0:
-                fig_w4 = px.scatter(df_plot_w4, x=x_axis_w4, y=y_axis_w4,
-                                   hover_data=["Store_Number"],
-                                   color="Store_Number",
-                                   color_continuous_scale="Purp")
-                fig_w4.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
-                fig_w4.update_xaxes(title_text=numeric_features_walmart[x_axis_w4])
-                fig_w4.update_yaxes(title_text=numeric_features_walmart[y_axis_w4])
-                st.plotly_chart(fig_w4, use_container_width=True)
-            else:
-                st.warning("Pas assez de données pour ces axes")
+            with section_card("walmart · Graphique 4"):
+                st.markdown("#### 📊 Graphique 4")
+            
+                col_x4, col_y4 = st.columns(2)
+                with col_x4:
+                    x_axis_w4 = st.selectbox("Axe X", list(numeric_features_walmart.keys()),
+                                           format_func=lambda x: numeric_features_walmart[x],
+                                           key="xw4", index=4)  # avg_cpi
+                with col_y4:
+                    y_axis_w4 = st.selectbox("Axe Y", list(numeric_features_walmart.keys()),
+                                           format_func=lambda x: numeric_features_walmart[x],
+                                           key="yw4", index=0)  # avg_weekly_sales
+            
+                df_plot_w4 = df_all_walmart.dropna(subset=[x_axis_w4, y_axis_w4])
+            
+                if len(df_plot_w4) > 0:
+                    fig_w4 = cpx.scatter(df_plot_w4, x=x_axis_w4, y=y_axis_w4,
+                                       hover_data=["Store_Number"],
+                                       color="Store_Number",
+                                       color_continuous_scale="Purp")
+                    fig_w4.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
+                    fig_w4.update_xaxes(title_text=numeric_features_walmart[x_axis_w4])
+                    fig_w4.update_yaxes(title_text=numeric_features_walmart[y_axis_w4])
+                    st.plotly_chart(fig_w4, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour ces axes")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         # Suggestions de comparaisons intéressantes
         st.markdown("---")
@@ -763,42 +817,54 @@ if dataset == "walmart":
         with col_s3:
             st.info("**🎯 Stratégie**\n- Jours Fériés vs Impact\n- Ventes Holiday vs Regular")
 
+
+    @timed_fragment("walmart · Détails")
+    def walmart_tab_details():
+        with section_card("walmart · Aperçu des données (50 lignes)"):
+            st.markdown("### Aperçu des données (50 lignes)")
+            st.dataframe(run_kpi(q, "walmart.preview", raw_filter), use_container_width=True, height=420)
+
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 Vue KPI", "🏬 Comparaison Stores", "📊 Analyses Avancées", "🔬 Comparateur", "🧾 Détails"],
+                                           key="walmart_tabs", on_change="rerun")
+
+    with tab1:
+        if tab1.open:
+            walmart_tab_kpis()
+
+    with tab2:
+        if tab2.open:
+            walmart_tab_stores()
+
+    with tab3:
+        if tab3.open:
+            walmart_tab_advanced()
+
+    with tab4:
+        if tab4.open:
+            walmart_tab_comparator()
+
     with tab5:
-        st.markdown('<div class="section-card">', unsafe_allow_html=True)
-        st.markdown("### Aperçu des données (50 lignes)")
-        sql_preview = """
-        SELECT Store_Number, Date, Weekly_Sales, Holiday_Flag, Temperature, Fuel_Price, CPI, Unemployment
-        FROM walmart
-        WHERE Store_Number IN (SELECT UNNEST(?))
-          AND Holiday_Flag IN (SELECT UNNEST(?))
-          AND Date BETWEEN ? AND ?
-        LIMIT 50;
-        """
-        st.dataframe(q(sql_preview, where_params), use_container_width=True, height=420)
-        st.markdown("</div>", unsafe_allow_html=True)
+        if tab5.open:
+            walmart_tab_details()
 
 # ---------------------------
 # EV VIEW
 # ---------------------------
 else:
-    brands = q("SELECT DISTINCT brand FROM ev WHERE brand IS NOT NULL ORDER BY brand")["brand"].tolist()
+    catalog = get_catalog(data_source, "ev", _data_version(data_source))
+    brands = catalog["values"]["brand"]
     brand_sel = st.sidebar.multiselect("brand", brands, default=brands[:6] if len(brands) >= 6 else brands)
 
-    segments = q("SELECT DISTINCT segment FROM ev WHERE segment IS NOT NULL ORDER BY segment")["segment"].tolist()
+    segments = catalog["values"]["segment"]
     segment_sel = st.sidebar.multiselect("segment", segments, default=segments)
+    # WHERE compilé une fois pour tout le rerun (prédicat supprimé quand tout est sélectionné)
+    ev_where_sql, ev_params = ev_where(brand_sel, segment_sel, brands=brands, segments=segments)
 
-    # KPI cards
-    sql_ev_kpi = """
-    SELECT
-      COUNT(*) AS nb_models,
-      AVG(range_km) AS avg_range,
-      AVG(battery_capacity_kWh) AS avg_batt,
-      AVG(top_speed_kmh) AS avg_speed
-    FROM ev
-    WHERE brand IN (SELECT UNNEST(?))
-      AND segment IN (SELECT UNNEST(?));
-    """
-    ek = q(sql_ev_kpi, [brand_sel, segment_sel]).iloc[0]
+    # Requêtes du registre (sql/kpis_ev.sql), exécutées par nom avec ce filtre
+    ev_filter = (ev_where_sql, ev_params)
+
+    ek = run_kpi(q, "ev.summary", ev_filter).iloc[0]
 
     st.markdown(
         f"""
@@ -828,377 +894,320 @@ else:
         unsafe_allow_html=True,
     )
 
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["🚗 Top Autonomie", "🏷️ Marques", "📊 Analyses Avancées", "🔬 Comparateur", "🧾 Détails"])
-
-    with tab1:
-        st.markdown('<div class="section-card">', unsafe_allow_html=True)
-        st.markdown("### 🚗 Top Autonomies (Interactif)")
+    # Chaque onglet est un fragment : ses widgets ne relancent que lui,
+    # et seul l'onglet ouvert exécute ses requêtes (on_change="rerun")
+    @timed_fragment("ev · Top Autonomie")
+    def ev_tab_top_range():
+        with section_card("ev · Top Autonomies"):
+            st.markdown("### 🚗 Top Autonomies (Interactif)")
         
-        col_x, col_y = st.columns([0.7, 0.3])
+            col_x, col_y = st.columns([0.7, 0.3])
         
-        with col_x:
-            # Slider pour choisir combien de modèles afficher
-            n_top = st.slider("Nombre de modèles à afficher", 
-                            min_value=5, max_value=20, value=10, key="n_top_ev")
+            with col_x:
+                # Slider pour choisir combien de modèles afficher
+                n_top = st.slider("Nombre de modèles à afficher", 
+                                min_value=5, max_value=20, value=10, key="n_top_ev")
         
-        with col_y:
-            # Filtre par segment spécifique
-            view_segment = st.selectbox(
-                "Segment",
-                ["Tous"] + segment_sel,
-                key="segment_filter_top"
-            )
+            with col_y:
+                # Filtre par segment spécifique
+                view_segment = st.selectbox(
+                    "Segment",
+                    ["Tous"] + segment_sel,
+                    key="segment_filter_top"
+                )
         
-        sql_top = """
-        SELECT brand, model, range_km, segment
-        FROM ev
-        WHERE brand IN (SELECT UNNEST(?))
-          AND segment IN (SELECT UNNEST(?))
-          AND range_km IS NOT NULL
-        ORDER BY range_km DESC
-        LIMIT ?;
-        """
-        df_top_all = q(sql_top, [brand_sel, segment_sel, n_top])
+            df_top_all = run_kpi(q, "ev.top_range", ev_filter, [n_top])
         
-        # Filtrer par segment si sélectionné
-        if view_segment != "Tous":
-            df_top = df_top_all[df_top_all['segment'] == view_segment].head(n_top)
-        else:
-            df_top = df_top_all
+            # Filtrer par segment si sélectionné
+            if view_segment != "Tous":
+                df_top = df_top_all[df_top_all['segment'] == view_segment].head(n_top)
+            else:
+                df_top = df_top_all
         
-        if len(df_top) > 0:
-            fig = px.bar(df_top, x="model", y="range_km", 
-                        hover_data=["brand", "segment"],
-                        color="brand",
-                        color_discrete_sequence=px.colors.qualitative.Set2)
-            fig.update_layout(height=350, margin=dict(l=10, r=10, t=10, b=10), 
-                            xaxis_title="Modèle", yaxis_title="Autonomie (km)")
-            fig.update_xaxes(tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Champion
-            champion = df_top.iloc[0]
-            st.success(f"🏆 Champion: **{champion['brand']} {champion['model']}** - {champion['range_km']:.0f} km")
-        else:
-            st.warning("Aucun modèle trouvé avec ces critères")
+            if len(df_top) > 0:
+                fig = cpx.bar(df_top, x="model", y="range_km", 
+                            hover_data=["brand", "segment"],
+                            color="brand",
+                            color_discrete_sequence=px.colors.qualitative.Set2)
+                fig.update_layout(height=350, margin=dict(l=10, r=10, t=10, b=10), 
+                                xaxis_title="Modèle", yaxis_title="Autonomie (km)")
+                fig.update_xaxes(tickangle=45)
+                st.plotly_chart(fig, use_container_width=True)
+            
+                # Champion
+                champion = df_top.iloc[0]
+                st.success(f"🏆 Champion: **{champion['brand']} {champion['model']}** - {champion['range_km']:.0f} km")
+            else:
+                st.warning("Aucun modèle trouvé avec ces critères")
         
-        st.markdown("</div>", unsafe_allow_html=True)
 
-    with tab2:
-        st.markdown('<div class="section-card">', unsafe_allow_html=True)
-        st.markdown("### 🏷️ Autonomie par Marque (Interactif)")
+
+    @timed_fragment("ev · Marques")
+    def ev_tab_brands():
+        with section_card("ev · Autonomie par Marque"):
+            st.markdown("### 🏷️ Autonomie par Marque (Interactif)")
         
-        # Obtenir toutes les marques disponibles
-        sql_all_brands = """
-        SELECT brand, AVG(range_km) AS avg_range_km, COUNT(*) as nb_models
-        FROM ev
-        WHERE brand IN (SELECT UNNEST(?))
-          AND segment IN (SELECT UNNEST(?))
-          AND range_km IS NOT NULL
-        GROUP BY brand
-        ORDER BY avg_range_km DESC;
-        """
-        df_all_brands = q(sql_all_brands, [brand_sel, segment_sel])
+            df_all_brands = run_kpi(q, "ev.range_by_brand", ev_filter)
         
-        col_a, col_b = st.columns([0.7, 0.3])
+            col_a, col_b = st.columns([0.7, 0.3])
         
-        with col_a:
-            # Widget pour sélectionner les marques à afficher
-            all_available_brands = df_all_brands['brand'].tolist()
-            top_5_brands = df_all_brands.head(5)['brand'].tolist()
-            
-            selected_brands = st.multiselect(
-                "Sélectionnez les marques à comparer",
-                options=all_available_brands,
-                default=top_5_brands,
-                key="brand_comparison"
-            )
+            with col_a:
+                # Widget pour sélectionner les marques à afficher
+                all_available_brands = df_all_brands['brand'].tolist()
+                top_5_brands = df_all_brands.head(5)['brand'].tolist()
+            
+                selected_brands = st.multiselect(
+                    "Sélectionnez les marques à comparer",
+                    options=all_available_brands,
+                    default=top_5_brands,
+                    key="brand_comparison"
+                )
         
-        with col_b:
-            # Option de tri
-            sort_by = st.radio(
-                "Trier par",
-                ["Autonomie", "Nombre de modèles"],
-                key="brand_sort"
-            )
+            with col_b:
+                # Option de tri
+                sort_by = st.radio(
+                    "Trier par",
+                    ["Autonomie", "Nombre de modèles"],
+                    key="brand_sort"
+                )
         
-        if selected_brands:
-            df_filtered_brands = df_all_brands[df_all_brands['brand'].isin(selected_brands)].copy()
+            if selected_brands:
+                df_filtered_brands = df_all_brands[df_all_brands['brand'].isin(selected_brands)].copy()
             
-            if sort_by == "Autonomie":
-                df_filtered_brands = df_filtered_brands.sort_values('avg_range_km', ascending=False)
-                y_col = 'avg_range_km'
-                y_title = 'Autonomie moyenne (km)'
+                if sort_by == "Autonomie":
+                    df_filtered_brands = df_filtered_brands.sort_values('avg_range_km', ascending=False)
+                    y_col = 'avg_range_km'
+                    y_title = 'Autonomie moyenne (km)'
+                else:
+                    df_filtered_brands = df_filtered_brands.sort_values('nb_models', ascending=False)
+                    y_col = 'nb_models'
+                    y_title = 'Nombre de modèles'
+            
+                fig2 = cpx.bar(df_filtered_brands, x="brand", y=y_col,
+                             color=y_col, color_continuous_scale="Blues",
+                             hover_data=['avg_range_km', 'nb_models'])
+                fig2.update_layout(height=350, margin=dict(l=10, r=10, t=10, b=10), 
+                                 xaxis_title="Marque", yaxis_title=y_title)
+                st.plotly_chart(fig2, use_container_width=True)
+            
+                # Statistiques
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    best_brand = df_filtered_brands.nlargest(1, 'avg_range_km').iloc[0]
+                    st.metric("🏆 Meilleure Autonomie", best_brand['brand'], 
+                             f"{best_brand['avg_range_km']:.0f} km")
+                with col2:
+                    most_models = df_filtered_brands.nlargest(1, 'nb_models').iloc[0]
+                    st.metric("📊 Plus de Modèles", most_models['brand'], 
+                             f"{int(most_models['nb_models'])} modèles")
+                with col3:
+                    avg_all = df_filtered_brands['avg_range_km'].mean()
+                    st.metric("📈 Moyenne Générale", f"{avg_all:.0f} km")
             else:
-                df_filtered_brands = df_filtered_brands.sort_values('nb_models', ascending=False)
-                y_col = 'nb_models'
-                y_title = 'Nombre de modèles'
-            
-            fig2 = px.bar(df_filtered_brands, x="brand", y=y_col,
-                         color=y_col, color_continuous_scale="Blues",
-                         hover_data=['avg_range_km', 'nb_models'])
-            fig2.update_layout(height=350, margin=dict(l=10, r=10, t=10, b=10), 
-                             xaxis_title="Marque", yaxis_title=y_title)
-            st.plotly_chart(fig2, use_container_width=True)
-            
-            # Statistiques
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                best_brand = df_filtered_brands.nlargest(1, 'avg_range_km').iloc[0]
-                st.metric("🏆 Meilleure Autonomie", best_brand['brand'], 
-                         f"{best_brand['avg_range_km']:.0f} km")
-            with col2:
-                most_models = df_filtered_brands.nlargest(1, 'nb_models').iloc[0]
-                st.metric("📊 Plus de Modèles", most_models['brand'], 
-                         f"{int(most_models['nb_models'])} modèles")
-            with col3:
-                avg_all = df_filtered_brands['avg_range_km'].mean()
-                st.metric("📈 Moyenne Générale", f"{avg_all:.0f} km")
-        else:
-            st.info("👆 Sélectionnez au moins une marque pour voir la comparaison")
+                st.info("👆 Sélectionnez au moins une marque pour voir la comparaison")
         
-        st.markdown("</div>", unsafe_allow_html=True)
 
-    with tab3:
+
+    @timed_fragment("ev · Analyses Avancées")
+    def ev_tab_advanced():
         st.markdown("### 📊 Visualisations Avancées")
         
-        # Nouvelles requêtes pour EV
-        sql_scatter = """
-        SELECT brand, model, range_km, battery_capacity_kWh, top_speed_kmh, segment
-        FROM ev
-        WHERE brand IN (SELECT UNNEST(?))
-          AND segment IN (SELECT UNNEST(?))
-          AND range_km IS NOT NULL
-          AND battery_capacity_kWh IS NOT NULL;
-        """
-        df_scatter = q(sql_scatter, [brand_sel, segment_sel])
-        
-        sql_segment = """
-        SELECT 
-            segment,
-            COUNT(*) as nb_models,
-            AVG(range_km) as avg_range,
-            AVG(battery_capacity_kWh) as avg_battery
-        FROM ev
-        WHERE brand IN (SELECT UNNEST(?))
-          AND segment IN (SELECT UNNEST(?))
-          AND segment IS NOT NULL
-        GROUP BY segment
-        ORDER BY nb_models DESC;
-        """
-        df_segment = q(sql_segment, [brand_sel, segment_sel])
-        
-        sql_speed_dist = """
-        SELECT top_speed_kmh, brand, segment
-        FROM ev
-        WHERE brand IN (SELECT UNNEST(?))
-          AND segment IN (SELECT UNNEST(?))
-          AND top_speed_kmh IS NOT NULL;
-        """
-        df_speed = q(sql_speed_dist, [brand_sel, segment_sel])
+        # Requêtes indépendantes exécutées en parallèle (un curseur chacune)
+        ev_results = q_batch({
+            "scatter": kpi_query("ev.range_vs_battery", ev_filter),
+            "segment": kpi_query("ev.segments", ev_filter),
+            "speed_total": lambda: box_stats(q, "ev", "top_speed_kmh", ev_where_sql, ev_params),
+        })
+        df_scatter = ev_results["scatter"]
+        df_segment = ev_results["segment"]
+        df_speed_total = ev_results["speed_total"]
         
         # Ligne 1: Scatter et Segment comparison
         col1, col2 = st.columns(2, gap="large")
         
         with col1:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### ⚡ Autonomie vs Capacité Batterie (Interactif)")
-            
-            # Options de coloration
-            color_by = st.radio(
-                "Colorer par",
-                ["Segment", "Marque"],
-                horizontal=True,
-                key="scatter_color"
-            )
+            with section_card("ev · Autonomie vs Capacité Batterie"):
+                st.markdown("#### ⚡ Autonomie vs Capacité Batterie (Interactif)")
             
-            # Options de taille
-            size_by = st.selectbox(
-                "Taille des bulles selon",
-                ["Vitesse Max", "Autonomie"],
-                key="scatter_size"
-            )
+                # Options de coloration
+                color_by = st.radio(
+                    "Colorer par",
+                    ["Segment", "Marque"],
+                    horizontal=True,
+                    key="scatter_color"
+                )
+            
+                # Options de taille
+                size_by = st.selectbox(
+                    "Taille des bulles selon",
+                    ["Vitesse Max", "Autonomie"],
+                    key="scatter_size"
+                )
             
-            color_col = "segment" if color_by == "Segment" else "brand"
-            size_col = "top_speed_kmh" if size_by == "Vitesse Max" else "range_km"
+                color_col = "segment" if color_by == "Segment" else "brand"
+                size_col = "top_speed_kmh" if size_by == "Vitesse Max" else "range_km"
             
-            fig_scatter = px.scatter(df_scatter, 
-                                    x="battery_capacity_kWh", 
-                                    y="range_km",
-                                    color=color_col,
-                                    size=size_col,
-                                    hover_data=["brand", "model", "segment"],
-                                    color_discrete_sequence=px.colors.qualitative.Set2 if color_by == "Segment" else px.colors.qualitative.Plotly)
+                fig_scatter = cpx.scatter(df_scatter, 
+                                        x="battery_capacity_kWh", 
+                                        y="range_km",
+                                        color=color_col,
+                                        size=size_col,
+                                        hover_data=["brand", "model", "segment"],
+                                        color_discrete_sequence=px.colors.qualitative.Set2 if color_by == "Segment" else px.colors.qualitative.Plotly)
             
-            fig_scatter.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
-            fig_scatter.update_xaxes(title_text="Capacité Batterie (kWh)")
-            fig_scatter.update_yaxes(title_text="Autonomie (km)")
+                fig_scatter.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
+                fig_scatter.update_xaxes(title_text="Capacité Batterie (kWh)")
+                fig_scatter.update_yaxes(title_text="Autonomie (km)")
             
-            st.plotly_chart(fig_scatter, use_container_width=True)
-            st.caption("💡 Plus grande batterie = plus d'autonomie (corrélation positive)")
-            st.markdown("</div>", unsafe_allow_html=True)
+                st.plotly_chart(fig_scatter, use_container_width=True)
+                st.caption("💡 Plus grande batterie = plus d'autonomie (corrélation positive)")
         
         with col2:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 🚙 Comparaison par Segment")
-            
-            fig_segment = go.Figure()
-            
-            fig_segment.add_trace(go.Bar(
-                name='Nb Modèles',
-                x=df_segment['segment'],
-                y=df_segment['nb_models'],
-                marker_color='#1E78FF'
-            ))
-            
-            fig_segment.add_trace(go.Bar(
-                name='Autonomie Moy',
-                x=df_segment['segment'],
-                y=df_segment['avg_range'] / 10,  # Scale pour visibilité
-                marker_color='#5AA9FF'
-            ))
-            
-            fig_segment.update_layout(
-                barmode='group',
-                height=350,
-                margin=dict(l=10, r=10, t=30, b=10),
-                yaxis_title="Valeur"
-            )
+            with section_card("ev · Comparaison par Segment"):
+                st.markdown("#### 🚙 Comparaison par Segment")
+            
+                fig_segment = go.Figure()
+            
+                fig_segment.add_trace(go.Bar(
+                    name='Nb Modèles',
+                    x=df_segment['segment'],
+                    y=df_segment['nb_models'],
+                    marker_color='#1E78FF'
+                ))
+            
+                fig_segment.add_trace(go.Bar(
+                    name='Autonomie Moy',
+                    x=df_segment['segment'],
+                    y=df_segment['avg_range'] / 10,  # Scale pour visibilité
+                    marker_color='#5AA9FF'
+                ))
+            
+                fig_segment.update_layout(
+                    barmode='group',
+                    height=350,
+                    margin=dict(l=10, r=10, t=30, b=10),
+                    yaxis_title="Valeur"
+                )
             
-            st.plotly_chart(fig_segment, use_container_width=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+                st.plotly_chart(fig_segment, use_container_width=True)
         
         # Ligne 2: Distribution vitesse et Bubble chart
         col3, col4 = st.columns(2, gap="large")
         
         with col3:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 🏁 Distribution des Vitesses Max")
-            
-            # Options de visualisation
-            col_opt1, col_opt2 = st.columns(2)
-            
-            with col_opt1:
-                view_mode = st.radio(
-                    "Vue",
-                    ["Histogram", "Box Plot"],
-                    horizontal=True,
-                    key="speed_view"
-                )
-            
-            with col_opt2:
+            with section_card("ev · Distribution des Vitesses Max"):
+                st.markdown("#### 🏁 Distribution des Vitesses Max")
+            
+                # Options de visualisation
+                col_opt1, col_opt2 = st.columns(2)
+            
+                with col_opt1:
+                    view_mode = st.radio(
+                        "Vue",
+                        ["Histogram", "Box Plot"],
+                        horizontal=True,
+                        key="speed_view"
+                    )
+            
+                with col_opt2:
+                    if view_mode == "Histogram":
+                        auto_bins_speed = st.checkbox("Bins auto (Freedman–Diaconis)", value=False,
+                                                      key="speed_bins_auto")
+                        if not auto_bins_speed:
+                            n_bins_speed = st.slider("Bins", 10, 50, 30, key="speed_bins")
+            
+                # Distribution des vitesses : quartiles / bins calculés dans DuckDB (pas de lignes brutes)
                 if view_mode == "Histogram":
-                    n_bins_speed = st.slider("Bins", 10, 50, 30, key="speed_bins")
+                    df_speed_bins = histogram_bins(q, "ev", "top_speed_kmh", ev_where_sql, ev_params,
+                                                   bins=None if auto_bins_speed else n_bins_speed)
+                    fig_speed = create_prebinned_histogram(df_speed_bins,
+                                                           title_x="Vitesse Max (km/h)",
+                                                           title_y="Nombre de modèles")
+                else:
+                    # Box plot par segment
+                    df_speed_box = box_stats(q, "ev", "top_speed_kmh", ev_where_sql, ev_params, group="segment")
+                    df_speed_out = box_outliers(q, "ev", "top_speed_kmh", ev_where_sql, ev_params, group="segment")
+                    fig_speed = create_box_from_stats(df_speed_box, "segment", df_speed_out,
+                                                      colors=px.colors.qualitative.Set2,
+                                                      title_x="Segment",
+                                                      title_y="Vitesse Max (km/h)")
+            
+                st.plotly_chart(fig_speed, use_container_width=True)
+            
+                # Statistiques
+                avg_speed = df_speed_total['mean'].iloc[0] if len(df_speed_total) else float("nan")
+                max_speed = df_speed_total['max'].iloc[0] if len(df_speed_total) else float("nan")
+                col_s1, col_s2 = st.columns(2)
+                with col_s1:
+                    st.metric("Moyenne", f"{avg_speed:.0f} km/h")
+                with col_s2:
+                    st.metric("Maximum", f"{max_speed:.0f} km/h")
             
-            if view_mode == "Histogram":
-                fig_speed = px.histogram(df_speed, 
-                                        x="top_speed_kmh",
-                                        nbins=n_bins_speed,
-                                        color_discrete_sequence=['#1E78FF'])
-                
-                fig_speed.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
-                fig_speed.update_xaxes(title_text="Vitesse Max (km/h)")
-                fig_speed.update_yaxes(title_text="Nombre de modèles")
-            else:
-                # Box plot par segment
-                fig_speed = px.box(df_speed,
-                                  x="segment",
-                                  y="top_speed_kmh",
-                                  color="segment",
-                                  color_discrete_sequence=px.colors.qualitative.Set2)
-                
-                fig_speed.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10),
-                                      showlegend=False)
-                fig_speed.update_xaxes(title_text="Segment")
-                fig_speed.update_yaxes(title_text="Vitesse Max (km/h)")
-            
-            st.plotly_chart(fig_speed, use_container_width=True)
-            
-            # Statistiques
-            avg_speed = df_speed['top_speed_kmh'].mean()
-            max_speed = df_speed['top_speed_kmh'].max()
-            col_s1, col_s2 = st.columns(2)
-            with col_s1:
-                st.metric("Moyenne", f"{avg_speed:.0f} km/h")
-            with col_s2:
-                st.metric("Maximum", f"{max_speed:.0f} km/h")
-            
-            st.markdown("</div>", unsafe_allow_html=True)
         
         with col4:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 🎯 Bubble Chart Multi-Dimensions (Interactif)")
-            
-            # Obtenir toutes les marques disponibles dans df_scatter
-            available_brands = sorted(df_scatter['brand'].unique().tolist())
-            
-            # Widget pour choisir les marques
-            selected_bubble_brands = st.multiselect(
-                "Choisir les marques à afficher",
-                options=available_brands,
-                default=available_brands[:5] if len(available_brands) >= 5 else available_brands,
-                key="bubble_brands"
-            )
+            with section_card("ev · Bubble Chart Multi-Dimensions"):
+                st.markdown("#### 🎯 Bubble Chart Multi-Dimensions (Interactif)")
+            
+                # Obtenir toutes les marques disponibles dans df_scatter
+                available_brands = sorted(df_scatter['brand'].unique().tolist())
+            
+                # Widget pour choisir les marques
+                selected_bubble_brands = st.multiselect(
+                    "Choisir les marques à afficher",
+                    options=available_brands,
+                    default=available_brands[:5] if len(available_brands) >= 5 else available_brands,
+                    key="bubble_brands"
+                )
             
-            # Slider pour nombre de modèles
-            n_models = st.slider(
-                "Nombre de modèles (top autonomie)",
-                min_value=5, max_value=50, value=20,
-                key="bubble_n_models"
-            )
+                # Slider pour nombre de modèles
+                n_models = st.slider(
+                    "Nombre de modèles (top autonomie)",
+                    min_value=5, max_value=50, value=20,
+                    key="bubble_n_models"
+                )
             
-            if selected_bubble_brands:
-                # Filtrer par marques sélectionnées
-                df_bubble_filtered = df_scatter[df_scatter['brand'].isin(selected_bubble_brands)]
-                df_bubble = df_bubble_filtered.nlargest(n_models, 'range_km')
+                if selected_bubble_brands:
+                    # Filtrer par marques sélectionnées
+                    df_bubble_filtered = df_scatter[df_scatter['brand'].isin(selected_bubble_brands)]
+                    df_bubble = df_bubble_filtered.nlargest(n_models, 'range_km')
                 
-                if len(df_bubble) > 0:
-                    fig_bubble = px.scatter(df_bubble,
-                                           x="battery_capacity_kWh",
-                                           y="top_speed_kmh",
-                                           size="range_km",
-                                           color="brand",
-                                           hover_name="model",
-                                           hover_data={
-                                               'range_km': ':.0f',
-                                               'battery_capacity_kWh': ':.1f',
-                                               'top_speed_kmh': ':.0f',
-                                               'segment': True
-                                           },
-                                           size_max=60)
+                    if len(df_bubble) > 0:
+                        fig_bubble = cpx.scatter(df_bubble,
+                                               x="battery_capacity_kWh",
+                                               y="top_speed_kmh",
+                                               size="range_km",
+                                               color="brand",
+                                               hover_name="model",
+                                               hover_data={
+                                                   'range_km': ':.0f',
+                                                   'battery_capacity_kWh': ':.1f',
+                                                   'top_speed_kmh': ':.0f',
+                                                   'segment': True
+                                               },
+                                               size_max=60)
                     
-                    fig_bubble.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
-                    fig_bubble.update_xaxes(title_text="Batterie (kWh)")
-                    fig_bubble.update_yaxes(title_text="Vitesse Max (km/h)")
+                        fig_bubble.update_layout(height=280, margin=dict(l=10, r=10, t=10, b=10))
+                        fig_bubble.update_xaxes(title_text="Batterie (kWh)")
+                        fig_bubble.update_yaxes(title_text="Vitesse Max (km/h)")
                     
-                    st.plotly_chart(fig_bubble, use_container_width=True)
+                        st.plotly_chart(fig_bubble, use_container_width=True)
                     
-                    # Légende explicative
-                    st.caption("💡 **Taille de bulle** = Autonomie (km) | **Couleur** = Marque")
+                        # Légende explicative
+                        st.caption("💡 **Taille de bulle** = Autonomie (km) | **Couleur** = Marque")
+                    else:
+                        st.warning("Aucun modèle trouvé pour ces marques")
                 else:
-                    st.warning("Aucun modèle trouvé pour ces marques")
-            else:
-                st.info("👆 Sélectionnez au moins une marque pour voir le bubble chart")
+                    st.info("👆 Sélectionnez au moins une marque pour voir le bubble chart")
             
-            st.markdown("</div>", unsafe_allow_html=True)
 
-    with tab4:
+
+    @timed_fragment("ev · Comparateur")
+    def ev_tab_comparator():
         st.markdown("### 🔬 Comparateur de Caractéristiques (Personnalisable)")
         
         st.info("💡 Créez vos propres graphiques en choisissant les axes X et Y pour chaque visualisation!")
         
-        # Requête pour obtenir toutes les données
-        sql_all_features = """
-        SELECT 
-            brand, model, top_speed_kmh, battery_capacity_kWh, 
-            torque_nm, efficiency_wh_per_km, range_km, acceleration_0_100_s,
-            fast_charging_power_kw_dc, towing_capacity_kg, cargo_volume_l, 
-            seats, segment, length_mm, width_mm, height_mm
-        FROM ev
-        WHERE brand IN (SELECT UNNEST(?))
-          AND segment IN (SELECT UNNEST(?));
-        """
-        df_all_features = q(sql_all_features, [brand_sel, segment_sel])
+        df_all_features = run_kpi(q, "ev.features", ev_filter)
         
         # Liste des caractéristiques numériques disponibles
         numeric_features = {
@@ -1224,132 +1233,128 @@ else:
         col1, col2 = st.columns(2, gap="large")
         
         with col1:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📊 Graphique 1")
-            
-            col_x1, col_y1, col_c1 = st.columns(3)
-            with col_x1:
-                x_axis_1 = st.selectbox("Axe X", list(numeric_features.keys()), 
-                                       format_func=lambda x: numeric_features[x],
-                                       key="x1", index=1)  # battery_capacity_kWh
-            with col_y1:
-                y_axis_1 = st.selectbox("Axe Y", list(numeric_features.keys()),
-                                       format_func=lambda x: numeric_features[x],
-                                       key="y1", index=4)  # range_km
-            with col_c1:
-                color_1 = st.selectbox("Couleur", ["segment", "brand"], key="c1")
-            
-            # Filtrer les données avec valeurs non nulles
-            df_plot1 = df_all_features.dropna(subset=[x_axis_1, y_axis_1])
-            
-            if len(df_plot1) > 0:
-                fig1 = px.scatter(df_plot1, x=x_axis_1, y=y_axis_1, color=color_1,
-                                 hover_data=["brand", "model"],
-                                 color_discrete_sequence=px.colors.qualitative.Set2)
-                fig1.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
-                fig1.update_xaxes(title_text=numeric_features[x_axis_1])
-                fig1.update_yaxes(title_text=numeric_features[y_axis_1])
-                st.plotly_chart(fig1, use_container_width=True)
-            else:
-                st.warning("Pas assez de données pour ces axes")
+            with section_card("ev · Graphique 1"):
+                st.markdown("#### 📊 Graphique 1")
+            
+                col_x1, col_y1, col_c1 = st.columns(3)
+                with col_x1:
+                    x_axis_1 = st.selectbox("Axe X", list(numeric_features.keys()), 
+                                           format_func=lambda x: numeric_features[x],
+                                           key="x1", index=1)  # battery_capacity_kWh
+                with col_y1:
+                    y_axis_1 = st.selectbox("Axe Y", list(numeric_features.keys()),
+                                           format_func=lambda x: numeric_features[x],
+                                           key="y1", index=4)  # range_km
+                with col_c1:
+                    color_1 = st.selectbox("Couleur", ["segment", "brand"], key="c1")
+            
+                # Filtrer les données avec valeurs non nulles
+                df_plot1 = df_all_features.dropna(subset=[x_axis_1, y_axis_1])
+            
+                if len(df_plot1) > 0:
+                    fig1 = cpx.scatter(df_plot1, x=x_axis_1, y=y_axis_1, color=color_1,
+                                     hover_data=["brand", "model"],
+                                     color_discrete_sequence=px.colors.qualitative.Set2)
+                    fig1.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
+                    fig1.update_xaxes(title_text=numeric_features[x_axis_1])
+                    fig1.update_yaxes(title_text=numeric_features[y_axis_1])
+                    st.plotly_chart(fig1, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour ces axes")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         with col2:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📊 Graphique 2")
-            
-            col_x2, col_y2, col_c2 = st.columns(3)
-            with col_x2:
-                x_axis_2 = st.selectbox("Axe X", list(numeric_features.keys()),
-                                       format_func=lambda x: numeric_features[x],
-                                       key="x2", index=0)  # top_speed_kmh
-            with col_y2:
-                y_axis_2 = st.selectbox("Axe Y", list(numeric_features.keys()),
-                                       format_func=lambda x: numeric_features[x],
-                                       key="y2", index=5)  # acceleration_0_100_s
-            with col_c2:
-                color_2 = st.selectbox("Couleur", ["segment", "brand"], key="c2")
-            
-            df_plot2 = df_all_features.dropna(subset=[x_axis_2, y_axis_2])
-            
-            if len(df_plot2) > 0:
-                fig2 = px.scatter(df_plot2, x=x_axis_2, y=y_axis_2, color=color_2,
-                                 hover_data=["brand", "model"],
-                                 color_discrete_sequence=px.colors.qualitative.Plotly)
-                fig2.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
-                fig2.update_xaxes(title_text=numeric_features[x_axis_2])
-                fig2.update_yaxes(title_text=numeric_features[y_axis_2])
-                st.plotly_chart(fig2, use_container_width=True)
-            else:
-                st.warning("Pas assez de données pour ces axes")
+            with section_card("ev · Graphique 2"):
+                st.markdown("#### 📊 Graphique 2")
+            
+                col_x2, col_y2, col_c2 = st.columns(3)
+                with col_x2:
+                    x_axis_2 = st.selectbox("Axe X", list(numeric_features.keys()),
+                                           format_func=lambda x: numeric_features[x],
+                                           key="x2", index=0)  # top_speed_kmh
+                with col_y2:
+                    y_axis_2 = st.selectbox("Axe Y", list(numeric_features.keys()),
+                                           format_func=lambda x: numeric_features[x],
+                                           key="y2", index=5)  # acceleration_0_100_s
+                with col_c2:
+                    color_2 = st.selectbox("Couleur", ["segment", "brand"], key="c2")
+            
+                df_plot2 = df_all_features.dropna(subset=[x_axis_2, y_axis_2])
+            
+                if len(df_plot2) > 0:
+                    fig2 = cpx.scatter(df_plot2, x=x_axis_2, y=y_axis_2, color=color_2,
+                                     hover_data=["brand", "model"],
+                                     color_discrete_sequence=px.colors.qualitative.Plotly)
+                    fig2.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
+                    fig2.update_xaxes(title_text=numeric_features[x_axis_2])
+                    fig2.update_yaxes(title_text=numeric_features[y_axis_2])
+                    st.plotly_chart(fig2, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour ces axes")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         # Ligne 2
         col3, col4 = st.columns(2, gap="large")
         
         with col3:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📊 Graphique 3")
-            
-            col_x3, col_y3, col_c3 = st.columns(3)
-            with col_x3:
-                x_axis_3 = st.selectbox("Axe X", list(numeric_features.keys()),
-                                       format_func=lambda x: numeric_features[x],
-                                       key="x3", index=2)  # torque_nm
-            with col_y3:
-                y_axis_3 = st.selectbox("Axe Y", list(numeric_features.keys()),
-                                       format_func=lambda x: numeric_features[x],
-                                       key="y3", index=0)  # top_speed_kmh
-            with col_c3:
-                color_3 = st.selectbox("Couleur", ["segment", "brand"], key="c3")
-            
-            df_plot3 = df_all_features.dropna(subset=[x_axis_3, y_axis_3])
-            
-            if len(df_plot3) > 0:
-                fig3 = px.scatter(df_plot3, x=x_axis_3, y=y_axis_3, color=color_3,
-                                 hover_data=["brand", "model"],
-                                 color_discrete_sequence=px.colors.qualitative.Safe)
-                fig3.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
-                fig3.update_xaxes(title_text=numeric_features[x_axis_3])
-                fig3.update_yaxes(title_text=numeric_features[y_axis_3])
-                st.plotly_chart(fig3, use_container_width=True)
-            else:
-                st.warning("Pas assez de données pour ces axes")
+            with section_card("ev · Graphique 3"):
+                st.markdown("#### 📊 Graphique 3")
+            
+                col_x3, col_y3, col_c3 = st.columns(3)
+                with col_x3:
+                    x_axis_3 = st.selectbox("Axe X", list(numeric_features.keys()),
+                                           format_func=lambda x: numeric_features[x],
+                                           key="x3", index=2)  # torque_nm
+                with col_y3:
+                    y_axis_3 = st.selectbox("Axe Y", list(numeric_features.keys()),
+                                           format_func=lambda x: numeric_features[x],
+                                           key="y3", index=0)  # top_speed_kmh
+                with col_c3:
+                    color_3 = st.selectbox("Couleur", ["segment", "brand"], key="c3")
+            
+                df_plot3 = df_all_features.dropna(subset=[x_axis_3, y_axis_3])
+            
+                if len(df_plot3) > 0:
+                    fig3 = cpx.scatter(df_plot3, x=x_axis_3, y=y_axis_3, color=color_3,
+                                     hover_data=["brand", "model"],
+                                     color_discrete_sequence=px.colors.qualitative.Safe)
+                    fig3.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
+                    fig3.update_xaxes(title_text=numeric_features[x_axis_3])
+                    fig3.update_yaxes(title_text=numeric_features[y_axis_3])
+                    st.plotly_chart(fig3, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour ces axes")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         with col4:
-            st.markdown('<div class="section-card">', unsafe_allow_html=True)
-            st.markdown("#### 📊 Graphique 4")
-            
-            col_x4, col_y4, col_c4 = st.columns(3)
-            with col_x4:
-                x_axis_4 = st.selectbox("Axe X", list(numeric_features.keys()),
-                                       format_func=lambda x: numeric_features[x],
-                                       key="x4", index=3)  # efficiency_wh_per_km
-            with col_y4:
-                y_axis_4 = st.selectbox("Axe Y", list(numeric_features.keys()),
-                                       format_func=lambda x: numeric_features[x],
-                                       key="y4", index=4)  # range_km
-            with col_c4:
-                color_4 = st.selectbox("Couleur", ["segment", "brand"], key="c4")
-            
-            df_plot4 = df_all_features.dropna(subset=[x_axis_4, y_axis_4])
-            
-            if len(df_plot4) > 0:
-                fig4 = px.scatter(df_plot4, x=x_axis_4, y=y_axis_4, color=color_4,
-                                 hover_data=["brand", "model"],
-                                 color_discrete_sequence=px.colors.qualitative.Pastel)
-                fig4.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
-                fig4.update_xaxes(title_text=numeric_features[x_axis_4])
-                fig4.update_yaxes(title_text=numeric_features[y_axis_4])
-                st.plotly_chart(fig4, use_container_width=True)
-            else:
-                st.warning("Pas assez de données pour ces axes")
+            with section_card("ev · Graphique 4"):
+                st.markdown("#### 📊 Graphique 4")
+            
+                col_x4, col_y4, col_c4 = st.columns(3)
+                with col_x4:
+                    x_axis_4 = st.selectbox("Axe X", list(numeric_features.keys()),
+                                           format_func=lambda x: numeric_features[x],
+                                           key="x4", index=3)  # efficiency_wh_per_km
+                with col_y4:
+                    y_axis_4 = st.selectbox("Axe Y", list(numeric_features.keys()),
+                                           format_func=lambda x: numeric_features[x],
+                                           key="y4", index=4)  # range_km
+                with col_c4:
+                    color_4 = st.selectbox("Couleur", ["segment", "brand"], key="c4")
+            
+                df_plot4 = df_all_features.dropna(subset=[x_axis_4, y_axis_4])
+            
+                if len(df_plot4) > 0:
+                    fig4 = cpx.scatter(df_plot4, x=x_axis_4, y=y_axis_4, color=color_4,
+                                     hover_data=["brand", "model"],
+                                     color_discrete_sequence=px.colors.qualitative.Pastel)
+                    fig4.update_layout(height=300, margin=dict(l=10, r=10, t=10, b=10))
+                    fig4.update_xaxes(title_text=numeric_features[x_axis_4])
+                    fig4.update_yaxes(title_text=numeric_features[y_axis_4])
+                    st.plotly_chart(fig4, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour ces axes")
             
-            st.markdown("</div>", unsafe_allow_html=True)
         
         # Suggestions de comparaisons intéressantes
         st.markdown("---")
@@ -1363,15 +1368,110 @@ else:
         with col_s3:
             st.info("**📐 Design**\n- Longueur vs Cargo\n- Largeur vs Sièges")
 
+
+    @timed_fragment("ev · Détails")
+    def ev_tab_details():
+        with section_card("ev · Aperçu (50 lignes)"):
+            st.markdown("### Aperçu (50 lignes)")
+            st.dataframe(run_kpi(q, "ev.preview", ev_filter), use_container_width=True, height=420)
+
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["🚗 Top Autonomie", "🏷️ Marques", "📊 Analyses Avancées", "🔬 Comparateur", "🧾 Détails"],
+                                           key="ev_tabs", on_change="rerun")
+
+    with tab1:
+        if tab1.open:
+            ev_tab_top_range()
+
+    with tab2:
+        if tab2.open:
+            ev_tab_brands()
+
+    with tab3:
+        if tab3.open:
+            ev_tab_advanced()
+
+    with tab4:
+        if tab4.open:
+            ev_tab_comparator()
+
     with tab5:
-        st.markdown('<div class="section-card">', unsafe_allow_html=True)
-        st.markdown("### Aperçu (50 lignes)")
-        sql_preview = """
-        SELECT brand, model, segment, range_km, battery_capacity_kWh, top_speed_kmh, drivetrain, seats
-        FROM ev
-        WHERE brand IN (SELECT UNNEST(?))
-          AND segment IN (SELECT UNNEST(?))
-        LIMIT 50;
-        """
-        st.dataframe(q(sql_preview, [brand_sel, segment_sel]), use_container_width=True, height=420)
-        st.markdown("</div>", unsafe_allow_html=True)
+        if tab5.open:
+            ev_tab_details()
+
+# ---------------------------
+# Query cache stats
+# ---------------------------
+cache_stats = get_query_cache(data_source).stats()
+st.sidebar.markdown("---")
+st.sidebar.caption(
+    f"Cache requêtes : {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+    f"{cache_stats['entries']} entrées ({cache_stats['bytes'] / 1024 / 1024:.1f} Mo)"
+)
+figure_stats = figure_cache.stats()
+st.sidebar.caption(
+    f"Cache graphiques : {figure_stats['hits']} hits · {figure_stats['misses']} misses · "
+    f"{figure_stats['entries']} figures ({figure_stats['bytes'] / 1024 / 1024:.1f} Mo)"
+)
+pool_stats = get_pool(data_source).stats()
+st.sidebar.caption(
+    f"Pool DuckDB : {pool_stats['created']}/{pool_stats['size']} curseurs · "
+    f"{pool_stats['in_use']} utilisés · attente moy. {pool_stats['avg_wait_ms']:.1f} ms "
+    f"(max {pool_stats['max_wait_ms']:.1f} ms)"
+)
+
+# ---------------------------
+# Latence par section (fragments)
+# ---------------------------
+df_fragment_timings = fragment_timings()
+if len(df_fragment_timings):
+    with st.sidebar.expander("⏱️ Latence par section"):
+        st.dataframe(
+            df_fragment_timings.round(1),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+# ---------------------------
+# Panneau Performance (requêtes et sections du dernier rerun)
+# ---------------------------
+@st.fragment(run_every=PERF_PANEL_REFRESH_S)
+def perf_panel():
+    # Fragment rafraîchi périodiquement : un rerun limité à un onglet (fragment) a son propre
+    # numéro de run, le panneau affiche donc toujours le dernier rerun, complet ou partiel
+    with st.expander("Requêtes et sections du rerun", expanded=True):
+        df_queries = run_events("query")
+        df_sections = run_events("section")
+        df_run = run_events("run")
+        run_label = df_run["name"].iloc[0] if len(df_run) else dataset
+        run_ms = df_run["wall_ms"].iloc[0] if len(df_run) else 0.0
+        st.caption(
+            f"Rerun ({run_label}) : {run_ms:.0f} ms · {len(df_queries)} requêtes "
+            f"({int((~df_queries['cached'].astype(bool)).sum())} exécutées, "
+            f"{df_queries['db_ms'].sum():.0f} ms DuckDB)"
+        )
+        st.dataframe(df_queries.round(1), hide_index=True, use_container_width=True)
+        st.dataframe(df_sections.round(1), hide_index=True, use_container_width=True)
+
+        # Profil DuckDB d'une requête du rerun, à la demande (gardé entre deux rafraîchissements)
+        if len(df_queries):
+            fingerprint = st.selectbox(
+                "EXPLAIN ANALYZE",
+                df_queries["name"].unique().tolist(),
+                format_func=lambda name: f"{name} · {df_queries.loc[df_queries['name'] == name, 'sql'].iloc[0][:50]}",
+                key="perf_explain_query",
+            )
+            if st.button("Profiler", key="perf_explain_run"):
+                pool = get_pool(data_source)
+                with pool.connection(owner=_session_id()) as con:
+                    st.session_state["perf_explain_profile"] = (fingerprint, explain_analyze(con, fingerprint))
+            profiled, profile = st.session_state.get("perf_explain_profile", (None, None))
+            if profiled == fingerprint:
+                st.code(profile, language=None)
+
+record_event({"kind": "run", "name": dataset, "wall_ms": (time.perf_counter() - run_start) * 1000})
+if st.sidebar.checkbox("🩺 Performance", key="show_perf_panel"):
+    with st.sidebar:
+        perf_panel()
+    if PERF_LOG_PATH:
+        st.sidebar.caption(f"Journal : {PERF_LOG_PATH}")
@@ -0,0 +1,143 @@
+"""
+Arrow result path
+Keeps large query results as pyarrow Tables (no pandas conversion) and hands
+their columns to Plotly as NumPy views
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from downsampling import downsample_indices
+from figure_cache import memoize_figure
+from lazy_imports import lazy_import
+
+go = lazy_import("plotly.graph_objects")
+
+
+# ========================================
+# FETCH
+# ========================================
+
+def fetch_arrow(cursor):
+    """
+    Fetch the result of an executed DuckDB query as a pyarrow Table
+
+    Args:
+        cursor: DuckDB connection/cursor after `execute`
+
+    Returns:
+        pyarrow.Table
+    """
+    # `to_arrow_table` replaces `fetch_arrow_table` in recent DuckDB releases
+    if hasattr(cursor, "to_arrow_table"):
+        return cursor.to_arrow_table()
+    return cursor.fetch_arrow_table()
+
+
+# ========================================
+# COLUMN ACCESS
+# ========================================
+
+def column_view(table, name):
+    """
+    NumPy view of a column (no copy for single-chunk numeric columns without nulls)
+
+    Args:
+        table: pyarrow Table
+        name: Column name
+
+    Returns:
+        numpy array
+    """
+    column = table.column(name)
+    if column.num_chunks != 1:
+        column = column.combine_chunks()
+    else:
+        column = column.chunk(0)
+    return column.to_numpy(zero_copy_only=False)
+
+
+def filter_isin(table, column, values):
+    """
+    Rows of `table` whose `column` is in `values` (Arrow compute, no pandas)
+
+    Args:
+        table: pyarrow Table
+        column: Column name
+        values: Iterable of accepted values
+
+    Returns:
+        pyarrow Table
+    """
+    value_set = pa.array(list(values), type=table.schema.field(column).type)
+    return table.filter(pc.is_in(table.column(column), value_set=value_set))
+
+
+def group_slices(table, column):
+    """
+    Contiguous row ranges of each value of `column`
+
+    The table must be sorted on `column` (e.g. ORDER BY Store_Number, Date):
+    each group is then a zero-copy slice of the column views.
+
+    Args:
+        table: pyarrow Table sorted on `column`
+        column: Grouping column
+
+    Returns:
+        List of (value, start, stop)
+    """
+    keys = column_view(table, column)
+    if len(keys) == 0:
+        return []
+    bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate(([0], bounds))
+    stops = np.concatenate((bounds, [len(keys)]))
+    return [(keys[start], start, stop) for start, stop in zip(starts, stops)]
+
+
+# ========================================
+# CHARTS
+# ========================================
+
+@memoize_figure
+def create_arrow_line_chart(table, x, y, color, colors=None, max_points=None, method="lttb"):
+    """
+    Line chart with one trace per value of `color`, built from Arrow columns
+
+    Equivalent of px.line(df, x, y, color=color) without the pandas round-trip:
+    every trace receives slices of the same NumPy views.
+
+    Args:
+        table: pyarrow Table sorted on (color, x)
+        x: Column for x-axis
+        y: Column for y-axis
+        color: Column used to split the traces
+        colors: Color sequence (cycled)
+        max_points: Point budget per trace (None = every point)
+        method: Downsampling method ("lttb" or "minmax", see downsampling.py)
+
+    Returns:
+        Plotly figure
+    """
+    x_values = column_view(table, x)
+    y_values = column_view(table, y)
+    colors = colors or [None]
+
+    fig = go.Figure()
+    for i, (value, start, stop) in enumerate(group_slices(table, color)):
+        trace_x, trace_y = x_values[start:stop], y_values[start:stop]
+        if max_points is not None and len(trace_y) > max_points:
+            idx = downsample_indices(trace_x, trace_y, max_points, method)
+            trace_x, trace_y = trace_x[idx], trace_y[idx]
+        fig.add_trace(go.Scatter(
+            x=trace_x,
+            y=trace_y,
+            mode="lines",
+            name=str(value),
+            legendgroup=str(value),
+            line=dict(color=colors[i % len(colors)]),
+        ))
+    fig.update_layout(legend_title_text=color)
+    return fig
@@ -0,0 +1,138 @@
+"""
+Dimension catalog
+Sidebar filter options (distinct values, counts, date bounds, column statistics)
+read from the small catalog tables maintained by sql/duckdb_loader.py, so that
+building the sidebar does not depend on the size of the fact tables
+"""
+
+import datetime
+
+
+# Catalog tables written by duckdb_loader.refresh_catalog
+CATALOG_VALUES_TABLE = "_catalog_values"
+CATALOG_COLUMNS_TABLE = "_catalog_columns"
+
+# Dimensions listed in the catalog (same as duckdb_loader.DIMENSION_COLUMNS)
+DIMENSION_COLUMNS = {
+    "walmart": ["Store_Number", "Holiday_Flag"],
+    "ev": ["brand", "segment"],
+}
+# Columns whose bounds are read by the sidebar (fallback scan only)
+BOUND_COLUMNS = {
+    "walmart": ["Date"],
+    "ev": [],
+}
+
+INTEGER_TYPES = {"TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT",
+                 "UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT"}
+FLOAT_TYPES = {"FLOAT", "DOUBLE"}
+
+
+def _typed(value, column_type):
+    """Catalog text value -> Python value of the column type"""
+    if value is None:
+        return None
+    if column_type in INTEGER_TYPES:
+        return int(value)
+    if column_type in FLOAT_TYPES or column_type.startswith("DECIMAL"):
+        return float(value)
+    if column_type == "DATE":
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def _empty_catalog():
+    return {"values": {}, "counts": {}, "columns": {}}
+
+
+# ========================================
+# READING
+# ========================================
+
+def read_catalog(run_query, table_name):
+    """
+    Catalog of `table_name` from the catalog tables
+
+    Args:
+        run_query: Callable(sql, params) -> DataFrame
+        table_name: Fact table ("walmart" or "ev")
+
+    Returns:
+        Dict with
+        - values: column -> sorted non-null distinct values (dimensions)
+        - counts: column -> {value: row count} (dimensions)
+        - columns: column -> {type, rows, nulls, distinct, min, max} (every column)
+        None when the tables are missing or do not describe `table_name`
+    """
+    tables = run_query(
+        "SELECT table_name FROM duckdb_tables() WHERE table_name IN (?, ?)",
+        [CATALOG_VALUES_TABLE, CATALOG_COLUMNS_TABLE],
+    )
+    if len(tables) < 2:
+        return None
+
+    df_columns = run_query(f"""
+        SELECT column_name, column_type, row_count, null_count, approx_distinct, min_value, max_value
+        FROM {CATALOG_COLUMNS_TABLE}
+        WHERE table_name = ?
+    """, [table_name])
+    if df_columns.empty:
+        return None
+    df_values = run_query(f"""
+        SELECT column_name, value, row_count
+        FROM {CATALOG_VALUES_TABLE}
+        WHERE table_name = ? AND value IS NOT NULL
+    """, [table_name])
+
+    catalog = _empty_catalog()
+    types = {}
+    for row in df_columns.itertuples(index=False):
+        types[row.column_name] = row.column_type
+        catalog["columns"][row.column_name] = {
+            "type": row.column_type,
+            "rows": int(row.row_count),
+            "nulls": int(row.null_count),
+            "distinct": int(row.approx_distinct),
+            "min": _typed(row.min_value, row.column_type),
+            "max": _typed(row.max_value, row.column_type),
+        }
+    for column, group in df_values.groupby("column_name"):
+        counts = {_typed(v, types.get(column, "VARCHAR")): int(n)
+                  for v, n in zip(group["value"], group["row_count"])}
+        catalog["counts"][column] = counts
+        catalog["values"][column] = sorted(counts)
+    return catalog
+
+
+def scan_catalog(run_query, table_name):
+    """
+    Same content as read_catalog (dimensions and bound columns only), computed
+    from the fact table - for databases loaded before the catalog existed
+
+    Args:
+        run_query: Callable(sql, params) -> DataFrame
+        table_name: Fact table ("walmart" or "ev")
+
+    Returns:
+        Catalog dict (see read_catalog)
+    """
+    catalog = _empty_catalog()
+    for column in DIMENSION_COLUMNS.get(table_name, []):
+        df = run_query(f"""
+            SELECT {column} AS value, COUNT(*) AS row_count
+            FROM {table_name}
+            WHERE {column} IS NOT NULL
+            GROUP BY ALL
+            ORDER BY value
+        """, None)
+        catalog["counts"][column] = dict(zip(df["value"].tolist(), df["row_count"].astype(int).tolist()))
+        catalog["values"][column] = df["value"].tolist()
+    for column in BOUND_COLUMNS.get(table_name, []):
+        df = run_query(f"SELECT MIN({column}) AS lo, MAX({column}) AS hi FROM {table_name}", None)
+        catalog["columns"][column] = {"min": df["lo"].iloc[0], "max": df["hi"].iloc[0]}
+    return catalog
+
+
+def load_catalog(run_query, table_name):
+    """Catalog of `table_name`: the catalog tables when present, else a scan of the table"""
+    return read_catalog(run_query, table_name) or scan_catalog(run_query, table_name)
@@ -0,0 +1,242 @@
+"""
+DuckDB connection pool
+Hands out cursors of one shared database so that concurrent sessions run
+their queries in parallel instead of serializing on a single connection
+"""
+
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Default pool size: one cursor per core
+DEFAULT_POOL_SIZE = os.cpu_count() or 4
+
+
+class PoolClosedError(RuntimeError):
+    """Checkout from a pool whose base connection is closed (retired or closed)"""
+
+
+# ========================================
+# CONNECTION POOL
+# ========================================
+
+class ConnectionPool:
+    """
+    Fixed-size pool of DuckDB cursors (`con.cursor()`) over one database
+
+    - Cursors are created lazily, up to `size`
+    - A thread that already holds a cursor gets the same one back
+      (nested queries of one script run never wait on themselves)
+    - Idle cursors are checked with `SELECT 1` before reuse and replaced
+      if broken
+    - Wait time, timeouts and the cursors held by each owner (session) are
+      exposed through `stats()`
+    - `retire()` closes the pool once the cursors checked out are returned
+      (swap in a new pool when the data changes, without breaking queries
+      still running on the old one)
+    """
+
+    def __init__(self, connect, size=DEFAULT_POOL_SIZE, timeout=30.0,
+                 health_check_after=60.0):
+        """
+        Args:
+            connect: Callable returning the base DuckDB connection
+            size: Maximum number of cursors
+            timeout: Seconds to wait for a free cursor before raising TimeoutError
+            health_check_after: Idle seconds after which a cursor is checked
+        """
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+
+        self._con = connect()
+        self._idle = queue.LifoQueue()  # (cursor, released_at)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._created = 0
+        self._in_use = 0
+        self._leases = 0  # checkouts started (waiting or holding a cursor)
+        self._retired = False
+        self._closed = False
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.health_failures = 0
+        self.in_use_by_owner = {}
+
+    def _new_cursor(self):
+        return self._con.cursor()
+
+    def _healthy(self, cursor, released_at):
+        if time.monotonic() - released_at < self.health_check_after:
+            return True
+        try:
+            cursor.execute("SELECT 1").fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self):
+        # Free cursor first, then a new one while below `size`, else wait
+        try:
+            return self._idle.get_nowait(), 0.0
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return (self._new_cursor(), time.monotonic()), 0.0
+        start = time.perf_counter()
+        try:
+            entry = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"No DuckDB cursor available after {self.timeout}s "
+                               f"(pool size {self.size})")
+        return entry, time.perf_counter() - start
+
+    @contextmanager
+    def connection(self, owner=None):
+        """
+        Check out a cursor for the duration of the `with` block
+
+        Args:
+            owner: Label used in the per-owner metrics (e.g. Streamlit session id)
+
+        Yields:
+            DuckDB cursor
+        """
+        held = getattr(self._local, "cursor", None)
+        if held is not None:
+            yield held
+            return
+
+        with self._lock:
+            if self._closed:
+                raise PoolClosedError("DuckDB connection pool is closed")
+            self._leases += 1
+        try:
+            (cursor, released_at), waited = self._acquire()
+        except BaseException:
+            self._release_lease()
+            raise
+        if not self._healthy(cursor, released_at):
+            with self._lock:
+                self.health_failures += 1
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            cursor = self._new_cursor()
+
+        with self._lock:
+            self._in_use += 1
+            self.checkouts += 1
+            self.in_use_by_owner[owner] = self.in_use_by_owner.get(owner, 0) + 1
+            if waited > 0:
+                self.waits += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self._local.cursor = cursor
+        try:
+            yield cursor
+        finally:
+            self._local.cursor = None
+            with self._lock:
+                self._in_use -= 1
+                self.in_use_by_owner[owner] -= 1
+                if not self.in_use_by_owner[owner]:
+                    del self.in_use_by_owner[owner]
+            self._idle.put((cursor, time.monotonic()))
+            self._release_lease()
+
+    def _release_lease(self):
+        with self._lock:
+            self._leases -= 1
+            drained = self._retired and not self._leases and not self._closed
+            self._closed = self._closed or drained
+        if drained:
+            self._close_all()
+
+    def stats(self):
+        """
+        Pool counters
+
+        Returns:
+            Dict with size, created, in_use, checkouts, waits, avg/max wait (ms),
+            timeouts, health_failures, sessions (owners currently holding a cursor)
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "avg_wait_ms": self.wait_seconds / self.waits * 1000 if self.waits else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "timeouts": self.timeouts,
+                "health_failures": self.health_failures,
+                "sessions": len(self.in_use_by_owner),
+            }
+
+    def retire(self):
+        """
+        Close the pool once every checked-out cursor is returned (immediately
+        when none is in use); later checkouts raise PoolClosedError
+        """
+        with self._lock:
+            self._retired = True
+            drained = not self._leases and not self._closed
+            self._closed = self._closed or drained
+        if drained:
+            self._close_all()
+
+    def close(self):
+        """Close every idle cursor and the base connection"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._close_all()
+
+    def _close_all(self):
+        while True:
+            try:
+                cursor, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            cursor.close()
+        self._con.close()
+
+
+# ========================================
+# BATCH EXECUTION
+# ========================================
+
+def run_batch(jobs, executor=None):
+    """
+    Run independent jobs concurrently and collect their results
+
+    Each job runs in its own executor thread and therefore checks out its own
+    cursor from the pool: the wall-clock time is that of the slowest job.
+
+    Args:
+        jobs: Dict name -> callable (no arguments)
+        executor: concurrent.futures executor (None = run sequentially)
+
+    Returns:
+        Dict name -> result (the first exception raised by a job is re-raised)
+    """
+    if executor is None or len(jobs) <= 1:
+        return {name: job() for name, job in jobs.items()}
+    futures = {name: executor.submit(job) for name, job in jobs.items()}
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,162 @@
+"""
+Distribution statistics computed in DuckDB
+Box plot summaries (quartiles, whiskers, top-K outliers) and histogram bins
+are returned as a few summary rows instead of every raw value
+"""
+
+
+# Whisker length in IQR (Tukey)
+WHISKER_IQR = 1.5
+# Outliers shipped per group (the farthest from the whiskers)
+DEFAULT_TOP_K_OUTLIERS = 20
+# Upper bound on the number of Freedman-Diaconis bins
+MAX_AUTO_BINS = 200
+
+
+def _source_cte(source, value, where, group):
+    """CTE `src(grp, v)`: non-null values of `value` with their group"""
+    group_expr = group if group is not None else "'Total'"
+    return f"""
+    src AS (
+      SELECT {group_expr} AS grp, {value} AS v
+      FROM {source}
+      WHERE ({where}) AND {value} IS NOT NULL
+    ),
+    quartiles AS (
+      SELECT grp,
+        COUNT(*) AS n,
+        AVG(v) AS mean,
+        MIN(v) AS min,
+        MAX(v) AS max,
+        quantile_cont(v, 0.25) AS q1,
+        quantile_cont(v, 0.5) AS median,
+        quantile_cont(v, 0.75) AS q3,
+        quantile_cont(v, 0.25) - {WHISKER_IQR} * (quantile_cont(v, 0.75) - quantile_cont(v, 0.25)) AS low_limit,
+        quantile_cont(v, 0.75) + {WHISKER_IQR} * (quantile_cont(v, 0.75) - quantile_cont(v, 0.25)) AS high_limit
+      FROM src
+      GROUP BY grp
+    )"""
+
+
+def _rename_group(df, group):
+    return df.rename(columns={"grp": group or "group"})
+
+
+# ========================================
+# BOX PLOTS
+# ========================================
+
+def box_stats(run_query, source, value, where="TRUE", params=None, group=None):
+    """
+    Box plot summary of `value`, per group
+
+    Args:
+        run_query: Callable(sql, params) -> DataFrame (the app's cached `q`)
+        source: Table name
+        value: Numeric column
+        where: SQL predicate (with ? placeholders)
+        params: Parameters of `where`
+        group: Grouping column (None = a single "Total" group)
+
+    Returns:
+        DataFrame: one row per group with n, mean, min, max, q1, median, q3,
+        lower_fence / upper_fence (whisker ends) and n_outliers
+    """
+    sql = f"""
+    WITH {_source_cte(source, value, where, group)}
+    SELECT
+      q.grp, q.n, q.mean, q.min, q.max, q.q1, q.median, q.q3,
+      MIN(s.v) FILTER (WHERE s.v >= q.low_limit) AS lower_fence,
+      MAX(s.v) FILTER (WHERE s.v <= q.high_limit) AS upper_fence,
+      COUNT(*) FILTER (WHERE s.v < q.low_limit OR s.v > q.high_limit) AS n_outliers
+    FROM quartiles q
+    JOIN src s ON s.grp IS NOT DISTINCT FROM q.grp
+    GROUP BY ALL
+    ORDER BY q.grp;
+    """
+    return _rename_group(run_query(sql, params), group)
+
+
+def box_outliers(run_query, source, value, where="TRUE", params=None, group=None,
+                 top_k=DEFAULT_TOP_K_OUTLIERS):
+    """
+    Values outside the whiskers, capped to the `top_k` farthest per group
+
+    Args:
+        Same as box_stats, plus top_k
+
+    Returns:
+        DataFrame with the group column and `value` (one row per outlier)
+    """
+    sql = f"""
+    WITH {_source_cte(source, value, where, group)}
+    SELECT s.grp, s.v AS value
+    FROM src s
+    JOIN quartiles q ON s.grp IS NOT DISTINCT FROM q.grp
+    WHERE s.v < q.low_limit OR s.v > q.high_limit
+    QUALIFY row_number() OVER (
+      PARTITION BY s.grp ORDER BY GREATEST(q.low_limit - s.v, s.v - q.high_limit) DESC
+    ) <= {int(top_k)}
+    ORDER BY s.grp, s.v;
+    """
+    return _rename_group(run_query(sql, params), group)
+
+
+# ========================================
+# HISTOGRAMS
+# ========================================
+
+def histogram_bins(run_query, source, value, where="TRUE", params=None, bins=None):
+    """
+    Equal-width histogram of `value`
+
+    Args:
+        run_query: Callable(sql, params) -> DataFrame
+        source: Table name
+        value: Numeric column
+        where: SQL predicate (with ? placeholders)
+        params: Parameters of `where`
+        bins: Number of bins (None = Freedman-Diaconis: width = 2 * IQR * n^(-1/3))
+
+    Returns:
+        DataFrame with bin_start, bin_end, count (empty bins included)
+    """
+    if bins is None:
+        nb_bins = f"""LEAST({MAX_AUTO_BINS}, GREATEST(1, CAST(CEIL(
+            (hi - lo) / NULLIF(2 * iqr * pow(n, -1 / 3), 0)) AS BIGINT)))"""
+    else:
+        nb_bins = str(max(1, int(bins)))
+    sql = f"""
+    WITH src AS (
+      SELECT {value} AS v
+      FROM {source}
+      WHERE ({where}) AND {value} IS NOT NULL
+    ),
+    bounds AS (
+      SELECT MIN(v) AS lo, MAX(v) AS hi, COUNT(*) AS n,
+        quantile_cont(v, 0.75) - quantile_cont(v, 0.25) AS iqr
+      FROM src
+    ),
+    layout AS (
+      SELECT lo, COALESCE({nb_bins}, 1) AS nb,
+        COALESCE(NULLIF(hi - lo, 0), 1) / COALESCE({nb_bins}, 1) AS width
+      FROM bounds
+      WHERE n > 0
+    ),
+    counts AS (
+      SELECT LEAST(CAST(FLOOR((v - lo) / width) AS BIGINT), nb - 1) AS bin, COUNT(*) AS count
+      FROM src, layout
+      GROUP BY bin
+    )
+    SELECT
+      l.lo + r.bin * l.width AS bin_start,
+      l.lo + (r.bin + 1) * l.width AS bin_end,
+      COALESCE(c.count, 0) AS count
+    FROM layout l
+    CROSS JOIN range(l.nb) r(bin)
+    LEFT JOIN counts c ON c.bin = r.bin
+    ORDER BY r.bin;
+    """
+    df = run_query(sql, params)
+    df["count"] = df["count"].astype("int64")
+    return df
@@ -0,0 +1,145 @@
+"""
+Downsampling of line chart series
+Caps the number of points sent to the browser per series (about one point
+per pixel of chart width) while keeping the visual shape of the curve
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Points kept per series (~ width in pixels of a full-width chart)
+DEFAULT_MAX_POINTS = 1000
+
+
+def _as_float(values):
+    """Numeric version of an x/y axis (datetimes become int64 nanoseconds)"""
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = pd.to_datetime(values).to_numpy()
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype("datetime64[ns]").astype("int64")
+    return values.astype("float64")
+
+
+# ========================================
+# ALGORITHMS
+# ========================================
+
+def lttb_indices(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets: indices of the points to keep
+
+    The first and last points are always kept; in between, each bucket keeps the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket.
+
+    Args:
+        x: Sorted x values (numeric or datetime64)
+        y: y values
+        max_points: Number of points to keep (>= 3)
+
+    Returns:
+        Sorted numpy array of row indices
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = _as_float(y)
+
+    n_buckets = max_points - 2
+    edges = (np.arange(n_buckets + 1) * ((n - 2) / n_buckets)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x, edges[:-1]) / counts
+    mean_y = np.add.reduceat(y, edges[:-1]) / counts
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_buckets):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 1 < n_buckets:
+            cx, cy = mean_x[i + 1], mean_y[i + 1]
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, max_points):
+    """
+    Min/max per bucket: keeps the lowest and highest point of each bucket
+
+    Preserves the extremes (peaks, drops) that averaging methods can hide.
+
+    Args:
+        y: y values (in x order)
+        max_points: Upper bound on the number of points kept
+
+    Returns:
+        Sorted numpy array of row indices
+    """
+    n = len(y)
+    if max_points >= n or max_points < 4:
+        return np.arange(n)
+
+    y = _as_float(y)
+    # Equal-size buckets: pad to a (rows, size) matrix and reduce along each row
+    size = -(-n // (max_points // 2 - 1))
+    rows = -(-n // size)
+    nan = np.isnan(y)
+    low = np.full(rows * size, np.inf)
+    low[:n] = np.where(nan, np.inf, y)
+    high = np.full(rows * size, -np.inf)
+    high[:n] = np.where(nan, -np.inf, y)
+    offsets = np.arange(rows) * size
+    keep = np.concatenate((
+        [0, n - 1],
+        offsets + low.reshape(rows, size).argmin(axis=1),
+        offsets + high.reshape(rows, size).argmax(axis=1),
+    ))
+    return np.unique(np.minimum(keep, n - 1))
+
+
+def downsample_indices(x, y, max_points=DEFAULT_MAX_POINTS, method="lttb"):
+    """
+    Indices of the points to draw for one series
+
+    Args:
+        x: Sorted x values
+        y: y values
+        max_points: Point budget of the series
+        method: "lttb" (shape of a time series) or "minmax" (extremes)
+
+    Returns:
+        Sorted numpy array of row indices
+    """
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    return lttb_indices(x, y, max_points)
+
+
+def downsample_frame(df, x, y, max_points=DEFAULT_MAX_POINTS, method="lttb"):
+    """
+    Rows of `df` to draw (unchanged if it already fits the budget)
+
+    Args:
+        df: DataFrame sorted on `x`
+        x: Column for x-axis
+        y: Column for y-axis
+        max_points: Point budget
+        method: "lttb" or "minmax"
+
+    Returns:
+        DataFrame
+    """
+    if len(df) <= max_points:
+        return df
+    idx = downsample_indices(df[x].to_numpy(), df[y].to_numpy(), max_points, method)
+    return df.iloc[idx].reset_index(drop=True)
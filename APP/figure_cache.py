@@ -0,0 +1,263 @@
+"""
+Figure cache for Plotly charts
+Avoids rebuilding identical figures on every Streamlit rerun: figures are
+stored as JSON, keyed on a content hash of the input data and the chart options
+"""
+
+import functools
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from lazy_imports import lazy_import
+
+pio = lazy_import("plotly.io")
+px = lazy_import("plotly.express")
+
+
+# ========================================
+# FINGERPRINTS
+# ========================================
+
+def _update_frame(digest, df):
+    digest.update(repr((list(df.columns), df.dtypes.to_dict(), df.index.names)).encode("utf-8"))
+    try:
+        values = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    except TypeError:
+        # Unhashable cells (lists, dicts...): fall back to the text form
+        digest.update(df.to_json(orient="split", date_format="iso").encode("utf-8"))
+        return
+    digest.update(values.tobytes())
+
+
+def _update_series(digest, series):
+    _update_frame(digest, series.to_frame(name=series.name))
+
+
+def _update_arrow(digest, table):
+    digest.update(str(table.schema).encode("utf-8"))
+    pa = sys.modules["pyarrow"]
+    for column in table.columns:
+        for chunk in column.chunks:
+            if chunk.offset or chunk.nbytes != chunk.get_total_buffer_size():
+                # Slice of a larger array: its buffers are the parent's, copy the
+                # sliced range so that only the selected rows are hashed
+                chunk = pa.concat_arrays([chunk])
+            digest.update(f"{len(chunk)}:{chunk.null_count}".encode("utf-8"))
+            # Hash the raw Arrow buffers (validity, offsets, values) without copying
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    digest.update(memoryview(buffer))
+
+
+def _update(digest, value):
+    pa = sys.modules.get("pyarrow")
+    if isinstance(value, pd.DataFrame):
+        digest.update(b"frame")
+        _update_frame(digest, value)
+    elif isinstance(value, pd.Series):
+        digest.update(b"series")
+        _update_series(digest, value)
+    elif pa is not None and isinstance(value, pa.Table):
+        digest.update(b"arrow")
+        _update_arrow(digest, value)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode("utf-8"))
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"dict{len(value)}".encode("utf-8"))
+        for key, item in value.items():
+            _update(digest, key)
+            _update(digest, item)
+    else:
+        digest.update(repr(value).encode("utf-8"))
+    digest.update(b"\x00")
+
+
+def fingerprint(*values):
+    """
+    Content hash of chart inputs (DataFrames, Series, Arrow tables, options)
+
+    DataFrames are hashed with pandas' vectorized row hashing (values, index,
+    column names and dtypes), so the cost is a single pass over the data.
+
+    Args:
+        *values: Objects to hash (containers are hashed recursively)
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for value in values:
+        _update(digest, value)
+    return digest.hexdigest()
+
+
+def make_key(name, args, kwargs):
+    """Build the cache key: chart function name + fingerprint of its arguments"""
+    return (name, fingerprint(args, sorted(kwargs.items())))
+
+
+# ========================================
+# FIGURE CACHE
+# ========================================
+
+class FigureCache:
+    """
+    LRU cache of Plotly figures stored as JSON strings
+
+    - Least recently used entries are evicted when `max_entries` or
+      `max_bytes` (total JSON size) is exceeded
+    - Every hit returns a new Figure object, so callers can update it freely
+    - Hit / miss / eviction counters are exposed through `stats()`
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # key -> figure JSON
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._bytes > self.max_bytes):
+            _, json_text = self._entries.popitem(last=False)
+            self._bytes -= len(json_text)
+            self.evictions += 1
+
+    def get(self, key):
+        """
+        Look up a cached figure
+
+        Returns:
+            A new Plotly figure built from the cached JSON, or None on miss
+        """
+        with self._lock:
+            json_text = self._entries.get(key)
+            if json_text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pio.from_json(json_text)
+
+    def put(self, key, fig):
+        """Store a figure (skipped if its JSON is larger than the whole budget)"""
+        json_text = fig.to_json()
+        if len(json_text) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = json_text
+            self._bytes += len(json_text)
+            self._evict()
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached figure or call `build()` and cache its result
+
+        Args:
+            key: Cache key (see make_key)
+            build: Callable returning a Plotly figure (or None, not cached)
+
+        Returns:
+            Plotly figure or None
+        """
+        fig = self.get(key)
+        if fig is None:
+            fig = build()
+            if fig is not None:
+                self.put(key, fig)
+        return fig
+
+    def clear(self):
+        """Drop every cached figure"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Cache counters
+
+        Returns:
+            Dict with hits, misses, evictions, entries, bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+# Shared by every session of the process: figures only depend on their inputs
+figure_cache = FigureCache()
+
+
+# ========================================
+# DECORATOR
+# ========================================
+
+def memoize_figure(func=None, *, cache=None, name=None):
+    """
+    Decorator caching the figures returned by a chart function
+
+    The key is the function name plus a fingerprint of every argument, so a
+    rerun with the same data and options returns a copy of the cached figure
+    instead of building it again. Usable bare (@memoize_figure) or with
+    options (@memoize_figure(cache=...)).
+
+    Args:
+        func: Chart function returning a Plotly figure
+        cache: FigureCache to use (default: the shared figure_cache)
+        name: Key prefix (default: module.qualname of `func`)
+
+    Returns:
+        Wrapped function
+    """
+    def decorate(func):
+        key_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            target = cache or figure_cache
+            key = make_key(key_name, args, kwargs)
+            return target.get_or_build(key, lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+
+class CachedExpress:
+    """
+    plotly.express with memoized chart functions: cpx.bar(df, ...) returns the
+    same figure as px.bar(df, ...) but is only built once per data / options
+    """
+
+    def __init__(self, cache=None):
+        self._cache = cache
+        self._functions = {}
+
+    def __getattr__(self, attr):
+        function = self._functions.get(attr)
+        if function is None:
+            function = memoize_figure(getattr(px, attr), cache=self._cache, name=f"px.{attr}")
+            self._functions[attr] = function
+        return function
@@ -0,0 +1,122 @@
+"""
+Filter compilation
+Turns the sidebar selections into the cheapest equivalent SQL predicate:
+selections that keep everything are dropped, contiguous integer IDs become
+BETWEEN ranges and other selections are semi-joined against one bound list
+parameter (no per-connection state: any pooled cursor can run the query)
+"""
+
+import pandas as pd
+
+
+# At most this many BETWEEN ranges for an integer selection
+MAX_RANGES = 8
+
+
+# ========================================
+# PREDICATES
+# ========================================
+
+def to_ranges(values):
+    """
+    Collapse integers into contiguous [low, high] runs
+
+    Args:
+        values: Iterable of integers
+
+    Returns:
+        List of (low, high) tuples, sorted
+    """
+    ranges = []
+    for value in sorted(set(int(v) for v in values)):
+        if ranges and value == ranges[-1][1] + 1:
+            ranges[-1][1] = value
+        else:
+            ranges.append([value, value])
+    return [tuple(r) for r in ranges]
+
+
+def _is_integer(value):
+    return isinstance(value, int) or (hasattr(value, "dtype") and pd.api.types.is_integer_dtype(value.dtype))
+
+
+def in_predicate(column, selected, universe=None):
+    """
+    Cheapest predicate equivalent to `column IN selected`
+
+    - None when `selected` covers `universe` (no restriction)
+    - FALSE for an empty selection
+    - BETWEEN ranges for contiguous integer IDs
+    - NOT IN the complement when it is shorter than the selection
+    - else a semi-join on the values bound as one list, IN (SELECT UNNEST(?))
+
+    Args:
+        column: Column name
+        selected: Selected values
+        universe: Every value of the column (None = unknown)
+
+    Returns:
+        (sql or None, params)
+    """
+    selected = list(dict.fromkeys(selected))
+    if universe is not None and set(universe) <= set(selected):
+        return None, []
+    if not selected:
+        return "FALSE", []
+
+    if all(_is_integer(v) for v in selected):
+        ranges = to_ranges(selected)
+        if len(ranges) <= MAX_RANGES:
+            parts, params = [], []
+            for low, high in ranges:
+                if low == high:
+                    parts.append(f"{column} = ?")
+                    params.append(low)
+                else:
+                    parts.append(f"{column} BETWEEN ? AND ?")
+                    params += [low, high]
+            sql = parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+            return sql, params
+
+    values, negate = selected, False
+    if universe is not None:
+        complement = [v for v in universe if v not in set(selected)]
+        if len(complement) < len(selected):
+            values, negate = complement, True
+
+    operator = "NOT IN" if negate else "IN"
+    return f"{column} {operator} (SELECT UNNEST(?))", [list(values)]
+
+
+def between_predicate(column, low, high, bounds=None):
+    """
+    `column BETWEEN low AND high`, dropped when it covers `bounds`
+
+    Args:
+        column: Column name
+        low, high: Selected range
+        bounds: (MIN, MAX) of the column (None = unknown)
+
+    Returns:
+        (sql or None, params)
+    """
+    if bounds is not None and (pd.Timestamp(low) <= pd.Timestamp(bounds[0])
+                               and pd.Timestamp(high) >= pd.Timestamp(bounds[1])):
+        return None, []
+    return f"{column} BETWEEN ? AND ?", [low, high]
+
+
+def compile_where(predicates):
+    """
+    AND the kept predicates into one WHERE clause
+
+    Args:
+        predicates: List of (sql or None, params)
+
+    Returns:
+        (where_sql, params) - "TRUE" when nothing restricts the rows
+    """
+    kept = [(sql, params) for sql, params in predicates if sql is not None]
+    if not kept:
+        return "TRUE", []
+    return " AND ".join(sql for sql, _ in kept), [p for _, params in kept for p in params]
@@ -0,0 +1,90 @@
+"""
+Fragment-scoped rendering
+Each dashboard section is an `st.fragment`: a widget inside it reruns only
+that section, and every run of a section records its latency. A fragment
+rerun is a run of its own for the Performance panel (see instrumentation)
+"""
+
+import functools
+import time
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from instrumentation import begin_fragment_run, record_event
+
+
+# Session state key holding the per-fragment timings
+TIMINGS_KEY = "_fragment_timings"
+
+
+def record_timing(name, seconds):
+    """
+    Add one run of fragment `name` to the session timings
+
+    Args:
+        name: Fragment label
+        seconds: Duration of the run
+    """
+    timings = st.session_state.setdefault(TIMINGS_KEY, {})
+    entry = timings.setdefault(name, {"runs": 0, "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0})
+    ms = seconds * 1000
+    entry["runs"] += 1
+    entry["last_ms"] = ms
+    entry["max_ms"] = max(entry["max_ms"], ms)
+    entry["total_ms"] += ms
+
+
+def is_fragment_rerun():
+    """True when only fragments run (a widget of a fragment changed), not the whole script"""
+    ctx = get_script_run_ctx()
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+
+def timed_fragment(name):
+    """
+    Decorator: turn a section renderer into a timed `st.fragment`
+
+    When the fragment reruns alone, its queries and sections are recorded
+    under a new run id, followed by a "run" event with its duration.
+
+    Args:
+        name: Label of the section in the timings
+
+    Returns:
+        Decorator
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            fragment_rerun = is_fragment_rerun()
+            if fragment_rerun:
+                begin_fragment_run(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                record_timing(name, seconds)
+                if fragment_rerun:
+                    record_event({"kind": "run", "name": name, "wall_ms": seconds * 1000})
+        return st.fragment(timed)
+    return decorator
+
+
+def fragment_timings():
+    """
+    Timings of the fragments run in this session
+
+    Returns:
+        DataFrame with Section, runs, last_ms, avg_ms, max_ms (slowest first)
+    """
+    timings = st.session_state.get(TIMINGS_KEY, {})
+    rows = [
+        {"Section": name, "runs": t["runs"], "last_ms": t["last_ms"],
+         "avg_ms": t["total_ms"] / t["runs"], "max_ms": t["max_ms"]}
+        for name, t in timings.items()
+    ]
+    df = pd.DataFrame(rows, columns=["Section", "runs", "last_ms", "avg_ms", "max_ms"])
+    return df.sort_values("last_ms", ascending=False).reset_index(drop=True)
@@ -0,0 +1,236 @@
+"""
+Per-query and per-section instrumentation
+Records what each rerun spends its time on (queries, section_card blocks),
+keeps the recent events in the session for the sidebar Performance panel and
+appends them as JSON lines to a log file
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from query_cache import normalize_sql, result_nbytes
+
+
+# Session state keys
+EVENTS_KEY = "_perf_events"
+RUN_KEY = "_perf_run"
+QUERIES_KEY = "_perf_queries"
+
+# Events kept per session for the panel
+MAX_EVENTS = 1000
+# JSON lines log ("" disables it), see set_log_path
+DEFAULT_LOG_PATH = "logs/perf.jsonl"
+# Lists longer than this are logged as "[n values]"
+MAX_LOGGED_LIST = 10
+
+_local = threading.local()
+_settings = {"log_path": DEFAULT_LOG_PATH}
+
+
+# ========================================
+# EVENT LOG
+# ========================================
+
+def _logger(log_path):
+    """JSON lines logger writing to `log_path` (one handler per path, thread-safe)"""
+    logger = logging.getLogger(f"kpi.perf.{log_path}")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        handler = logging.FileHandler(log_path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def set_log_path(log_path):
+    """Set the JSON lines log file of every later event (None / "" = no file)"""
+    _settings["log_path"] = log_path
+
+
+def _session_events():
+    return st.session_state.setdefault(EVENTS_KEY, collections.deque(maxlen=MAX_EVENTS))
+
+
+def begin_run(**context):
+    """
+    Start a new script run: later events are tagged with its id and `context`
+
+    Args:
+        **context: Labels added to every event (dataset, data source...)
+    """
+    run = st.session_state.get(RUN_KEY, {"id": 0})
+    st.session_state[RUN_KEY] = {"id": run["id"] + 1, "context": context}
+
+
+def begin_fragment_run(fragment):
+    """
+    Start a new run for a fragment rerun (only that section runs): later events
+    keep the context of the last full run and are tagged with `fragment`
+
+    Args:
+        fragment: Label of the fragment
+    """
+    run = st.session_state.get(RUN_KEY, {"id": 0, "context": {}})
+    context = {key: value for key, value in run.get("context", {}).items() if key != "fragment"}
+    begin_run(**context, fragment=fragment)
+
+
+def current_run_id():
+    """Id of the current script run (0 before the first begin_run)"""
+    return st.session_state.get(RUN_KEY, {"id": 0})["id"]
+
+
+def record_event(event):
+    """
+    Store one event in the session and append it to the log
+
+    Args:
+        event: Dict (kind, name, timings...)
+    """
+    run = st.session_state.get(RUN_KEY, {"id": 0, "context": {}})
+    event = {"ts": time.time(), "run": run["id"], **run.get("context", {}), **event}
+    _session_events().append(event)
+    if _settings["log_path"]:
+        _logger(_settings["log_path"]).info(json.dumps(event, default=str))
+
+
+def summarize_params(params):
+    """Loggable version of query parameters (long lists are summarized)"""
+    if params is None:
+        return None
+    return [
+        f"[{len(p)} values]" if isinstance(p, (list, tuple)) and len(p) > MAX_LOGGED_LIST else p
+        for p in params
+    ]
+
+
+def sql_fingerprint(sql):
+    """Short stable id of a query text (whitespace-insensitive)"""
+    return hashlib.sha1(normalize_sql(sql).encode("utf-8")).hexdigest()[:12]
+
+
+# ========================================
+# QUERIES
+# ========================================
+
+@contextmanager
+def track_query(sql, params=None, fmt="pandas"):
+    """
+    Time one query call (cache lookup included)
+
+    Call `set_result` on the yielded record with the result; `note_execution`
+    (from the function that really runs the query) marks it as a cache miss.
+
+    Args:
+        sql: SQL query string
+        params: Query parameters
+        fmt: Result format ("pandas" or "arrow")
+
+    Yields:
+        Dict record of the query
+    """
+    fingerprint = sql_fingerprint(sql)
+    record = {
+        "kind": "query",
+        "name": fingerprint,
+        "sql": normalize_sql(sql)[:200],
+        "params": summarize_params(params),
+        "fmt": fmt,
+        "cached": True,
+        "db_ms": 0.0,
+        "rows": None,
+        "bytes": None,
+    }
+    # Full text + parameters, for EXPLAIN ANALYZE from the panel
+    st.session_state.setdefault(QUERIES_KEY, {})[fingerprint] = (sql, params)
+
+    previous = getattr(_local, "record", None)
+    _local.record = record
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["wall_ms"] = (time.perf_counter() - start) * 1000
+        _local.record = previous
+        record_event(record)
+
+
+def set_result(record, result):
+    """Add rows / bytes of `result` (DataFrame or pyarrow Table) to a query record"""
+    record["rows"] = len(result)
+    record["bytes"] = result_nbytes(result)
+
+
+def note_execution(seconds):
+    """Mark the query tracked by this thread as executed in DuckDB (cache miss)"""
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record["cached"] = False
+        record["db_ms"] = seconds * 1000
+
+
+def explain_analyze(con, fingerprint):
+    """
+    Run EXPLAIN ANALYZE on a query recorded in this session
+
+    Args:
+        con: DuckDB connection / cursor
+        fingerprint: sql_fingerprint of the query
+
+    Returns:
+        Profile text (None if the query is unknown)
+    """
+    entry = st.session_state.get(QUERIES_KEY, {}).get(fingerprint)
+    if entry is None:
+        return None
+    sql, params = entry
+    sql = "EXPLAIN ANALYZE " + sql.strip().rstrip(";")
+    rows = con.execute(sql).fetchall() if params is None else con.execute(sql, params).fetchall()
+    profile = "\n".join(row[-1] for row in rows)
+    record_event({"kind": "explain", "name": fingerprint, "profile": profile})
+    return profile
+
+
+# ========================================
+# SECTIONS
+# ========================================
+
+def record_section(name, seconds):
+    """Add the rendering time of one section block"""
+    record_event({"kind": "section", "name": name, "wall_ms": seconds * 1000})
+
+
+# ========================================
+# PANEL DATA
+# ========================================
+
+def run_events(kind, run_id=None):
+    """
+    Events of one kind recorded during a run
+
+    Args:
+        kind: "query", "section" or "run"
+        run_id: Script run or fragment rerun (None = current run)
+
+    Returns:
+        DataFrame, slowest first
+    """
+    run_id = current_run_id() if run_id is None else run_id
+    rows = [e for e in st.session_state.get(EVENTS_KEY, ()) if e["kind"] == kind and e["run"] == run_id]
+    if kind == "query":
+        columns = ["name", "sql", "rows", "bytes", "wall_ms", "db_ms", "cached"]
+    else:
+        columns = ["name", "wall_ms"]
+    df = pd.DataFrame(rows, columns=columns)
+    return df.sort_values("wall_ms", ascending=False).reset_index(drop=True)
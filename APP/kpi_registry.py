@@ -0,0 +1,255 @@
+"""
+KPI registry
+Named, parameterized queries parsed from sql/kpis_*.sql: the dashboard, the
+HTTP service, the benchmark and the tests run KPIs by name, so each query has
+one definition (and one place to optimize it)
+
+Each statement of a kpis_<dataset>.sql file is preceded by header comments:
+
+    -- KPI 2 : Ventes par magasin          title
+    -- name: sales_by_store                registered as "walmart.sales_by_store"
+    -- filters: Store_Number, Date         filter dimensions, {where} in the SQL
+    -- params: n                           extra "?" parameters, after the filter's
+"""
+
+import functools
+import glob
+import os
+import re
+
+from query_cache import normalize_sql
+
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sql")
+KPI_FILE_PATTERN = "kpis_*.sql"
+
+# Placeholder replaced by the compiled WHERE clause (walmart_where / ev_where)
+WHERE_PLACEHOLDER = "{where}"
+
+# Dimensions the sidebar filters can restrict, per table
+FILTER_DIMENSIONS = {
+    "walmart": ["Store_Number", "Holiday_Flag", "Date"],
+    "ev": ["brand", "segment"],
+}
+
+HEADER_RE = re.compile(r"^--\s*(name|filters|params)\s*:\s*(.*?)\s*$")
+TITLE_RE = re.compile(r"^--\s*KPI\s+\d+\s*:\s*(.*?)\s*$")
+
+
+class KpiError(ValueError):
+    """Malformed KPI definition or call (unknown name, filter, parameter count)"""
+
+
+# ========================================
+# PARSING
+# ========================================
+
+def _names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_kpi_file(path):
+    """
+    KPI definitions of one kpis_<dataset>.sql file
+
+    Statements without a `-- name:` header are skipped.
+
+    Args:
+        path: Path of the SQL file
+
+    Returns:
+        List of dicts with name, dataset, title, filters, params, sql, source
+    """
+    dataset = os.path.basename(path)[len("kpis_"):-len(".sql")]
+    with open(path, encoding="utf-8") as f:
+        statements = f.read().split(";")
+
+    kpis = []
+    for statement in statements:
+        headers, title, body = {}, None, []
+        for line in statement.splitlines():
+            stripped = line.strip()
+            header, title_match = HEADER_RE.match(stripped), TITLE_RE.match(stripped)
+            if header:
+                headers[header.group(1)] = header.group(2)
+            elif title_match:
+                title = title_match.group(1)
+            elif stripped and not stripped.startswith("--"):
+                body.append(line)
+        if "name" not in headers:
+            continue
+        kpis.append({
+            "name": f"{dataset}.{headers['name']}",
+            "dataset": dataset,
+            "title": title or headers["name"],
+            "filters": _names(headers.get("filters", "")),
+            "params": _names(headers.get("params", "")),
+            "sql": "\n".join(body).strip(),
+            "source": os.path.basename(path),
+        })
+    return kpis
+
+
+def check_definition(kpi):
+    """
+    Errors of a KPI definition that do not need a database
+
+    Returns:
+        List of messages (empty when the definition is consistent)
+    """
+    errors = []
+    sql = kpi["sql"]
+    allowed = FILTER_DIMENSIONS.get(kpi["dataset"], [])
+    for dimension in kpi["filters"]:
+        if dimension not in allowed:
+            errors.append(f"{kpi['name']}: unknown filter dimension '{dimension}' "
+                          f"(expected one of {', '.join(allowed)})")
+    if bool(kpi["filters"]) != (WHERE_PLACEHOLDER in sql):
+        errors.append(f"{kpi['name']}: declared filters and {WHERE_PLACEHOLDER} must go together")
+    placeholder = sql.find(WHERE_PLACEHOLDER)
+    if placeholder >= 0 and "?" in sql[:placeholder]:
+        errors.append(f"{kpi['name']}: extra parameters must come after {WHERE_PLACEHOLDER}")
+    if sql.count("?") != len(kpi["params"]):
+        errors.append(f"{kpi['name']}: {sql.count('?')} '?' in the SQL, "
+                      f"{len(kpi['params'])} declared params")
+    return errors
+
+
+@functools.lru_cache(maxsize=None)
+def load_registry(sql_dir=SQL_DIR):
+    """
+    Every KPI of the kpis_*.sql files of `sql_dir` (parsed once per process)
+
+    Returns:
+        Dict name -> KPI definition (see parse_kpi_file)
+
+    Raises:
+        KpiError: Duplicate names or inconsistent definitions
+    """
+    registry, errors = {}, []
+    for path in sorted(glob.glob(os.path.join(sql_dir, KPI_FILE_PATTERN))):
+        for kpi in parse_kpi_file(path):
+            if kpi["name"] in registry:
+                errors.append(f"{kpi['name']}: defined twice")
+            errors += check_definition(kpi)
+            registry[kpi["name"]] = kpi
+    if errors:
+        raise KpiError("; ".join(errors))
+    return registry
+
+
+def get_kpi(name, registry=None):
+    """KPI definition `name` (KpiError when unknown)"""
+    registry = registry if registry is not None else load_registry()
+    try:
+        return registry[name]
+    except KeyError:
+        raise KpiError(f"unknown KPI '{name}'") from None
+
+
+# ========================================
+# COMPILATION
+# ========================================
+
+def _render(kpi, where_sql):
+    return normalize_sql(kpi["sql"].replace(WHERE_PLACEHOLDER, f"({where_sql})"))
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile(name, where_sql, sql_dir=SQL_DIR):
+    # One SQL text per (KPI, WHERE shape): identical filters give identical text,
+    # hence the same query cache key on every rerun
+    kpi = get_kpi(name, load_registry(sql_dir))
+    dimensions = {dimension for table in FILTER_DIMENSIONS.values() for dimension in table}
+    undeclared = [dimension for dimension in sorted(dimensions)
+                  if dimension not in kpi["filters"]
+                  and re.search(rf"\b{dimension}\b", where_sql, re.IGNORECASE)]
+    if undeclared:
+        raise KpiError(f"{name}: no filter declared on {', '.join(undeclared)}")
+    return _render(kpi, where_sql)
+
+
+def kpi_query(name, where=None, args=(), sql_dir=SQL_DIR):
+    """
+    SQL and parameters of the KPI `name`
+
+    Args:
+        name: Registered name (e.g. "ev.top_range")
+        where: (where_sql, params) compiled by walmart_where / ev_where
+            (None = no filter)
+        args: Values of the declared extra parameters, in order
+        sql_dir: Directory of the kpis_*.sql files
+
+    Returns:
+        (sql, params)
+    """
+    kpi = get_kpi(name, load_registry(sql_dir))
+    if len(args) != len(kpi["params"]):
+        raise KpiError(f"{name}: expects {len(kpi['params'])} parameter(s) "
+                       f"({', '.join(kpi['params']) or 'none'}), got {len(args)}")
+    where_sql, where_params = where if where is not None else ("TRUE", [])
+    return _compile(name, where_sql, sql_dir), list(where_params) + list(args)
+
+
+def run_kpi(run_query, name, where=None, args=(), **kwargs):
+    """
+    Run the KPI `name` through `run_query`
+
+    Args:
+        run_query: Callable(sql, params, **kwargs) -> result (e.g. the app's cached q)
+        name, where, args: See kpi_query
+        **kwargs: Passed to run_query (e.g. arrow=True)
+
+    Returns:
+        Result of run_query
+    """
+    return run_query(*kpi_query(name, where, args), **kwargs)
+
+
+# ========================================
+# VALIDATION
+# ========================================
+
+def table_columns(con):
+    """Columns of every table and view of the database: {table: {column: type}}"""
+    columns = {}
+    rows = con.execute("""
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+    """).fetchall()
+    for table_name, column_name, data_type in rows:
+        columns.setdefault(table_name, {})[column_name] = data_type
+    return columns
+
+
+def validate_registry(con, registry=None):
+    """
+    Check every KPI against the schema of `con`
+
+    The filter dimensions must be columns of the KPI table, and each statement
+    (unfiltered) must prepare: DuckDB binds the tables, columns and functions
+    without running it. KPIs of tables missing from the database are skipped.
+
+    Args:
+        con: DuckDB connection / cursor
+        registry: Dict name -> KPI (default: load_registry())
+
+    Returns:
+        List of error messages (empty when every KPI is valid)
+    """
+    registry = registry if registry is not None else load_registry()
+    schema = table_columns(con)
+    errors = []
+    for name, kpi in registry.items():
+        columns = schema.get(kpi["dataset"])
+        if columns is None:
+            continue
+        for dimension in kpi["filters"]:
+            if dimension not in columns:
+                errors.append(f"{name}: filter column '{dimension}' missing from {kpi['dataset']}")
+        try:
+            con.execute(f"PREPARE _kpi_check AS {_render(kpi, 'TRUE')}")
+            con.execute("DEALLOCATE _kpi_check")
+        except Exception as e:
+            errors.append(f"{name}: {str(e).splitlines()[0]}")
+    return errors
@@ -0,0 +1,35 @@
+"""
+Deferred imports
+Libraries only needed to draw charts (plotly) are imported on first use, so a
+cold start renders the sidebar and the KPI cards before paying for them
+"""
+
+import importlib
+import sys
+
+
+class LazyModule:
+    """Stand-in for a module, imported on the first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        # import_module is cached (sys.modules) and holds the import lock
+        return getattr(importlib.import_module(self._name), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'>"
+
+
+def lazy_import(name):
+    """
+    Module `name` if already imported, else a LazyModule
+
+    Args:
+        name: Dotted module name (e.g. "plotly.express")
+
+    Returns:
+        Module or LazyModule
+    """
+    return sys.modules.get(name) or LazyModule(name)
@@ -0,0 +1,445 @@
+"""
+Query layer for the dashboard views
+Groups the Walmart aggregations into as few scans as possible and routes
+them to the smallest pre-aggregated rollup table (built by sql/duckdb_loader.py)
+"""
+
+import datetime
+import os
+
+import duckdb
+import pandas as pd
+
+from catalog import CATALOG_COLUMNS_TABLE, CATALOG_VALUES_TABLE
+from filters import between_predicate, compile_where, in_predicate
+
+
+# ========================================
+# DATA SOURCES
+# ========================================
+
+# Hive-partitioned fact tables written by `duckdb_loader.py --parquet`
+PARQUET_TABLES = ["walmart", "ev"]
+
+
+def connect_parquet(parquet_dir):
+    """
+    In-memory DuckDB connection reading the Parquet export
+
+    The fact tables become views over the partitioned files (partition
+    columns are pruned by the WHERE clause); the rollups and the catalog are
+    small and are loaded as tables so that the routing (duckdb_tables sizes) still works.
+
+    Args:
+        parquet_dir: Export directory (data/parquet)
+
+    Returns:
+        DuckDB connection exposing the same table names as project.db
+    """
+    con = duckdb.connect()
+    for table in PARQUET_TABLES:
+        path = os.path.join(parquet_dir, table)
+        if os.path.isdir(path):
+            con.execute(f"""
+                CREATE VIEW {table} AS
+                SELECT * FROM read_parquet('{path}/**/*.parquet', hive_partitioning = true)
+            """)
+    for small_table in [*WALMART_ROLLUPS, CATALOG_VALUES_TABLE, CATALOG_COLUMNS_TABLE]:
+        path = os.path.join(parquet_dir, f"{small_table}.parquet")
+        if os.path.exists(path):
+            con.execute(f"CREATE TABLE {small_table} AS SELECT * FROM read_parquet('{path}')")
+    return con
+
+
+# ========================================
+# WALMART - RAW ROWS
+# ========================================
+
+# Values of Holiday_Flag
+HOLIDAY_FLAGS = [0, 1]
+
+
+def walmart_where(where_params, partitioned=False, stores=None, date_bounds=None):
+    """
+    WHERE clause of the queries reading individual rows of `walmart`
+
+    Compiled once per rerun (see filters.py): filters that keep everything are
+    dropped, store selections become ranges / temp table semi-joins.
+
+    Args:
+        where_params: [store_sel, holiday_sel, date_min, date_max]
+        partitioned: True on the Parquet source: adds a predicate on the
+            `year` partition column so files outside the period are skipped
+        stores: Every Store_Number of the table (None = unknown)
+        date_bounds: (MIN(Date), MAX(Date)) of the table (None = unknown)
+
+    Returns:
+        (where_sql, params)
+    """
+    store_sel, holiday_sel, date_min, date_max = where_params
+    date_predicate = between_predicate("Date", date_min, date_max, date_bounds)
+    predicates = [
+        in_predicate("Store_Number", store_sel, stores),
+        in_predicate("Holiday_Flag", holiday_sel, HOLIDAY_FLAGS),
+        date_predicate,
+    ]
+    if partitioned and date_predicate[0] is not None:
+        predicates.append(("year BETWEEN ? AND ?",
+                           [pd.Timestamp(date_min).year, pd.Timestamp(date_max).year]))
+    return compile_where(predicates)
+
+
+# ========================================
+# EV
+# ========================================
+
+def ev_where(brand_sel, segment_sel, brands=None, segments=None):
+    """
+    WHERE clause of the `ev` queries, compiled once per rerun
+
+    Args:
+        brand_sel: Selected brands
+        segment_sel: Selected segments
+        brands: Every brand of the table (None = unknown)
+        segments: Every segment of the table (None = unknown)
+
+    Returns:
+        (where_sql, params)
+    """
+    return compile_where([
+        in_predicate("brand", brand_sel, brands),
+        in_predicate("segment", segment_sel, segments),
+    ])
+
+
+# ========================================
+# WALMART - ROLLUP ROUTING
+# ========================================
+
+# Rollup tables and the dimensions they keep (see ROLLUPS in sql/duckdb_loader.py)
+# walmart_store_week has the grain of the fact table: it can answer everything
+WALMART_ROLLUPS = {
+    "walmart_store_holiday": {"Store_Number", "Holiday_Flag"},
+    "walmart_week": {"Date", "Holiday_Flag"},
+    "walmart_store_month": {"Store_Number", "Month", "Holiday_Flag"},
+    "walmart_store_week": {"Store_Number", "Date", "Holiday_Flag"},
+}
+
+SQL_TABLE_SIZES = """
+SELECT table_name, estimated_size
+FROM duckdb_tables();
+"""
+
+
+def rollup_sizes(run_query):
+    """
+    Row count of each rollup table
+
+    Args:
+        run_query: Callable(sql, params) -> DataFrame
+
+    Returns:
+        Dict table_name -> estimated row count
+    """
+    df = run_query(SQL_TABLE_SIZES, None)
+    sizes = dict(zip(df["table_name"], df["estimated_size"]))
+    return {name: sizes[name] for name in WALMART_ROLLUPS if name in sizes}
+
+
+def pick_rollup(dims, sizes):
+    """
+    Smallest rollup that keeps every dimension in `dims`
+
+    Args:
+        dims: Set of dimensions needed (GROUP BY + WHERE)
+        sizes: Dict table_name -> row count (from rollup_sizes)
+
+    Returns:
+        Table name
+    """
+    candidates = [name for name, kept in WALMART_ROLLUPS.items()
+                  if dims <= kept and name in sizes]
+    if not candidates:
+        return "walmart_store_week"
+    return min(candidates, key=lambda name: sizes[name])
+
+
+def _month_start(d):
+    return d.replace(day=1)
+
+
+def _is_month_end(d):
+    return (d + datetime.timedelta(days=1)).day == 1
+
+
+def walmart_filter(where_params, stores=None, date_bounds=None):
+    """
+    Describe which dimensions the sidebar filters really restrict
+
+    A filter that keeps everything (all stores, both Holiday_Flag values, the
+    whole period) is dropped. A period made of whole months can be answered at the month grain.
+
+    Args:
+        where_params: [store_sel, holiday_sel, date_min, date_max]
+        stores: Every Store_Number of the table (None = unknown)
+        date_bounds: (MIN(Date), MAX(Date)) of the table (None = unknown)
+
+    Returns:
+        Dict with the filter dimensions, SQL predicates + params and the date filter
+        (bounds per grain, None when the whole period is selected)
+    """
+    store_sel, holiday_sel, date_min, date_max = where_params
+    date_min, date_max = pd.Timestamp(date_min).date(), pd.Timestamp(date_max).date()
+
+    predicates, params, dims = [], [], set()
+    for column, selected, universe in [("Store_Number", store_sel, stores),
+                                       ("Holiday_Flag", holiday_sel, HOLIDAY_FLAGS)]:
+        sql, column_params = in_predicate(column, selected, universe)
+        if sql is not None:
+            predicates.append(sql)
+            params += column_params
+            dims.add(column)
+
+    date_filter = None
+    if (date_bounds is None
+            or date_min > pd.Timestamp(date_bounds[0]).date()
+            or date_max < pd.Timestamp(date_bounds[1]).date()):
+        date_filter = {"grain": "Date", "Date": [date_min, date_max]}
+        if date_min == _month_start(date_min) and _is_month_end(date_max):
+            date_filter["grain"] = "Month"
+            date_filter["Month"] = [date_min, _month_start(date_max)]
+
+    return {"dims": dims, "predicates": predicates, "params": params, "date_filter": date_filter}
+
+
+def _where_for(source, wfilter):
+    """WHERE clause + params of `wfilter` on the rollup `source`"""
+    predicates = list(wfilter["predicates"])
+    params = list(wfilter["params"])
+    date_filter = wfilter["date_filter"]
+    if date_filter is not None:
+        column = "Month" if "Month" in WALMART_ROLLUPS[source] else "Date"
+        predicates.append(f"{column} BETWEEN ? AND ?")
+        params += date_filter[column]
+    return " AND ".join(predicates) or "TRUE", params
+
+
+def _needed_dims(group_dims, wfilter):
+    dims = set(group_dims) | wfilter["dims"]
+    if wfilter["date_filter"] is not None:
+        # A month-aligned period can also be filtered on Date-level rollups
+        dims.add("Date" if "Date" in group_dims else wfilter["date_filter"]["grain"])
+    return dims
+
+
+# ========================================
+# WALMART - FUSED AGGREGATION
+# ========================================
+
+# Measures re-aggregated from the rollups' additive columns
+WALMART_MEASURES = """
+  SUM(sales_sum) AS total_sales,
+  SUM(sales_sum) / SUM(sales_count) AS avg_sales,
+  MAX(sales_max) AS max_sales,
+  CAST(COALESCE(SUM(row_count), 0) AS BIGINT) AS nb_rows
+"""
+
+# GROUPING(Date, Store_Number, Holiday_Flag) identifies each grouping set
+# (bit = 1 when the column is NOT part of the set).
+GROUPING_TOTAL = 7            # ()
+GROUPING_DATE = 3             # (Date)
+GROUPING_STORE = 5            # (Store_Number)
+GROUPING_HOLIDAY = 6          # (Holiday_Flag)
+
+# Grouping sets answered at the store grain / at the date grain
+# (per-store holiday metrics: walmart_store_metrics_queries)
+STORE_GROUPING_SETS = [(), ("Store_Number",), ("Holiday_Flag",)]
+DATE_GROUPING_SETS = [("Date",)]
+
+
+def _fused_sql(source, where, grouping_sets):
+    """One GROUPING SETS query over `source` (columns outside the sets come back NULL)"""
+    grouped = {col for grouping_set in grouping_sets for col in grouping_set}
+    grouping_bits = []
+    select_cols = []
+    for col, col_type, weight in [("Date", "DATE", 4), ("Store_Number", "BIGINT", 2),
+                                  ("Holiday_Flag", "BIGINT", 1)]:
+        if col in grouped:
+            grouping_bits.append(f"GROUPING({col}) * {weight}")
+            select_cols.append(col)
+        else:
+            grouping_bits.append(str(weight))
+            select_cols.append(f"CAST(NULL AS {col_type}) AS {col}")
+    sets_sql = ", ".join("(" + ", ".join(grouping_set) + ")" for grouping_set in grouping_sets)
+    return f"""
+    SELECT
+      {" + ".join(grouping_bits)} AS grouping_id,
+      {", ".join(select_cols)},
+      {WALMART_MEASURES}
+    FROM {source}
+    WHERE {where}
+    GROUP BY GROUPING SETS ({sets_sql});
+    """
+
+
+def _grouping_set(df, grouping_id, columns, int_columns=()):
+    """Extract one grouping set from the fused result"""
+    part = df.loc[df["grouping_id"] == grouping_id, columns].reset_index(drop=True)
+    for col in int_columns:
+        part[col] = part[col].astype("int64")
+    return part
+
+
+def walmart_fused_queries(run_query, where_params, stores=None, date_bounds=None):
+    """
+    Plan the fused Walmart queries without running them
+
+    The store-level grouping sets and the date-level one are each routed to the
+    smallest rollup able to answer them; when both land on the same rollup a
+    single query is planned.
+
+    Args:
+        run_query: Callable(sql, params) -> DataFrame (used for the rollup sizes)
+        where_params: [store_sel, holiday_sel, date_min, date_max]
+        stores: Every Store_Number of the table (enables predicate elimination)
+        date_bounds: (MIN(Date), MAX(Date)) of the table
+
+    Returns:
+        Dict name -> (sql, params), independent queries (can run concurrently)
+    """
+    wfilter = walmart_filter(where_params, stores, date_bounds)
+    sizes = rollup_sizes(run_query)
+
+    store_source = pick_rollup(_needed_dims({"Store_Number"}, wfilter), sizes)
+    date_source = pick_rollup(_needed_dims({"Date"}, wfilter), sizes)
+
+    if store_source == date_source:
+        plan = {"fused": (store_source, STORE_GROUPING_SETS + DATE_GROUPING_SETS)}
+    else:
+        plan = {"fused_store": (store_source, STORE_GROUPING_SETS),
+                "fused_date": (date_source, DATE_GROUPING_SETS)}
+
+    queries = {}
+    for name, (source, grouping_sets) in plan.items():
+        where, params = _where_for(source, wfilter)
+        queries[name] = (_fused_sql(source, where, grouping_sets), params)
+    return queries
+
+
+def walmart_split_frames(parts):
+    """
+    Split the fused query results into the per-tab DataFrames
+
+    Args:
+        parts: Results of the queries planned by walmart_fused_queries
+
+    Returns:
+        Dict with keys: kpis (Series), time, store, holiday, performance
+    """
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+    kpis = df.loc[df["grouping_id"] == GROUPING_TOTAL,
+                  ["total_sales", "avg_sales", "max_sales", "nb_rows"]].iloc[0]
+
+    df_time = _grouping_set(df, GROUPING_DATE, ["Date", "total_sales"])
+    df_time = df_time.sort_values("Date").reset_index(drop=True)
+
+    df_per_store = _grouping_set(
+        df, GROUPING_STORE,
+        ["Store_Number", "total_sales", "avg_sales", "nb_rows"],
+        int_columns=["Store_Number"]
+    )
+    df_per_store = df_per_store.sort_values("total_sales", ascending=False).reset_index(drop=True)
+
+    df_store = df_per_store[["Store_Number", "total_sales"]].copy()
+
+    df_performance = df_per_store[["Store_Number", "total_sales", "avg_sales", "nb_rows"]]
+    df_performance = df_performance.rename(columns={"nb_rows": "nb_weeks"})
+
+    df_holiday = _grouping_set(df, GROUPING_HOLIDAY, ["Holiday_Flag", "total_sales"],
+                               int_columns=["Holiday_Flag"])
+    df_holiday = df_holiday.sort_values("Holiday_Flag").reset_index(drop=True)
+
+    return {
+        "kpis": kpis,
+        "time": df_time,
+        "store": df_store,
+        "holiday": df_holiday,
+        "performance": df_performance,
+    }
+
+
+# ========================================
+# WALMART - STORE METRICS
+# ========================================
+
+# Stores shown by the holiday impact chart (strongest / weakest)
+HOLIDAY_IMPACT_TOP_K = 10
+
+# Per-store metrics in one pass over a rollup: holiday / regular splits with
+# FILTER aggregates, averages rebuilt from the additive sum / count columns
+# (an AVG of rollup rows would weight them equally), NULLIF against empty splits
+STORE_METRICS_SQL = """
+    SELECT
+      Store_Number,
+      SUM(sales_sum) / SUM(sales_count) AS avg_weekly_sales,
+      SUM(sales_sum) AS total_sales,
+      SUM(temperature_sum) / SUM(temperature_count) AS avg_temperature,
+      SUM(fuel_price_sum) / SUM(fuel_price_count) AS avg_fuel_price,
+      SUM(cpi_sum) / SUM(cpi_count) AS avg_cpi,
+      SUM(unemployment_sum) / SUM(unemployment_count) AS avg_unemployment,
+      COALESCE(SUM(sales_sum) FILTER (WHERE Holiday_Flag = 1), 0) AS holiday_sales,
+      COALESCE(SUM(sales_sum) FILTER (WHERE Holiday_Flag = 0), 0) AS regular_sales,
+      SUM(sales_sum) FILTER (WHERE Holiday_Flag = 1)
+        / NULLIF(SUM(sales_count) FILTER (WHERE Holiday_Flag = 1), 0) AS holiday_avg_sales,
+      SUM(sales_sum) FILTER (WHERE Holiday_Flag = 0)
+        / NULLIF(SUM(sales_count) FILTER (WHERE Holiday_Flag = 0), 0) AS regular_avg_sales,
+      ROUND(100 * (holiday_avg_sales / NULLIF(regular_avg_sales, 0) - 1), 1) AS holiday_impact_pct,
+      CAST(SUM(row_count) AS BIGINT) AS num_records,
+      CAST(COALESCE(SUM(row_count) FILTER (WHERE Holiday_Flag = 1), 0) AS BIGINT) AS num_holidays
+    FROM {source}
+    WHERE {where}
+    GROUP BY Store_Number
+"""
+
+
+def walmart_store_metrics_queries(run_query, where_params, stores=None, date_bounds=None,
+                                  top_k=HOLIDAY_IMPACT_TOP_K):
+    """
+    Plan the per-store metric queries (comparator tab, holiday impact chart)
+
+    Both read the smallest rollup keeping Store_Number and Holiday_Flag (plus
+    the date grain when the period is restricted).
+
+    Args:
+        run_query: Callable(sql, params) -> DataFrame (used for the rollup sizes)
+        where_params: [store_sel, holiday_sel, date_min, date_max]
+        stores: Every Store_Number of the table
+        date_bounds: (MIN(Date), MAX(Date)) of the table
+        top_k: Stores kept at each end of the holiday impact ranking
+
+    Returns:
+        Dict with
+        - store_metrics: one row per store (STORE_METRICS_SQL), by total sales
+        - holiday_impact: the top_k strongest and weakest holiday_impact_pct,
+          with their rank from each end (impact_rank_high / impact_rank_low)
+    """
+    wfilter = walmart_filter(where_params, stores, date_bounds)
+    source = pick_rollup(_needed_dims({"Store_Number", "Holiday_Flag"}, wfilter), rollup_sizes(run_query))
+    where, params = _where_for(source, wfilter)
+    metrics = STORE_METRICS_SQL.format(source=source, where=where)
+    return {
+        "store_metrics": (f"{metrics}\n    ORDER BY total_sales DESC, Store_Number;", params),
+        "holiday_impact": (f"""
+    WITH metrics AS ({metrics})
+    SELECT
+      Store_Number,
+      holiday_impact_pct AS Impact,
+      row_number() OVER (ORDER BY holiday_impact_pct DESC, Store_Number) AS impact_rank_high,
+      row_number() OVER (ORDER BY holiday_impact_pct ASC, Store_Number) AS impact_rank_low
+    FROM metrics
+    WHERE holiday_impact_pct IS NOT NULL
+    QUALIFY impact_rank_high <= {int(top_k)} OR impact_rank_low <= {int(top_k)}
+    ORDER BY impact_rank_high;
+    """, params),
+    }
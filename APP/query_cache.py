@@ -0,0 +1,214 @@
+"""
+Result cache for DuckDB queries
+Avoids re-running identical queries on every Streamlit rerun
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# ========================================
+# CACHE KEYS
+# ========================================
+
+def normalize_sql(sql):
+    """
+    Normalize SQL text so that indentation / line breaks don't change the key
+
+    Args:
+        sql: SQL query string
+
+    Returns:
+        SQL string with collapsed whitespace and no trailing semicolon
+    """
+    return " ".join(sql.split()).rstrip(";").strip()
+
+
+def _normalize_param(value):
+    # numpy arrays / scalars -> Python lists / numbers (repr truncates arrays over 1000 items)
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_normalize_param(item) for item in value]
+    return value
+
+
+def _json_default(value):
+    # Dates, Decimals...: the type is kept so that date(2024, 1, 5) and '2024-01-05' differ
+    return f"{type(value).__name__}:{value}"
+
+
+def params_hash(params):
+    """
+    Hash query parameters (lists, numpy arrays, dates, numbers...)
+
+    Arrays and tuples are hashed as lists of every element, not through their repr.
+
+    Args:
+        params: List of query parameters (or None)
+
+    Returns:
+        Hex digest string
+    """
+    normalized = json.dumps(_normalize_param(params), default=_json_default)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def make_key(sql, params=None, fmt="pandas"):
+    """Build the cache key: normalized SQL + parameter hash + result format"""
+    return (normalize_sql(sql), params_hash(params), fmt)
+
+
+def result_nbytes(result):
+    """Memory footprint of a result (pandas DataFrame or pyarrow Table)"""
+    if hasattr(result, "memory_usage"):
+        return int(result.memory_usage(deep=True).sum())
+    return result.nbytes
+
+
+def _copy(result):
+    # pyarrow Tables are immutable and can be shared as-is
+    return result.copy() if hasattr(result, "copy") else result
+
+
+# ========================================
+# QUERY CACHE
+# ========================================
+
+class QueryCache:
+    """
+    LRU + TTL cache of query results (pandas DataFrames or pyarrow Tables)
+
+    - Entries expire after `ttl_seconds`
+    - Least recently used entries are evicted when `max_entries` or
+      `max_bytes` is exceeded
+    - The whole cache is invalidated when the database file changes
+      (mtime / size of `db_path`)
+    - Hit / miss / eviction counters are exposed through `stats()`
+    """
+
+    def __init__(self, db_path, max_entries=256, max_bytes=256 * 1024 * 1024,
+                 ttl_seconds=600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()  # key -> (df, nbytes, created_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db_version = self._current_db_version()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _current_db_version(self):
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _check_db_version(self):
+        version = self._current_db_version()
+        if version != self._db_version:
+            self._db_version = version
+            self._clear()
+            self.invalidations += 1
+
+    def _clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _pop(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._bytes > self.max_bytes):
+            _, (_, nbytes, _) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+            self.evictions += 1
+
+    def get(self, sql, params=None, fmt="pandas"):
+        """
+        Look up a cached result
+
+        Returns:
+            A copy of the cached DataFrame (the Table itself for "arrow"), or None on miss
+        """
+        key = make_key(sql, params, fmt)
+        with self._lock:
+            self._check_db_version()
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl_seconds:
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Copy: callers add columns to the DataFrames they receive
+            return _copy(entry[0])
+
+    def put(self, sql, params, df, fmt="pandas"):
+        """Store a result (skipped if larger than the whole memory budget)"""
+        nbytes = result_nbytes(df)
+        if nbytes > self.max_bytes:
+            return
+        key = make_key(sql, params, fmt)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (_copy(df), nbytes, time.monotonic())
+            self._bytes += nbytes
+            self._evict()
+
+    def get_or_run(self, sql, params, run, fmt="pandas"):
+        """
+        Return the cached result or execute `run()` and cache it
+
+        Args:
+            sql: SQL query string
+            params: Query parameters
+            run: Callable executing the query and returning the result
+            fmt: Result format ("pandas" or "arrow"), part of the cache key
+
+        Returns:
+            pandas DataFrame or pyarrow Table
+        """
+        df = self.get(sql, params, fmt)
+        if df is None:
+            df = run()
+            self.put(sql, params, df, fmt)
+        return df
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """
+        Cache counters
+
+        Returns:
+            Dict with hits, misses, evictions, invalidations, entries, bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,552 @@
+"""
+Headless KPI service
+The dashboard KPIs as JSON / Arrow endpoints of a plain ASGI application (no
+web framework), built on the same query layer (queries.py), result cache and
+DuckDB connection pool as the Streamlit app - other tools query it directly
+instead of opening a browser session
+
+    python APP/service.py --port 8600
+    uvicorn service:app --app-dir APP --port 8600
+    curl "http://127.0.0.1:8600/walmart/kpis?stores=1,2,3&date_min=2011-01-01"
+    curl "http://127.0.0.1:8600/ev/brands?segment=D%20-%20Large&format=arrow" -o brands.arrow
+    curl "http://127.0.0.1:8600/kpi/ev.top_range?n=5&brand=Tesla,BMW"
+"""
+
+import argparse
+import asyncio
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+from arrow_utils import fetch_arrow
+from catalog import load_catalog
+from db import DEFAULT_POOL_SIZE, ConnectionPool, PoolClosedError
+from queries import (
+    HOLIDAY_FLAGS, HOLIDAY_IMPACT_TOP_K, connect_parquet, ev_where, walmart_fused_queries,
+    walmart_split_frames, walmart_store_metrics_queries, walmart_where,
+)
+from kpi_registry import get_kpi, load_registry, run_kpi, validate_registry
+from query_cache import QueryCache
+
+
+# Same settings (and environment variables) as APP/app.py
+DB_PATH = os.environ.get("KPI_DB_PATH", "data/project.db")
+PARQUET_DIR = "data/parquet"
+POOL_SIZE = int(os.environ.get("KPI_POOL_SIZE", DEFAULT_POOL_SIZE))
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+
+# Serialized KPI responses kept per data version (least recently used dropped)
+RESPONSE_CACHE_ENTRIES = 1024
+# Split Walmart frames kept per (data version, filters): shared by the four
+# endpoints of the fused queries, so a hit does no pandas reshaping
+FRAMES_CACHE_ENTRIES = 256
+# Endpoints whose response only depends on the data and the query string
+CACHED_PREFIXES = ("/walmart/", "/ev/", "/kpi/")
+# Any registered KPI, by name: /kpi/ev.top_range?n=5&brand=Tesla
+KPI_PREFIX = "/kpi/"
+
+JSON_TYPE = b"application/json"
+ARROW_TYPE = b"application/vnd.apache.arrow.stream"
+
+
+class RequestError(ValueError):
+    """Invalid request parameter (answered with HTTP 400)"""
+
+
+# ========================================
+# PARAMETERS
+# ========================================
+
+def parse_query_string(query_string):
+    """
+    Query string -> dict name -> list of values
+
+    Repeated keys and comma-separated values are equivalent:
+    `stores=1&stores=2` == `stores=1,2`
+
+    Args:
+        query_string: Raw query string (bytes)
+
+    Returns:
+        Dict name -> list of non-empty strings
+    """
+    parsed = parse_qs(query_string.decode("utf-8"), keep_blank_values=True)
+    return {name: [v.strip() for value in values for v in value.split(",") if v.strip()]
+            for name, values in parsed.items()}
+
+
+def _selection(query, name, universe, cast=str):
+    """Selected values of `name` (every value of the catalog when absent)"""
+    if name not in query:
+        return list(universe)
+    try:
+        return [cast(value) for value in query[name]]
+    except ValueError:
+        raise RequestError(f"invalid value for '{name}': {','.join(query[name])}") from None
+
+
+def _date(query, name, default):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return datetime.date.fromisoformat(values[0])
+    except ValueError:
+        raise RequestError(f"invalid date for '{name}' (YYYY-MM-DD): {values[0]}") from None
+
+
+def _param(value):
+    """Extra KPI parameter: integer / number when it parses as one, else text"""
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _int(query, name, default):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise RequestError(f"invalid integer for '{name}': {values[0]}") from None
+
+
+# ========================================
+# RESPONSES
+# ========================================
+
+def kpi_record(row, int_columns=()):
+    """KPI row (Series) -> dict of JSON-ready Python numbers (None for NULL)"""
+    return {name: None if pd.isna(value) else int(value) if name in int_columns else float(value)
+            for name, value in row.items()}
+
+
+def to_json(result):
+    """DataFrame -> JSON array of records, dict -> JSON object"""
+    if isinstance(result, dict):
+        return json.dumps(result, default=str).encode("utf-8")
+    return result.to_json(orient="records", date_format="iso").encode("utf-8")
+
+
+def to_arrow(result):
+    """DataFrame -> Arrow IPC stream (a dict becomes a one-row table)"""
+    if isinstance(result, dict):
+        table = pa.Table.from_pylist([result])
+    else:
+        table = pa.Table.from_pandas(result, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _error(message):
+    return json.dumps({"error": message}).encode("utf-8")
+
+
+# ========================================
+# KPI SERVICE
+# ========================================
+
+class KpiService:
+    """
+    ASGI application serving the dashboard KPIs
+
+    - Handlers are coroutines: queries run on a thread pool, each thread
+      checking out its own cursor from a ConnectionPool over one database
+    - Results go through a QueryCache (same keys as the dashboard), so
+      repeated requests with the same filters do not reach DuckDB; the
+      serialized responses are kept too (per data version) and are answered
+      on the event loop without touching pandas or the thread pool
+    - The filter options (stores, brands, date bounds) come from the loader's
+      dimension catalog, reloaded when the data changes
+    - GET only; `format=arrow` returns an Arrow IPC stream instead of JSON
+    """
+
+    def __init__(self, source="duckdb", db_path=DB_PATH, parquet_dir=PARQUET_DIR,
+                 pool_size=POOL_SIZE):
+        self.source = source
+        self.db_path = db_path
+        self.parquet_dir = parquet_dir
+        self.pool_size = max(1, int(pool_size))
+        self.marker = os.path.join(parquet_dir, "_export.json")
+        self.cache = QueryCache(self.marker if source == "parquet" else db_path,
+                                max_entries=1024, max_bytes=256 * 1024 * 1024, ttl_seconds=600)
+        self.executor = ThreadPoolExecutor(max_workers=self.pool_size,
+                                           thread_name_prefix="kpi-service")
+
+        self._pool = None
+        self._pool_version = None
+        self._catalogs = {}  # table -> (data version, catalog)
+        self.kpi_errors = []
+        self._responses = OrderedDict()  # (data version, path, query string) -> response
+        self._frames = OrderedDict()  # (data version, filters) -> walmart_split_frames
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.errors = 0
+        self.response_hits = 0
+        self.started_at = time.time()
+
+        self.routes = {
+            "/": self.index,
+            "/health": self.health,
+            "/stats": self.stats,
+            "/walmart/kpis": self.walmart_kpis,
+            "/walmart/sales_by_store": self.walmart_sales_by_store,
+            "/walmart/sales_by_date": self.walmart_sales_by_date,
+            "/walmart/sales_by_holiday": self.walmart_sales_by_holiday,
+            "/walmart/store_metrics": self.walmart_store_metrics,
+            "/walmart/holiday_impact": self.walmart_holiday_impact,
+            "/ev/kpis": self.ev_kpis,
+            "/ev/brands": self.ev_brands,
+        }
+
+    # ---- data access ----
+
+    def _connect(self):
+        if self.source == "parquet":
+            return connect_parquet(self.parquet_dir)
+        return duckdb.connect(self.db_path, read_only=True)
+
+    def _data_version(self):
+        return os.path.getmtime(self.marker if self.source == "parquet" else self.db_path)
+
+    def pool(self):
+        """Connection pool, reopened when a new Parquet export is written"""
+        version = os.path.getmtime(self.marker) if self.source == "parquet" else None
+        with self._lock:
+            if self._pool is None or version != self._pool_version:
+                if self._pool is not None:
+                    # Closed once the requests still running on it return their cursor
+                    self._pool.retire()
+                self._pool = ConnectionPool(self._connect, size=self.pool_size)
+                self._pool_version = version
+                # KPI registry checked against the schema of the (re)opened source
+                with self._pool.connection(owner="service") as con:
+                    self.kpi_errors = validate_registry(con)
+            return self._pool
+
+    def _execute(self, sql, params=None, arrow=False):
+        while True:
+            try:
+                with self.pool().connection(owner="service") as con:
+                    cursor = con.execute(sql) if params is None else con.execute(sql, params)
+                    return fetch_arrow(cursor) if arrow else cursor.fetchdf()
+            except PoolClosedError:
+                # Pool retired between pool() and the checkout: take the new one
+                continue
+
+    def run_query(self, sql, params=None, arrow=False):
+        """Cached query result (pandas DataFrame, or pyarrow Table with arrow=True)"""
+        fmt = "arrow" if arrow else "pandas"
+        return self.cache.get_or_run(sql, params, lambda: self._execute(sql, params, arrow), fmt=fmt)
+
+    def catalog(self, table_name):
+        """Dimension catalog of `table_name` (see catalog.py), one load per data version"""
+        version = self._data_version()
+        entry = self._catalogs.get(table_name)
+        if entry is None or entry[0] != version:
+            entry = (version, load_catalog(lambda sql, params: self._execute(sql, params), table_name))
+            self._catalogs[table_name] = entry
+        return entry[1]
+
+    # ---- filters ----
+
+    def walmart_filters(self, query):
+        """
+        Filters of the Walmart endpoints
+
+        Query parameters: stores, holiday (0 / 1), date_min, date_max
+        (absent = everything, like the dashboard defaults)
+
+        Returns:
+            (where_params, stores, date_bounds) as expected by queries.py
+        """
+        catalog = self.catalog("walmart")
+        stores = catalog["values"]["Store_Number"]
+        dmin, dmax = catalog["columns"]["Date"]["min"], catalog["columns"]["Date"]["max"]
+        store_sel = _selection(query, "stores", stores, int)
+        holiday_sel = _selection(query, "holiday", HOLIDAY_FLAGS, int)
+        date_min, date_max = _date(query, "date_min", dmin), _date(query, "date_max", dmax)
+        if date_min > date_max:
+            raise RequestError("date_min is after date_max")
+        return [store_sel, holiday_sel, date_min, date_max], stores, (dmin, dmax)
+
+    def ev_filters(self, query):
+        """
+        Filters of the EV endpoints
+
+        Query parameters: brand, segment (absent = every value)
+
+        Returns:
+            (where_sql, params) from queries.ev_where
+        """
+        catalog = self.catalog("ev")
+        brands, segments = catalog["values"]["brand"], catalog["values"]["segment"]
+        return ev_where(_selection(query, "brand", brands), _selection(query, "segment", segments),
+                        brands=brands, segments=segments)
+
+    def raw_filter(self, dataset, query):
+        """Compiled WHERE of `dataset` for the registry KPIs (row-level queries)"""
+        if dataset == "ev":
+            return self.ev_filters(query)
+        where_params, stores, date_bounds = self.walmart_filters(query)
+        return walmart_where(where_params, partitioned=self.source == "parquet",
+                             stores=stores, date_bounds=date_bounds)
+
+    # ---- endpoints ----
+
+    def walmart_frames(self, query):
+        """
+        KPI and per-tab frames of the dashboard (fused GROUPING SETS queries)
+
+        The split frames are cached per data version and normalized filters
+        (read-only: the endpoints only serialize them).
+        """
+        where_params, stores, date_bounds = self.walmart_filters(query)
+        store_sel, holiday_sel, date_min, date_max = where_params
+        key = (self._data_version(), tuple(sorted(set(store_sel))), tuple(sorted(set(holiday_sel))),
+               str(date_min), str(date_max))
+        with self._lock:
+            frames = self._frames.get(key)
+            if frames is not None:
+                self._frames.move_to_end(key)
+                return frames
+        queries = walmart_fused_queries(self.run_query, where_params, stores, date_bounds)
+        frames = walmart_split_frames([self.run_query(sql, params) for sql, params in queries.values()])
+        with self._lock:
+            self._frames[key] = frames
+            while len(self._frames) > FRAMES_CACHE_ENTRIES:
+                self._frames.popitem(last=False)
+        return frames
+
+    def walmart_store_queries(self, query):
+        where_params, stores, date_bounds = self.walmart_filters(query)
+        top_k = _int(query, "top_k", HOLIDAY_IMPACT_TOP_K)
+        return walmart_store_metrics_queries(self.run_query, where_params, stores, date_bounds, top_k)
+
+    def walmart_kpis(self, query):
+        """Total / average / max weekly sales and number of rows"""
+        return kpi_record(self.walmart_frames(query)["kpis"], int_columns=("nb_rows",))
+
+    def walmart_sales_by_store(self, query):
+        """Total sales per store, best first"""
+        return self.walmart_frames(query)["store"]
+
+    def walmart_sales_by_date(self, query):
+        """Total sales per week"""
+        return self.walmart_frames(query)["time"]
+
+    def walmart_sales_by_holiday(self, query):
+        """Total sales per Holiday_Flag"""
+        return self.walmart_frames(query)["holiday"]
+
+    def walmart_store_metrics(self, query):
+        """Per-store metrics of the comparator tab (holiday / regular splits)"""
+        return self.run_query(*self.walmart_store_queries(query)["store_metrics"])
+
+    def walmart_holiday_impact(self, query):
+        """Stores with the strongest / weakest holiday impact (top_k of each)"""
+        return self.run_query(*self.walmart_store_queries(query)["holiday_impact"])
+
+    def ev_kpis(self, query):
+        """Number of models, average range, battery capacity and top speed"""
+        row = run_kpi(self.run_query, "ev.summary", self.ev_filters(query)).iloc[0]
+        return kpi_record(row, int_columns=("nb_models",))
+
+    def ev_brands(self, query):
+        """Average range and number of models per brand"""
+        return run_kpi(self.run_query, "ev.range_by_brand", self.ev_filters(query))
+
+    def kpi(self, name, query):
+        """
+        Registered KPI `name` (sql/kpis_*.sql) with the filters of its table
+        and its declared extra parameters (e.g. n for ev.top_range)
+        """
+        kpi = get_kpi(name)
+        missing = [param for param in kpi["params"] if not query.get(param)]
+        if missing:
+            raise RequestError(f"{name}: missing parameter(s) {', '.join(missing)}")
+        args = [_param(query[param][0]) for param in kpi["params"]]
+        where = self.raw_filter(kpi["dataset"], query) if kpi["filters"] else None
+        try:
+            return run_kpi(self.run_query, name, where, args)
+        except (duckdb.DataError, duckdb.BinderException) as e:
+            # The statement itself was prepared at startup (validate_registry):
+            # a conversion / bind error comes from the values passed by the client
+            if not args:
+                raise
+            raise RequestError(f"{name}: invalid value for {', '.join(kpi['params'])}: "
+                               f"{str(e).splitlines()[0]}") from None
+
+    def index(self, query):
+        """Available endpoints"""
+        endpoints = {path: (handler.__doc__ or "").strip() for path, handler in self.routes.items()}
+        for name, kpi in load_registry().items():
+            endpoints[f"{KPI_PREFIX}{name}"] = kpi["title"]
+        return endpoints
+
+    def health(self, query):
+        """Liveness check (runs SELECT 1 on a pooled cursor)"""
+        self._execute("SELECT 1")
+        return {"status": "degraded" if self.kpi_errors else "ok", "source": self.source,
+                "kpi_errors": self.kpi_errors}
+
+    def stats(self, query):
+        """Request, cache and pool counters"""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "response_hits": self.response_hits,
+            "responses_cached": len(self._responses),
+            "frames_cached": len(self._frames),
+            "cache": self.cache.stats(),
+            "pool": self.pool().stats(),
+        }
+
+    # ---- ASGI ----
+
+    def _response_key(self, path, query_string):
+        path = path.rstrip("/") or "/"
+        if not path.startswith(CACHED_PREFIXES):
+            return None
+        try:
+            return (self._data_version(), path, query_string)
+        except OSError:
+            return None
+
+    def _cached_response(self, key):
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+                self.response_hits += 1
+            return response
+
+    def _store_response(self, key, response):
+        with self._lock:
+            self._responses[key] = response
+            while len(self._responses) > RESPONSE_CACHE_ENTRIES:
+                self._responses.popitem(last=False)
+
+    def respond(self, method, path, query_string):
+        """
+        Run the handler of `path` (blocking: called on the thread pool)
+
+        Returns:
+            (status, content type, body)
+        """
+        if method not in ("GET", "HEAD"):
+            return 405, JSON_TYPE, _error("method not allowed")
+        path = path.rstrip("/") or "/"
+        handler = self.routes.get(path)
+        kpi_name = path[len(KPI_PREFIX):] if path.startswith(KPI_PREFIX) else None
+        if handler is None and kpi_name in load_registry():
+            handler = functools.partial(self.kpi, kpi_name)
+        if handler is None:
+            return 404, JSON_TYPE, _error(f"unknown endpoint {path}")
+        try:
+            query = parse_query_string(query_string)
+            fmt = (query.pop("format", None) or ["json"])[0]
+            if fmt not in ("json", "arrow"):
+                raise RequestError("format must be 'json' or 'arrow'")
+            result = handler(query)
+            if fmt == "arrow":
+                return 200, ARROW_TYPE, to_arrow(result)
+            return 200, JSON_TYPE, to_json(result)
+        except RequestError as e:
+            return 400, JSON_TYPE, _error(str(e))
+        except TimeoutError as e:
+            return 503, JSON_TYPE, _error(str(e))
+        except Exception as e:
+            return 500, JSON_TYPE, _error(f"{type(e).__name__}: {e}")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method, path, query_string = scope["method"], scope["path"], scope["query_string"]
+        key = self._response_key(path, query_string) if method in ("GET", "HEAD") else None
+        response = self._cached_response(key) if key is not None else None
+        if response is None:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.executor, self.respond,
+                                                  method, path, query_string)
+            if key is not None and response[0] == 200:
+                self._store_response(key, response)
+        status, content_type, body = response
+        self.requests += 1
+        if status >= 400:
+            self.errors += 1
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type),
+                        (b"content-length", str(len(body)).encode("ascii"))],
+        })
+        await send({"type": "http.response.body",
+                    "body": b"" if scope["method"] == "HEAD" else body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def close(self):
+        """Stop the worker threads and close the pooled cursors"""
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
+
+# Source chosen by KPI_SOURCE ("duckdb" or "parquet") for `uvicorn service:app`
+app = KpiService(source=os.environ.get("KPI_SOURCE", "duckdb"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service HTTP / JSON des KPI (ASGI)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--source", choices=["duckdb", "parquet"], default="duckdb",
+                        help="base DuckDB ou export Parquet (data/parquet)")
+    parser.add_argument("--db", default=DB_PATH, help="base DuckDB")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE,
+                        help="curseurs DuckDB / threads de requêtes")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn n'est pas installé : pip install uvicorn "
+                         "(ou tout autre serveur ASGI avec service:app)")
+
+    service = KpiService(source=args.source, db_path=args.db, pool_size=args.pool_size)
+    uvicorn.run(service, host=args.host, port=args.port, log_level="warning")
@@ -4,23 +4,41 @@ Reduces code repetition and improves maintainability
 """
 
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+import time
 from contextlib import contextmanager
 
+from figure_cache import memoize_figure
+from instrumentation import record_section
+from lazy_imports import lazy_import
+
+# Chart libraries: imported by the first chart, after the KPI cards are drawn
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
+
+
+# Default labels of categorize_performance (3 categories, lowest first)
+PERFORMANCE_LABELS = ["⚠️ Faible", "✅ Moyen", "🌟 Élevé"]
+
 
 # ========================================
 # CONTEXT MANAGERS (for cleaner code)
 # ========================================
 
 @contextmanager
-def section_card():
-    """Context manager for section cards - automatically opens and closes the div"""
+def section_card(name="section"):
+    """
+    Context manager for section cards - automatically opens and closes the div
+
+    The rendering time of the block is recorded under `name` (Performance panel)
+    """
     st.markdown('<div class="section-card">', unsafe_allow_html=True)
+    start = time.perf_counter()
     try:
         yield
     finally:
+        record_section(name, time.perf_counter() - start)
         st.markdown("</div>", unsafe_allow_html=True)
 
 
@@ -45,6 +63,7 @@ def format_number(value, prefix="$", suffix=""):
     return f"{prefix}{value:,.0f}{suffix}"
 
 
+@memoize_figure
 def create_scatter_plot(df, x, y, color=None, hover_data=None, 
                        color_scale=None, title_x=None, title_y=None, 
                        height=300, color_discrete_sequence=None):
@@ -86,6 +105,7 @@ def create_scatter_plot(df, x, y, color=None, hover_data=None,
     return fig
 
 
+@memoize_figure
 def create_bar_chart(df, x, y, color=None, color_map=None, 
                     title_x=None, title_y=None, height=280, 
                     show_text=True, text_position='outside'):
@@ -130,6 +150,7 @@ def create_bar_chart(df, x, y, color=None, color_map=None,
     return fig
 
 
+@memoize_figure
 def create_line_chart(df, x, y, color=None, markers=True,
                      title_x=None, title_y=None, height=420,
                      color_sequence=None):
@@ -169,6 +190,98 @@ def create_line_chart(df, x, y, color=None, markers=True,
     return fig
 
 
+@memoize_figure
+def create_box_from_stats(df_stats, group, df_outliers=None, colors=None,
+                          title_x=None, title_y=None, height=280):
+    """
+    Create a box plot from precomputed statistics (see distribution.box_stats)
+    
+    Args:
+        df_stats: DataFrame with one row per group (q1, median, q3, mean,
+                  lower_fence, upper_fence)
+        group: Column name of the groups
+        df_outliers: DataFrame with the group column and `value` (optional)
+        colors: List of colors (cycled over the groups)
+        title_x: X-axis title
+        title_y: Y-axis title
+        height: Figure height in pixels
+    
+    Returns:
+        Plotly figure
+    """
+    colors = colors or px.colors.qualitative.Set2
+    fig = go.Figure()
+    
+    for i, row in enumerate(df_stats.itertuples(index=False)):
+        name = str(getattr(row, group))
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            x=[name], name=name,
+            q1=[row.q1], median=[row.median], q3=[row.q3], mean=[row.mean],
+            lowerfence=[row.lower_fence], upperfence=[row.upper_fence],
+            marker_color=color, boxpoints=False
+        ))
+        if df_outliers is not None:
+            values = df_outliers.loc[df_outliers[group] == getattr(row, group), "value"]
+            if len(values):
+                fig.add_trace(go.Scatter(
+                    x=[name] * len(values), y=values, mode="markers",
+                    marker=dict(color=color, size=5), name=name, showlegend=False
+                ))
+    
+    fig.update_layout(
+        height=height,
+        margin=dict(l=10, r=10, t=10, b=10),
+        showlegend=False
+    )
+    
+    if title_x:
+        fig.update_xaxes(title_text=title_x)
+    if title_y:
+        fig.update_yaxes(title_text=title_y)
+    
+    return fig
+
+
+@memoize_figure
+def create_prebinned_histogram(df_bins, color="#1E78FF",
+                               title_x=None, title_y=None, height=280):
+    """
+    Create a histogram from precomputed bins (see distribution.histogram_bins)
+    
+    Args:
+        df_bins: DataFrame with bin_start, bin_end, count
+        color: Bar color
+        title_x: X-axis title
+        title_y: Y-axis title
+        height: Figure height in pixels
+    
+    Returns:
+        Plotly figure
+    """
+    fig = go.Figure(go.Bar(
+        x=(df_bins["bin_start"] + df_bins["bin_end"]) / 2,
+        y=df_bins["count"],
+        width=df_bins["bin_end"] - df_bins["bin_start"],
+        customdata=df_bins[["bin_start", "bin_end"]],
+        hovertemplate="%{customdata[0]:.0f} - %{customdata[1]:.0f}<br>%{y}<extra></extra>",
+        marker=dict(color=color, line=dict(width=0))
+    ))
+    
+    fig.update_layout(
+        height=height,
+        margin=dict(l=10, r=10, t=10, b=10),
+        bargap=0
+    )
+    
+    if title_x:
+        fig.update_xaxes(title_text=title_x)
+    if title_y:
+        fig.update_yaxes(title_text=title_y)
+    
+    return fig
+
+
 def create_kpi_card(label, value, subtitle=None):
     """
     Create HTML for a KPI card
@@ -211,34 +324,48 @@ def create_section_card(title, content):
     """
 
 
-def categorize_performance(df, value_column, categories=3):
+def performance_quantiles(categories=3):
+    """
+    Quantile cut points of `categories` bins: i / categories, truncated to the percent
+
+    Returns:
+        List of categories - 1 floats ([0.33, 0.66] for 3 bins)
+    """
+    return [int(100 * i / categories) / 100 for i in range(1, categories)]
+
+
+def categorize_performance(df, value_column, categories=3, labels=None, thresholds=None,
+                           column='Catégorie'):
     """
-    Categorize performance into levels (Low, Medium, High)
+    Categorize performance into quantile bins (Low, Medium, High by default)
+    
+    Vectorized (np.digitize): value < t1 -> labels[0], t1 <= value < t2 -> labels[1], ...
+    Works for any entity (stores, EV models...).
     
     Args:
         df: DataFrame with data
         value_column: Column name to use for categorization
         categories: Number of categories (default: 3)
+        labels: One label per category, lowest first (default: PERFORMANCE_LABELS for 3)
+        thresholds: Precomputed cut points
+                    (default: pandas quantiles of performance_quantiles(categories))
+        column: Name of the added column
     
     Returns:
-        DataFrame with added 'Catégorie' column
+        (df, threshold_1, ..., threshold_{categories - 1}) - df with the added column
     """
-    if categories == 3:
-        q33 = df[value_column].quantile(0.33)
-        q66 = df[value_column].quantile(0.66)
-        
-        def categorize(value):
-            if value < q33:
-                return "⚠️ Faible"
-            elif value < q66:
-                return "✅ Moyen"
-            else:
-                return "🌟 Élevé"
-        
-        df['Catégorie'] = df[value_column].apply(categorize)
-        return df, q33, q66
+    if labels is None:
+        labels = PERFORMANCE_LABELS if categories == 3 else [f"Q{i}" for i in range(1, categories + 1)]
+    if len(labels) != categories:
+        raise ValueError(f"{len(labels)} labels for {categories} categories")
+    
+    if thresholds is None:
+        thresholds = df[value_column].quantile(performance_quantiles(categories)).to_numpy()
+    thresholds = np.asarray(thresholds, dtype=float)
     
-    return df, None, None
+    bins = np.digitize(df[value_column].to_numpy(dtype=float), thresholds)
+    df[column] = np.asarray(labels, dtype=object)[bins]
+    return (df, *thresholds.tolist())
 
 
 def create_comparison_selector(features_dict, key_prefix, default_x=0, default_y=1):
@@ -331,7 +458,7 @@ def render_comparison_quadrant(df, features_dict, chart_num,
         hover_cols: Columns to display on hover
         color_scale: Plotly color scale name
     """
-    with section_card():
+    with section_card(f"Graphique {chart_num}"):
         st.markdown(f"#### 📊 Graphique {chart_num}")
         
         # Create selectors
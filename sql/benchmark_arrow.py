@@ -0,0 +1,117 @@
+"""
+Benchmark : chemin pandas (fetchdf + px.line) vs chemin Arrow
+(to_arrow_table + traces Plotly sur des vues NumPy) pour les requêtes
+qui renvoient toutes les lignes brutes de walmart (sql_weekly_perf, sql_distribution).
+
+Chaque variante tourne dans un processus séparé : le pic mémoire (ru_maxrss)
+est mesuré au-dessus de la mémoire déjà occupée après les imports.
+
+    python sql/benchmark_arrow.py [--db data/project.db] [--runs 5]
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "APP"))
+
+SQL_WEEKLY_PERF = """
+SELECT Date, Store_Number, Weekly_Sales AS sales
+FROM walmart
+ORDER BY Store_Number, Date;
+"""
+
+SQL_DISTRIBUTION = """
+SELECT Weekly_Sales AS sales, Holiday_Flag, Store_Number
+FROM walmart;
+"""
+
+# Stores tracés (comme le multiselect de l'onglet "Analyses Avancées")
+N_TREND_STORES = 5
+
+
+def _max_rss_mb():
+    # ru_maxrss : Ko sous Linux, octets sous macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run_pandas(con):
+    import plotly.express as px
+
+    df_weekly_perf = con.execute(SQL_WEEKLY_PERF).fetchdf()
+    con.execute(SQL_DISTRIBUTION).fetchdf()
+    stores = df_weekly_perf["Store_Number"].unique()[:N_TREND_STORES]
+    df_selected = df_weekly_perf[df_weekly_perf["Store_Number"].isin(stores)]
+    fig = px.line(df_selected, x="Date", y="sales", color="Store_Number")
+    return fig.to_json()
+
+
+def run_arrow(con):
+    from arrow_utils import create_arrow_line_chart, fetch_arrow, filter_isin
+
+    tbl_weekly_perf = fetch_arrow(con.execute(SQL_WEEKLY_PERF))
+    fetch_arrow(con.execute(SQL_DISTRIBUTION))
+    stores = tbl_weekly_perf.column("Store_Number").unique()[:N_TREND_STORES].to_pylist()
+    tbl_selected = filter_isin(tbl_weekly_perf, "Store_Number", stores)
+    # Fonction non mémoïsée : sinon seul le premier run construit la figure
+    # (les suivants mesureraient un hit du cache de figures)
+    fig = create_arrow_line_chart.__wrapped__(tbl_selected, x="Date", y="sales", color="Store_Number")
+    return fig.to_json()
+
+
+VARIANTS = {"pandas": run_pandas, "arrow": run_arrow}
+
+
+def _measure(variant, db_path, runs, queue):
+    import duckdb
+    import pandas  # noqa: F401  (imports hors mesure)
+    import plotly.express  # noqa: F401
+    import arrow_utils  # noqa: F401
+
+    con = duckdb.connect(db_path, read_only=True)
+    baseline = _max_rss_mb()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        VARIANTS[variant](con)
+        timings.append(time.perf_counter() - start)
+    con.close()
+    queue.put({
+        "variant": variant,
+        "best_s": min(timings),
+        "mean_s": sum(timings) / len(timings),
+        "peak_mb": _max_rss_mb() - baseline,
+    })
+
+
+def benchmark(db_path, runs):
+    ctx = get_context("spawn")
+    results = []
+    for variant in VARIANTS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_measure, args=(variant, db_path, runs, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare les chemins pandas et Arrow")
+    parser.add_argument("--db", default="data/project.db", help="base DuckDB à interroger")
+    parser.add_argument("--runs", type=int, default=5, help="répétitions par variante")
+    args = parser.parse_args()
+
+    import duckdb
+    con = duckdb.connect(args.db, read_only=True)
+    nb_rows = con.execute("SELECT COUNT(*) FROM walmart").fetchone()[0]
+    con.close()
+
+    print(f"\n--- BENCHMARK pandas vs Arrow ({nb_rows:,} lignes, {args.runs} runs) ---")
+    for r in benchmark(args.db, args.runs):
+        print(f" {r['variant']:<7} meilleur {r['best_s'] * 1000:8.1f} ms · "
+              f"moyen {r['mean_s'] * 1000:8.1f} ms · pic mémoire +{r['peak_mb']:.1f} Mo")
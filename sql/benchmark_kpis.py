@@ -0,0 +1,541 @@
+"""
+Benchmark des requêtes KPI et du chargement CSV, avec baseline JSON
+
+Requêtes mesurées :
+- chaque KPI du registre (sql/kpis_*.sql, APP/kpi_registry.py), exécuté par son nom
+  avec le WHERE compilé de chaque scénario (l'app n'écrit plus de SQL elle-même)
+- les requêtes générées par la couche APP/ (requêtes fusionnées et métriques par
+  store sur les rollups, statistiques de distribution, lecture du catalogue des dimensions)
+- duckdb_loader.load_csv (chargement complet dans une base temporaire)
+- le démarrage à froid de l'app : imports de APP/app.py (python -X importtime),
+  avec un budget en ms et la liste des modules qui doivent rester différés
+
+Chaque requête paramétrée est rejouée pour plusieurs sélectivités de filtre
+(tous les stores, un seul store, un store sur deux, période courte / toutes les
+marques, une marque, un segment) sur une ou plusieurs bases (project.db et bases synthétiques de
+sql/generate_data.py). Chaque mesure tourne dans un processus séparé :
+p50 / p95 de latence, lignes lues (profiling DuckDB) et pic mémoire (ru_maxrss).
+
+Les résultats sont comparés à une baseline JSON : le script sort en erreur (code 1)
+si une mesure régresse au-delà du seuil. La baseline dépend de la machine et n'est
+pas versionnée : sans elle, la comparaison est ignorée avec un avertissement.
+
+    python sql/benchmark_kpis.py --save-baseline
+    python sql/benchmark_kpis.py --sizes 1000000,10000000 --threshold 0.25
+"""
+
+import argparse
+import ast
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from queue import Empty
+
+import duckdb
+import numpy as np
+
+SQL_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(SQL_DIR, "..", "APP")
+sys.path.insert(0, APP_DIR)
+
+from catalog import load_catalog  # noqa: E402
+from distribution import box_outliers, box_stats, histogram_bins  # noqa: E402
+from kpi_registry import kpi_query, load_registry, validate_registry  # noqa: E402
+from queries import (  # noqa: E402
+    ev_where, walmart_fused_queries, walmart_store_metrics_queries, walmart_where,
+)
+
+DEFAULT_DB = "data/project.db"
+DEFAULT_BASELINE = os.path.join(SQL_DIR, "benchmark_baseline.json")
+DEFAULT_BENCH_DIR = "data/synthetic/bench"
+
+# CSV d'origine (chargement de project.db)
+LOAD_SOURCES = {
+    "walmart": "data/Walmart_sales_analysis.csv",
+    "ev": "data/electric_vehicles_spec_2025.csv.csv",
+}
+
+# Seuils de régression : relatif (--threshold) ET absolu, pour ignorer le bruit des requêtes rapides
+MIN_REGRESSION_MS = 2.0
+MIN_REGRESSION_MB = 16.0
+
+# Démarrage à froid : budget des imports de APP/app.py et modules différés (lazy_imports)
+COLD_START_BUDGET_MS = 1500.0
+DEFERRED_MODULES = ["plotly.express"]
+COLD_START_TOP = 8
+
+# LIMIT ? de ev.top_range (onglet Top Autonomie)
+EV_TOP_N = 10
+# Valeurs des paramètres supplémentaires des KPI du registre (« -- params: »)
+KPI_PARAMS = {"n": EV_TOP_N}
+
+PROFILING_SETTINGS = json.dumps({
+    "CUMULATIVE_ROWS_SCANNED": "true",
+    "ROWS_RETURNED": "true",
+    "LATENCY": "true",
+    "OPERATOR_CARDINALITY": "true",
+})
+
+
+def _max_rss_mb():
+    # ru_maxrss : Ko sous Linux, octets sous macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def _percentiles(timings):
+    p50, p95 = np.percentile(np.array(timings) * 1000, [50, 95])
+    return float(p50), float(p95)
+
+
+# ---------------------------
+# Catalogue des requêtes
+# ---------------------------
+def registry_queries(dataset, where):
+    """
+    KPI du registre pour `dataset`, avec le WHERE compilé d'un scénario
+
+    Les KPI sans filtre déclaré ne sont mesurés qu'une fois (where None).
+    Returns:
+        Liste de (query, sql, params)
+    """
+    queries = []
+    for name, kpi in load_registry().items():
+        if kpi["dataset"] != dataset or (where is None) == bool(kpi["filters"]):
+            continue
+        args = [KPI_PARAMS[param] for param in kpi["params"]]
+        sql, params = kpi_query(name, where, args)
+        queries.append(({"name": f"kpi.{name}", "dataset": dataset}, sql, params))
+    return queries
+
+
+def _recording(con, recorded, prefix):
+    """run_query qui exécute la requête et garde (nom, sql, params)"""
+    def run_query(sql, params):
+        recorded.append({"name": f"{prefix}{len(recorded)}", "sql": sql, "params": params})
+        return con.execute(sql, params).fetchdf()
+    return run_query
+
+
+# ---------------------------
+# Sélectivités des filtres
+# ---------------------------
+def walmart_scenarios(con):
+    stores = [row[0] for row in con.execute(
+        "SELECT DISTINCT Store_Number FROM walmart ORDER BY Store_Number").fetchall()]
+    dmin, dmax = con.execute("SELECT MIN(Date), MAX(Date) FROM walmart").fetchone()
+    return {
+        "all": [stores, [0, 1], dmin, dmax],
+        "one_store": [stores[:1], [0, 1], dmin, dmax],
+        "alternate_stores": [stores[::2], [0, 1], dmin, dmax],
+        "narrow_dates": [stores, [0, 1], dmax - datetime.timedelta(days=27), dmax],
+    }, stores, (dmin, dmax)
+
+
+def ev_scenarios(con):
+    brands = [row[0] for row in con.execute(
+        "SELECT DISTINCT brand FROM ev WHERE brand IS NOT NULL ORDER BY brand").fetchall()]
+    segments = [row[0] for row in con.execute(
+        "SELECT DISTINCT segment FROM ev WHERE segment IS NOT NULL ORDER BY segment").fetchall()]
+    top_brand, top_segment = con.execute("""
+        SELECT mode(brand), mode(segment) FROM ev
+    """).fetchone()
+    return {
+        "all": [brands, segments],
+        "one_brand": [[top_brand], segments],
+        "one_segment": [brands, [top_segment]],
+    }, brands, segments
+
+
+def plan_queries(db_path, datasets):
+    """
+    Liste des mesures à faire sur une base
+
+    Returns:
+        Liste de dicts name, dataset, scenario, sql, params
+    """
+    con = duckdb.connect(db_path, read_only=True)
+    tables = {row[0] for row in con.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+    datasets = [d for d in datasets if d in tables]
+    # Registre validé contre le schéma avant toute mesure
+    errors = validate_registry(con)
+    if errors:
+        raise ValueError(f"KPI invalides dans {db_path} : " + "; ".join(errors))
+    plan = []
+
+    def add(query, scenario, sql, params):
+        plan.append({"name": query["name"], "dataset": query["dataset"], "scenario": scenario,
+                     "sql": sql, "params": params})
+
+    if "walmart" in datasets:
+        scenarios, stores, date_bounds = walmart_scenarios(con)
+        for scenario, where_params in scenarios.items():
+            # WHERE compilé comme dans l'app (filters.py)
+            raw_where, raw_params = walmart_where(where_params, stores=stores, date_bounds=date_bounds)
+            for query, sql, params in registry_queries("walmart", (raw_where, raw_params)):
+                add(query, scenario, sql, params)
+            if scenario == "all":
+                for query, sql, params in registry_queries("walmart", None):
+                    add(query, scenario, sql, params)
+
+            run_query = lambda sql, params: con.execute(sql, params).fetchdf()
+            for name, (sql, params) in walmart_fused_queries(run_query, where_params, stores, date_bounds).items():
+                add({"name": f"queries.walmart_{name}", "dataset": "walmart"}, scenario, sql, params)
+            store_metrics = walmart_store_metrics_queries(run_query, where_params, stores, date_bounds)
+            for name, (sql, params) in store_metrics.items():
+                add({"name": f"queries.walmart_{name}", "dataset": "walmart"}, scenario, sql, params)
+
+            recorded = []
+            box_stats(_recording(con, recorded, "box_stats"), "walmart", "Weekly_Sales",
+                      raw_where, raw_params, group="Holiday_Flag")
+            box_outliers(_recording(con, recorded, "box_outliers"), "walmart", "Weekly_Sales",
+                         raw_where, raw_params, group="Holiday_Flag")
+            for r in recorded:
+                add({"name": f"distribution.walmart_{r['name'].rstrip('0123456789')}", "dataset": "walmart"},
+                    scenario, r["sql"], r["params"])
+
+    if "ev" in datasets:
+        scenarios, brands, segments = ev_scenarios(con)
+        for scenario, (brand_sel, segment_sel) in scenarios.items():
+            speed_where, ev_params = ev_where(brand_sel, segment_sel, brands, segments)
+            for query, sql, params in registry_queries("ev", (speed_where, ev_params)):
+                add(query, scenario, sql, params)
+            if scenario == "all":
+                for query, sql, params in registry_queries("ev", None):
+                    add(query, scenario, sql, params)
+
+            recorded = []
+            box_stats(_recording(con, recorded, "box_stats_total"), "ev", "top_speed_kmh", speed_where, ev_params)
+            histogram_bins(_recording(con, recorded, "histogram_bins"), "ev", "top_speed_kmh", speed_where, ev_params)
+            box_stats(_recording(con, recorded, "box_stats_segment"), "ev", "top_speed_kmh", speed_where, ev_params,
+                      group="segment")
+            box_outliers(_recording(con, recorded, "box_outliers"), "ev", "top_speed_kmh", speed_where, ev_params,
+                         group="segment")
+            for r in recorded:
+                add({"name": f"distribution.ev_{r['name'].rstrip('0123456789')}", "dataset": "ev"},
+                    scenario, r["sql"], r["params"])
+
+    # Options de la barre latérale (catalogue du loader, ou parcours des tables sans catalogue)
+    for dataset in datasets:
+        recorded = []
+        load_catalog(_recording(con, recorded, "read"), dataset)
+        for r in recorded:
+            add({"name": f"catalog.{dataset}_{r['name']}", "dataset": dataset}, "all", r["sql"], r["params"])
+
+    con.close()
+    return plan
+
+
+# ---------------------------
+# Mesures (un processus par mesure)
+# ---------------------------
+def _measure_query(db_path, sql, params, runs, queue):
+    con = duckdb.connect(db_path, read_only=True)
+    baseline = _max_rss_mb()
+
+    # 1er passage (hors chronométrage) : profil des lignes lues, cache chaud
+    con.execute("PRAGMA enable_profiling = 'no_output'")
+    con.execute(f"PRAGMA custom_profiling_settings = '{PROFILING_SETTINGS}'")
+    result = con.execute(sql, params).fetchdf()
+    profile = json.loads(con.get_profiling_information())
+    con.execute("PRAGMA disable_profiling")
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        con.execute(sql, params).fetchdf()
+        timings.append(time.perf_counter() - start)
+    con.close()
+
+    p50, p95 = _percentiles(timings)
+    queue.put({
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "rows_scanned": int(profile.get("cumulative_rows_scanned", 0)),
+        "rows_returned": len(result),
+        "peak_rss_mb": _max_rss_mb(),
+        "rss_delta_mb": _max_rss_mb() - baseline,
+    })
+
+
+def _measure_load(sources, table_name, queue):
+    import duckdb_loader
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        baseline = _max_rss_mb()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            duckdb_loader.load_csv(sources, table_name, db_path=db_path)
+        elapsed = time.perf_counter() - start
+        con = duckdb.connect(db_path, read_only=True)
+        rows = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        con.close()
+    queue.put({"seconds": elapsed, "rows": rows,
+               "peak_rss_mb": _max_rss_mb(), "rss_delta_mb": _max_rss_mb() - baseline})
+
+
+def _in_process(target, *args):
+    ctx = get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=target, args=(*args, queue))
+    proc.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if not proc.is_alive():
+                raise RuntimeError(f"{target.__name__} : processus terminé sans résultat "
+                                   f"(code {proc.exitcode})")
+    proc.join()
+    return result
+
+
+def benchmark_queries(db_path, dataset_label, datasets, runs):
+    results = {}
+    plan = plan_queries(db_path, datasets)
+    print(f"\n--- {dataset_label} : {len(plan)} mesures ({runs} runs chacune) ---")
+    print(f" {'requête':<44} {'filtre':<13} {'p50 ms':>9} {'p95 ms':>9} {'lignes lues':>12} {'pic Mo':>8}")
+    for item in plan:
+        r = _in_process(_measure_query, db_path, item["sql"], item["params"], runs)
+        results[f"{dataset_label}/{item['scenario']}/{item['name']}"] = r
+        print(f" {item['name']:<44} {item['scenario']:<13} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} "
+              f"{r['rows_scanned']:>12,} {r['peak_rss_mb']:8.1f}")
+    return results
+
+
+def benchmark_load(sources, dataset_label, runs):
+    results = {}
+    for table_name, source in sources.items():
+        if not os.path.exists(source):
+            continue
+        reports = [_in_process(_measure_load, source, table_name) for _ in range(runs)]
+        p50, p95 = _percentiles([r["seconds"] for r in reports])
+        rows = reports[0]["rows"]
+        results[f"{dataset_label}/load/load_csv.{table_name}"] = {
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "rows_loaded": rows,
+            "rows_per_s": rows / (p50 / 1000) if p50 else 0.0,
+            "peak_rss_mb": max(r["peak_rss_mb"] for r in reports),
+            "rss_delta_mb": max(r["rss_delta_mb"] for r in reports),
+        }
+        print(f" load_csv {table_name:<35} {'-':<13} {p50:9.1f} {p95:9.1f} {rows:>12,} "
+              f"{results[f'{dataset_label}/load/load_csv.{table_name}']['peak_rss_mb']:8.1f}")
+    return results
+
+
+# ---------------------------
+# Démarrage à froid (imports)
+# ---------------------------
+def app_imports(app_path=os.path.join(APP_DIR, "app.py")):
+    """Instructions import de premier niveau de APP/app.py (dans l'ordre du source)"""
+    with open(app_path, encoding="utf-8") as f:
+        source = f.read()
+    return [ast.get_source_segment(source, node) for node in ast.parse(source).body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def parse_importtime(report):
+    """
+    Sortie de `python -X importtime`
+
+    Returns:
+        Liste de (module, self_us, cumulative_us, profondeur) ; profondeur 0 = import direct
+    """
+    entries = []
+    for line in report.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if match:
+            entries.append((match.group(4), int(match.group(1)), int(match.group(2)),
+                            (len(match.group(3)) - 1) // 2))
+    return entries
+
+
+def _measure_imports():
+    """Un interpréteur neuf qui exécute les imports de app.py"""
+    code = "\n".join(app_imports() + [
+        "import json, sys",
+        f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))",
+    ])
+    # Modules chargés par l'interpréteur lui-même (site, encodings...) : hors budget de l'app
+    startup = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], cwd=APP_DIR,
+                             capture_output=True, text=True, check=True)
+    interpreter = {name for name, _, _, _ in parse_importtime(startup.stderr)}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=APP_DIR,
+                          capture_output=True, text=True, check=True)
+    entries = [e for e in parse_importtime(proc.stderr) if e[0] not in interpreter]
+    direct = [(name, cumulative) for name, _, cumulative, depth in entries if depth == 0]
+    return {
+        "import_ms": sum(cumulative for _, cumulative in direct) / 1000,
+        "modules": len(entries),
+        "top": sorted(direct, key=lambda e: -e[1])[:COLD_START_TOP],
+        "deferred_loaded": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def benchmark_cold_start(runs, budget_ms):
+    """
+    Temps d'import de APP/app.py (p50 / p95 sur `runs` interpréteurs neufs)
+
+    Returns:
+        (résultats, liste des dépassements de budget)
+    """
+    reports = [_measure_imports() for _ in range(runs)]
+    p50, p95 = _percentiles([r["import_ms"] / 1000 for r in reports])
+    last = reports[-1]
+    print(f"\n--- Démarrage à froid : imports de APP/app.py ({runs} runs) ---")
+    print(f" p50 {p50:.1f} ms, p95 {p95:.1f} ms, {last['modules']} modules (budget {budget_ms:.0f} ms)")
+    for name, cumulative in last["top"]:
+        print(f"   {name:<40} {cumulative / 1000:8.1f} ms")
+
+    violations = []
+    if p50 > budget_ms:
+        violations.append(f"imports {p50:.1f} ms > budget {budget_ms:.0f} ms")
+    for module in last["deferred_loaded"]:
+        violations.append(f"{module} importé au démarrage (doit rester différé)")
+    result = {"p50_ms": p50, "p95_ms": p95, "modules": last["modules"],
+              "deferred_loaded": last["deferred_loaded"]}
+    return {"app/cold_start/imports": result}, violations
+
+
+# ---------------------------
+# Bases de test
+# ---------------------------
+def synthetic_dataset(rows, bench_dir, with_load):
+    """Base synthétique de `rows` lignes (générée une fois, réutilisée ensuite)"""
+    from generate_data import generate
+
+    target = os.path.join(bench_dir, f"rows_{rows}")
+    db_path = os.path.join(target, "bench.db")
+    csv_dir = os.path.join(target, "csv")
+    os.makedirs(target, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not os.path.exists(db_path):
+            generate("walmart", rows=rows, stores=max(45, rows // 520), fmt="duckdb", db_path=db_path)
+            generate("ev", rows=rows, fmt="duckdb", db_path=db_path)
+        if with_load and not os.path.isdir(csv_dir):
+            for table_name in ("walmart", "ev"):
+                generate(table_name, rows=rows, stores=max(45, rows // 520), fmt="csv", out_dir=csv_dir)
+    return db_path, {name: os.path.join(csv_dir, name) for name in ("walmart", "ev")}
+
+
+# ---------------------------
+# Baseline
+# ---------------------------
+def environment():
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Mesures plus lentes / plus gourmandes que la baseline au-delà du seuil
+
+    Returns:
+        Liste de (clé, métrique, baseline, actuel)
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        # p95 reste indicatif : sur quelques runs il vaut à peu près le max, trop bruité
+        for metric, floor in [("p50_ms", MIN_REGRESSION_MS), ("rss_delta_mb", MIN_REGRESSION_MB)]:
+            before, after = previous.get(metric), current.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + threshold) and after - before > floor:
+                regressions.append((key, metric, before, after))
+        # Lignes lues : déterministe, toute hausse au-delà du seuil compte
+        before, after = previous.get("rows_scanned"), current.get("rows_scanned")
+        if before is not None and after is not None and after > before * (1 + threshold):
+            regressions.append((key, "rows_scanned", before, after))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des requêtes KPI et du chargement")
+    parser.add_argument("--db", action="append", help=f"base(s) DuckDB à mesurer (défaut : {DEFAULT_DB})")
+    parser.add_argument("--sizes", default="", help="tailles de bases synthétiques, ex. 1000000,10000000")
+    parser.add_argument("--bench-dir", default=DEFAULT_BENCH_DIR, help="dossier des bases synthétiques")
+    parser.add_argument("--only", choices=["walmart", "ev"], help="une seule table")
+    parser.add_argument("--runs", type=int, default=10, help="répétitions par requête")
+    parser.add_argument("--load-runs", type=int, default=3, help="répétitions de load_csv (0 = ignoré)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="fichier baseline JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="écrit les résultats comme nouvelle baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="régression tolérée (0.25 = +25 %%)")
+    parser.add_argument("--output", help="écrit aussi les résultats dans ce fichier JSON")
+    parser.add_argument("--import-runs", type=int, default=5,
+                        help="démarrages à froid mesurés (imports de app.py, 0 = ignoré)")
+    parser.add_argument("--import-budget-ms", type=float, default=COLD_START_BUDGET_MS,
+                        help="budget du temps d'import de app.py (ms)")
+    args = parser.parse_args()
+
+    datasets = [args.only] if args.only else ["walmart", "ev"]
+    targets = []
+    for db_path in args.db or [DEFAULT_DB]:
+        label = os.path.splitext(os.path.basename(db_path))[0]
+        sources = LOAD_SOURCES if os.path.abspath(db_path) == os.path.abspath(DEFAULT_DB) else {}
+        targets.append((label, db_path, sources))
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        print(f"\n Base synthétique {size:,} lignes ({args.bench_dir}) ...")
+        db_path, sources = synthetic_dataset(size, args.bench_dir, args.load_runs > 0)
+        targets.append((f"synthetic_{size}", db_path, sources))
+
+    results, violations = {}, []
+    if args.import_runs > 0:
+        cold_start, violations = benchmark_cold_start(args.import_runs, args.import_budget_ms)
+        results.update(cold_start)
+    for label, db_path, sources in targets:
+        results.update(benchmark_queries(db_path, label, datasets, args.runs))
+        if args.load_runs > 0:
+            results.update(benchmark_load({t: s for t, s in sources.items() if t in datasets},
+                                          label, args.load_runs))
+
+    report = {"environment": environment(), "threshold": args.threshold, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    for violation in violations:
+        print(f"\n BUDGET DÉMARRAGE : {violation}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n Baseline écrite : {args.baseline} ({len(results)} mesures)")
+        sys.exit(1 if violations else 0)
+
+    if not os.path.exists(args.baseline):
+        # Baseline propre à la machine, non versionnée : sans elle, pas de comparaison (pas une erreur)
+        print(f"\n ATTENTION : pas de baseline ({args.baseline}), comparaison ignorée ; "
+              f"l'enregistrer avec --save-baseline")
+        sys.exit(1 if violations else 0)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline["results"], args.threshold)
+    compared = len(set(results) & set(baseline["results"]))
+    print(f"\n--- Comparaison avec {args.baseline} ({compared} mesures, seuil +{args.threshold:.0%}) ---")
+    for key, metric, before, after in regressions:
+        print(f" RÉGRESSION {key} {metric} : {before:,.2f} -> {after:,.2f}")
+    if regressions or violations:
+        sys.exit(1)
+    print(" Aucune régression")
@@ -1,36 +1,838 @@
 import duckdb
-import sys
+import argparse
+import glob
+import hashlib
+import json
 import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 DB_PATH = "data/project.db"
 
-def load_csv(csv_path, table_name):
-    if not os.path.exists(csv_path):
-        print(f" Fichier introuvable : {csv_path}")
+# Colonnes numériques exportées en texte avec séparateurs de milliers ("1,643,691")
+# => converties une seule fois au chargement au lieu de CAST(REPLACE(...)) dans chaque requête
+NUMERIC_TEXT_COLUMNS = {
+    "walmart": ["Weekly_Sales"],
+}
+
+# Colonnes date et leur format source (on ne laisse pas le sniffer deviner jour/mois)
+DATE_COLUMNS = {
+    "walmart": {"Date": "%m/%d/%Y"},
+}
+
+# Clé métier de chaque table (modes --append / --upsert)
+KEY_COLUMNS = {
+    "walmart": ["Store_Number", "Date"],
+    "ev": ["brand", "model"],
+}
+
+# Ordre physique des lignes : les zone maps (min/max par row group) de ces colonnes
+# permettent alors d'ignorer les row groups hors du filtre (période, segment)
+SORT_COLUMNS = {
+    "walmart": ["Date", "Store_Number"],
+    "ev": ["segment", "brand"],
+}
+# Taille d'un row group DuckDB (unité des zone maps)
+ROW_GROUP_SIZE = 122880
+
+# Fichiers déjà ingérés (hash + nombre de lignes)
+MANIFEST_TABLE = "_ingest_manifest"
+# Colonne temporaire de _new : fichier d'origine de chaque ligne (lignes par fichier du manifest)
+SOURCE_FILE_COLUMN = "source_file"
+
+# Catalogue des dimensions (lu par la barre latérale de l'app au lieu des DISTINCT / MIN / MAX)
+# - _catalog_values : valeurs distinctes de chaque dimension et leur nombre de lignes
+# - _catalog_columns : statistiques de chaque colonne (type, nulls, distincts approx., min, max)
+CATALOG_VALUES_TABLE = "_catalog_values"
+CATALOG_COLUMNS_TABLE = "_catalog_columns"
+DIMENSION_COLUMNS = {
+    "walmart": ["Store_Number", "Holiday_Flag"],
+    "ev": ["brand", "segment"],
+}
+
+# Export Parquet : dossier, partitionnement hive et colonnes dérivées des partitions
+PARQUET_DIR = "data/parquet"
+PARQUET_PARTITIONS = {
+    "walmart": ["year", "Store_Number"],
+    "ev": ["segment"],
+}
+PARQUET_DERIVED_COLUMNS = {
+    "walmart": {"year": "year(Date)"},
+}
+PARQUET_ROW_GROUP_SIZE = ROW_GROUP_SIZE
+
+# Taille du pool de validation des fichiers (chargement multi-fichiers)
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+# Tables d'agrégats (rollups) construites après chaque chargement
+# nom -> dimensions de regroupement (les mesures sont additives : sum, count, min, max, sum of squares)
+# NB: les données Walmart sont déjà hebdomadaires, la semaine = la colonne Date
+ROLLUPS = {
+    "walmart": {
+        "walmart_store_week": ["Store_Number", "Date", "Holiday_Flag"],
+        "walmart_store_month": ["Store_Number", "Month", "Holiday_Flag"],
+        "walmart_week": ["Date", "Holiday_Flag"],
+        "walmart_store_holiday": ["Store_Number", "Holiday_Flag"],
+    },
+}
+
+# Dimensions dérivées (absentes de la table de base)
+ROLLUP_DIMENSIONS = {
+    "Month": "CAST(date_trunc('month', Date) AS DATE)",
+}
+
+# (expression, nom) ; le suffixe du nom indique comment fusionner deux agrégats :
+# *_min -> MIN, *_max -> MAX, le reste (sum / count) -> SUM
+ROLLUP_MEASURES = {
+    "walmart": [
+        ("COUNT(*)", "row_count"),
+        ("SUM(Weekly_Sales)", "sales_sum"),
+        ("COUNT(Weekly_Sales)", "sales_count"),
+        ("MIN(Weekly_Sales)", "sales_min"),
+        ("MAX(Weekly_Sales)", "sales_max"),
+        ("SUM(Weekly_Sales * Weekly_Sales)", "sales_sumsq"),
+        ("SUM(Temperature)", "temperature_sum"),
+        ("COUNT(Temperature)", "temperature_count"),
+        ("SUM(Fuel_Price)", "fuel_price_sum"),
+        ("COUNT(Fuel_Price)", "fuel_price_count"),
+        ("SUM(CPI)", "cpi_sum"),
+        ("COUNT(CPI)", "cpi_count"),
+        ("SUM(Unemployment)", "unemployment_sum"),
+        ("COUNT(Unemployment)", "unemployment_count"),
+    ],
+}
+
+
+def normalize_schema(con, table_name):
+    """
+    Étape de normalisation : construit le SELECT typé à partir de la vue brute `_raw`.
+    - noms de colonnes nettoyés (ex: " CPI " -> CPI)
+    - colonnes numériques texte -> DOUBLE
+    - colonnes date -> DATE avec un format explicite
+    """
+    numeric_cols = NUMERIC_TEXT_COLUMNS.get(table_name, [])
+    date_cols = DATE_COLUMNS.get(table_name, {})
+
+    select_list = []
+    for col, col_type, *_ in con.execute("DESCRIBE _raw").fetchall():
+        name = col.strip()
+        src = f'"{col}"'
+        if name in numeric_cols and col_type == "VARCHAR":
+            expr = f"CAST(REPLACE({src}, ',', '') AS DOUBLE)"
+        elif name in date_cols and col_type == "VARCHAR":
+            expr = f"CAST(strptime({src}, '{date_cols[name]}') AS DATE)"
+        else:
+            expr = src
+        select_list.append(f'{expr} AS "{name}"')
+
+    return "SELECT\n  " + ",\n  ".join(select_list) + "\nFROM _raw"
+
+
+# ---------------------------
+# Rollups
+# ---------------------------
+def _with_dimensions(source, dims):
+    """Ajoute les dimensions dérivées (ex: Month) aux lignes de `source`"""
+    derived = [f"{ROLLUP_DIMENSIONS[d]} AS {d}" for d in dims if d in ROLLUP_DIMENSIONS]
+    if not derived:
+        return source
+    return f"(SELECT *, {', '.join(derived)} FROM {source})"
+
+
+def _join_on(left, right, columns):
+    # IS NOT DISTINCT FROM : une clé NULL correspond à une clé NULL
+    return " AND ".join(f"{left}.{c} IS NOT DISTINCT FROM {right}.{c}" for c in columns)
+
+
+def rollup_select(table_name, dims, source=None, groups=None):
+    """
+    SELECT d'agrégation d'un rollup
+    - source : lignes à agréger (par défaut la table de base)
+    - groups : table temporaire limitant le calcul à certains groupes
+    """
+    measures = ",\n          ".join(f"{expr} AS {name}" for expr, name in ROLLUP_MEASURES[table_name])
+    semi_join = f"SEMI JOIN {groups} ON {_join_on('src', groups, dims)}" if groups else ""
+    return f"""
+        SELECT {', '.join(dims)},
+          {measures}
+        FROM {_with_dimensions(source or table_name, dims)} AS src
+        {semi_join}
+        GROUP BY {', '.join(dims)}
+    """
+
+
+def _cluster_order(dims):
+    # Période d'abord : c'est le filtre de plage de la barre latérale
+    return [d for d in ("Date", "Month") if d in dims] + [d for d in dims if d not in ("Date", "Month")]
+
+
+def order_by(table_name):
+    """Clause ORDER BY de l'ordre physique de `table_name` ("" si non trié)"""
+    columns = SORT_COLUMNS.get(table_name)
+    return f" ORDER BY {', '.join(columns)}" if columns else ""
+
+
+def create_key_index(con, table_name):
+    """Index ART sur la clé (KEY_COLUMNS) : recherches ponctuelles store/date, brand/model"""
+    keys = KEY_COLUMNS.get(table_name)
+    if keys:
+        con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_key ON {table_name} ({', '.join(keys)})")
+
+
+def build_rollups(con, table_name):
+    """(Re)construit les tables d'agrégats de `table_name` (triées par période)"""
+    for rollup_name, dims in ROLLUPS.get(table_name, {}).items():
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {rollup_name} AS
+            {rollup_select(table_name, dims)}
+            ORDER BY {', '.join(_cluster_order(dims))}
+        """)
+        rows = con.execute(f"SELECT COUNT(*) FROM {rollup_name}").fetchone()[0]
+        print(f" Rollup '{rollup_name}' ({', '.join(dims)}) : {rows} lignes")
+
+
+def _merge_aggregate(name):
+    if name.endswith("_min"):
+        return f"MIN({name})"
+    if name.endswith("_max"):
+        return f"MAX({name})"
+    return f"SUM({name})"
+
+
+def update_rollups(con, table_name):
+    """
+    Mise à jour incrémentale des rollups après un --append / --upsert.
+    Lit les tables temporaires `_inserted` (nouvelles lignes) et `_replaced`
+    (anciennes versions des lignes remplacées).
+    - insertions seules : les agrégats du delta sont fusionnés avec l'existant
+    - lignes remplacées : MIN/MAX ne se soustraient pas => seuls les groupes
+      touchés sont recalculés depuis la table de base
+    """
+    nb_replaced = con.execute("SELECT COUNT(*) FROM _replaced").fetchone()[0]
+
+    for rollup_name, dims in ROLLUPS.get(table_name, {}).items():
+        dim_list = ", ".join(dims)
+        if nb_replaced == 0:
+            merged = ",\n              ".join(
+                f"{_merge_aggregate(name)} AS {name}" for _, name in ROLLUP_MEASURES[table_name]
+            )
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE _delta AS
+                {rollup_select(table_name, dims, source="_inserted")}
+            """)
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE _merged AS
+                SELECT {dim_list},
+                  {merged}
+                FROM (
+                    SELECT * FROM {rollup_name} SEMI JOIN _delta ON {_join_on(rollup_name, '_delta', dims)}
+                    UNION ALL BY NAME
+                    SELECT * FROM _delta
+                )
+                GROUP BY {dim_list}
+            """)
+            con.execute(f"DELETE FROM {rollup_name} USING _delta WHERE {_join_on(rollup_name, '_delta', dims)}")
+            con.execute(f"INSERT INTO {rollup_name} BY NAME SELECT * FROM _merged")
+        else:
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE _affected AS
+                SELECT DISTINCT {dim_list} FROM {_with_dimensions('_replaced', dims)}
+                UNION
+                SELECT DISTINCT {dim_list} FROM {_with_dimensions('_inserted', dims)}
+            """)
+            con.execute(f"DELETE FROM {rollup_name} USING _affected WHERE {_join_on(rollup_name, '_affected', dims)}")
+            con.execute(f"""
+                INSERT INTO {rollup_name} BY NAME
+                {rollup_select(table_name, dims, groups="_affected")}
+            """)
+        print(f" Rollup '{rollup_name}' mis à jour")
+
+
+# ---------------------------
+# Manifest des fichiers ingérés
+# ---------------------------
+def file_hash(path):
+    """SHA-256 du fichier (lu par blocs)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def ensure_manifest(con):
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            table_name VARCHAR,
+            file_path VARCHAR,
+            file_hash VARCHAR,
+            row_count BIGINT,
+            mode VARCHAR,
+            loaded_at TIMESTAMP
+        )
+    """)
+
+
+def already_ingested(con, table_name, digest):
+    return con.execute(
+        f"SELECT COUNT(*) FROM {MANIFEST_TABLE} WHERE table_name = ? AND file_hash = ?",
+        [table_name, digest]
+    ).fetchone()[0] > 0
+
+
+def record_ingest(con, table_name, csv_path, digest, row_count, mode):
+    con.execute(
+        f"INSERT INTO {MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?, current_timestamp)",
+        [table_name, csv_path, digest, row_count, mode]
+    )
+
+
+# ---------------------------
+# Catalogue des dimensions
+# ---------------------------
+def ensure_catalog(con):
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CATALOG_VALUES_TABLE} (
+            table_name VARCHAR,
+            column_name VARCHAR,
+            value VARCHAR,
+            row_count BIGINT
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CATALOG_COLUMNS_TABLE} (
+            table_name VARCHAR,
+            column_name VARCHAR,
+            column_type VARCHAR,
+            row_count BIGINT,
+            null_count BIGINT,
+            approx_distinct BIGINT,
+            min_value VARCHAR,
+            max_value VARCHAR,
+            refreshed_at TIMESTAMP
+        )
+    """)
+
+
+def refresh_catalog(con, table_name):
+    """
+    Recalcule le catalogue de `table_name` (deux parcours de la table) :
+    valeurs des dimensions (GROUPING SETS) et statistiques de toutes les colonnes
+    """
+    ensure_catalog(con)
+    start = time.perf_counter()
+    con.execute(f"DELETE FROM {CATALOG_VALUES_TABLE} WHERE table_name = ?", [table_name])
+    con.execute(f"DELETE FROM {CATALOG_COLUMNS_TABLE} WHERE table_name = ?", [table_name])
+
+    dims = DIMENSION_COLUMNS.get(table_name, [])
+    if dims:
+        column_case = " ".join(f"WHEN GROUPING({d}) = 0 THEN '{d}'" for d in dims)
+        value_case = " ".join(f"WHEN GROUPING({d}) = 0 THEN CAST({d} AS VARCHAR)" for d in dims)
+        con.execute(f"""
+            INSERT INTO {CATALOG_VALUES_TABLE}
+            SELECT ?, CASE {column_case} END, CASE {value_case} END, COUNT(*)
+            FROM {table_name}
+            GROUP BY GROUPING SETS ({", ".join(f"({d})" for d in dims)})
+        """, [table_name])
+
+    columns = con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? ORDER BY column_index",
+        [table_name]
+    ).fetchall()
+    aggregates = ", ".join(
+        f'COUNT("{c}"), approx_count_distinct("{c}"), CAST(MIN("{c}") AS VARCHAR), CAST(MAX("{c}") AS VARCHAR)'
+        for c, _ in columns
+    )
+    stats = con.execute(f"SELECT COUNT(*), {aggregates} FROM {table_name}").fetchone()
+    row_count = stats[0]
+    con.executemany(
+        f"INSERT INTO {CATALOG_COLUMNS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, current_timestamp)",
+        [
+            [table_name, c, data_type, row_count, row_count - stats[1 + 4 * i],
+             stats[2 + 4 * i], stats[3 + 4 * i], stats[4 + 4 * i]]
+            for i, (c, data_type) in enumerate(columns)
+        ]
+    )
+    print(f" Catalogue '{table_name}' : {len(columns)} colonnes, dimensions {dims} "
+          f"({time.perf_counter() - start:.2f}s)")
+
+
+def _table_columns(con, table_name):
+    return con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? ORDER BY column_index",
+        [table_name]
+    ).fetchall()
+
+
+def update_catalog(con, table_name):
+    """
+    Mise à jour incrémentale du catalogue après un --append / --upsert, sans relire
+    la table : seuls `_inserted` et `_replaced` (voir merge_rows) sont parcourus
+    - valeurs des dimensions : nombre de lignes + insérées - remplacées
+    - colonnes : lignes et nulls ajustés, min / max élargis par les lignes insérées ;
+      une borne portée par une ligne remplacée est recalculée (cette colonne seulement)
+    - distincts : exacts pour les dimensions, majorant pour les autres colonnes
+      (approx_count_distinct n'est pas additif, recalculé au prochain replace)
+    Catalogue absent ou schéma changé : refresh_catalog
+    """
+    ensure_catalog(con)
+    columns = _table_columns(con, table_name)
+    known = {row[0]: row[1:] for row in con.execute(f"""
+        SELECT column_name, column_type, row_count, null_count, approx_distinct, min_value, max_value
+        FROM {CATALOG_COLUMNS_TABLE} WHERE table_name = ?
+    """, [table_name]).fetchall()}
+    if set(known) != {c for c, _ in columns} or any(known[c][0] != t for c, t in columns):
+        refresh_catalog(con, table_name)
         return
 
-    con = duckdb.connect(DB_PATH)
+    start = time.perf_counter()
+    dims = DIMENSION_COLUMNS.get(table_name, [])
+    if dims:
+        column_case = " ".join(f"WHEN GROUPING({d}) = 0 THEN '{d}'" for d in dims)
+        value_case = " ".join(f"WHEN GROUPING({d}) = 0 THEN CAST({d} AS VARCHAR)" for d in dims)
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _catalog_delta AS
+            SELECT CASE {column_case} END AS column_name, CASE {value_case} END AS value,
+              SUM(sign) AS row_count
+            FROM (
+                SELECT {', '.join(dims)}, 1 AS sign FROM _inserted
+                UNION ALL
+                SELECT {', '.join(dims)}, -1 AS sign FROM _replaced
+            )
+            GROUP BY GROUPING SETS ({", ".join(f"({d})" for d in dims)})
+        """)
+        on = _join_on(CATALOG_VALUES_TABLE, "_catalog_delta", ["column_name", "value"])
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _catalog_merged AS
+            SELECT ? AS table_name, column_name, value, SUM(row_count) AS row_count
+            FROM (
+                SELECT column_name, value, row_count FROM {CATALOG_VALUES_TABLE}
+                SEMI JOIN _catalog_delta ON {on}
+                WHERE table_name = ?
+                UNION ALL
+                SELECT column_name, value, row_count FROM _catalog_delta
+            )
+            GROUP BY column_name, value
+            HAVING SUM(row_count) > 0
+        """, [table_name, table_name])
+        con.execute(f"DELETE FROM {CATALOG_VALUES_TABLE} USING _catalog_delta "
+                    f"WHERE {CATALOG_VALUES_TABLE}.table_name = ? AND {on}", [table_name])
+        con.execute(f"INSERT INTO {CATALOG_VALUES_TABLE} BY NAME SELECT * FROM _catalog_merged")
+
+    # Statistiques des lignes insérées / remplacées : un parcours de chaque petite table
+    inserted_columns = {c for c, _ in _table_columns(con, "_inserted")}
+    stats = {}
+    for source in ("_inserted", "_replaced"):
+        # Colonnes absentes des CSV du lot : NULL dans la table (INSERT BY NAME)
+        source_columns = {c for c, _ in _table_columns(con, source)}
+        present = [c for c, _ in columns if c in source_columns]
+        aggregates = "".join(
+            f', COUNT("{c}"), approx_count_distinct("{c}"), CAST(MIN("{c}") AS VARCHAR), '
+            f'CAST(MAX("{c}") AS VARCHAR)'
+            for c in present
+        )
+        row = con.execute(f"SELECT COUNT(*){aggregates} FROM {source}").fetchone()
+        stats[source] = (row[0], {c: row[1 + 4 * i:5 + 4 * i] for i, c in enumerate(present)})
+    nb_inserted, inserted = stats["_inserted"]
+    nb_replaced, replaced = stats["_replaced"]
+
+    # Bornes : élargies par les lignes insérées (comparaison typée dans DuckDB), recalculées sur
+    # la table quand la ligne remplacée portait le min / max
+    bound_exprs, bound_params, stale = [], [], []
+    for c, data_type in columns:
+        _, _, _, _, min_value, max_value = known[c]
+        _, _, replaced_min, replaced_max = replaced.get(c, (0, 0, None, None))
+        if nb_replaced and (replaced_min == min_value or replaced_max == max_value):
+            stale.append(c)
+            continue
+        inserted_min, inserted_max = (f'MIN("{c}")', f'MAX("{c}")') if c in inserted_columns else ("NULL", "NULL")
+        bound_exprs.append(f"CAST(LEAST(TRY_CAST(? AS {data_type}), {inserted_min}) AS VARCHAR), "
+                           f"CAST(GREATEST(TRY_CAST(? AS {data_type}), {inserted_max}) AS VARCHAR)")
+        bound_params += [min_value, max_value]
+    bounds = {}
+    if bound_exprs:
+        row = con.execute(f"SELECT {', '.join(bound_exprs)} FROM _inserted", bound_params).fetchone()
+        bounds.update({c: row[2 * i:2 * i + 2]
+                       for i, c in enumerate(c for c, _ in columns if c not in stale)})
+    if stale:
+        row = con.execute("SELECT " + ", ".join(
+            f'CAST(MIN("{c}") AS VARCHAR), CAST(MAX("{c}") AS VARCHAR)' for c in stale
+        ) + f" FROM {table_name}").fetchone()
+        bounds.update({c: row[2 * i:2 * i + 2] for i, c in enumerate(stale)})
 
-    print(f"\n Chargement de {csv_path} dans la table '{table_name}' ...")
+    distinct_dims = dict(con.execute(f"""
+        SELECT column_name, COUNT(value) FROM {CATALOG_VALUES_TABLE}
+        WHERE table_name = ? GROUP BY column_name
+    """, [table_name]).fetchall()) if dims else {}
+
+    rows = []
+    for c, data_type in columns:
+        _, row_count, null_count, approx_distinct, _, _ = known[c]
+        inserted_non_null, inserted_distinct, _, _ = inserted.get(c, (0, 0, None, None))
+        replaced_non_null = replaced.get(c, (0,))[0]
+        new_rows = row_count + nb_inserted - nb_replaced
+        new_nulls = null_count + (nb_inserted - inserted_non_null) - (nb_replaced - replaced_non_null)
+        distinct = distinct_dims.get(c, min(approx_distinct + inserted_distinct, new_rows - new_nulls))
+        rows.append([table_name, c, data_type, new_rows, new_nulls, distinct, *bounds[c]])
+
+    con.execute(f"DELETE FROM {CATALOG_COLUMNS_TABLE} WHERE table_name = ?", [table_name])
+    con.executemany(
+        f"INSERT INTO {CATALOG_COLUMNS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, current_timestamp)", rows
+    )
+    print(f" Catalogue '{table_name}' mis à jour : +{nb_inserted} / -{nb_replaced} lignes, "
+          f"{len(stale)} borne(s) recalculée(s) ({time.perf_counter() - start:.2f}s)")
+
+
+# ---------------------------
+# Sources : fichiers, globs, dossiers
+# ---------------------------
+def resolve_sources(sources):
+    """
+    Liste des CSV à charger à partir de chemins, globs ("data/ventes_*.csv")
+    ou dossiers (tous les *.csv du dossier) ; l'ordre est conservé, sans doublon
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            matches = sorted(glob.glob(os.path.join(source, "*.csv")))
+        elif glob.has_magic(source):
+            matches = sorted(glob.glob(source, recursive=True))
+        else:
+            matches = [source]
+        for path in matches:
+            if path not in files:
+                files.append(path)
+    return files
+
+
+def validate_file(csv_path, table_name):
+    """
+    Validation d'un fichier (exécutée dans le pool de workers) :
+    hash et schéma détecté par DuckDB sur un échantillon (DESCRIBE, sans lire
+    tout le fichier) ; les lignes sont comptées une seule fois, par stage_csv
+    """
+    size = os.path.getsize(csv_path)
+    digest = file_hash(csv_path)
+
+    con = duckdb.connect()  # connexion en mémoire propre au worker
+    try:
+        # Noms seulement (sans types=, qui échoue si une colonne typée manque),
+        # nettoyés comme dans normalize_schema (" CPI " -> CPI)
+        columns = [row[0].strip() for row in con.execute(
+            f"DESCRIBE SELECT * FROM read_csv_auto('{csv_path}')"
+        ).fetchall()]
+    finally:
+        con.close()
+
+    return {
+        "path": csv_path,
+        "hash": digest,
+        "size": size,
+        "columns": columns,
+        "rows": None,
+    }
+
+
+def validate_files(files, table_name, workers):
+    """Valide les fichiers en parallèle (pool borné à `workers`)"""
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files)))) as pool:
+        return list(pool.map(lambda path: validate_file(path, table_name), files))
+
+
+def check_columns(reports, table_name):
+    """
+    Rejette avant la lecture les fichiers sans la clé (KEY_COLUMNS) ou dont
+    les colonnes diffèrent de celles du premier fichier valide : la lecture
+    multi-fichiers (union_by_name) les remplirait sinon de NULL sans erreur
+
+    Returns:
+        Rapports des fichiers acceptés
+    """
+    keys = KEY_COLUMNS.get(table_name, [])
+    accepted, reference = [], None
+    for r in reports:
+        missing = [col for col in keys if col not in r["columns"]]
+        if missing:
+            print(f" Fichier rejeté : {r['path']} (clé absente : {', '.join(missing)})")
+            continue
+        if reference is None:
+            reference = r
+        elif set(r["columns"]) != set(reference["columns"]):
+            extra = sorted(set(r["columns"]) - set(reference["columns"]))
+            absent = sorted(set(reference["columns"]) - set(r["columns"]))
+            print(f" Fichier rejeté : {r['path']} (colonnes différentes de {reference['path']} : "
+                  f"en plus {extra or '-'}, absentes {absent or '-'})")
+            continue
+        accepted.append(r)
+    return accepted
+
+
+def print_throughput(reports, seconds):
+    """
+    Lignes par fichier et débit de la lecture + normalisation (stage_csv)
+    La lecture est unique pour tous les fichiers : le débit est celui du lot
+    """
+    print("\n Fichiers chargés :")
+    for r in reports:
+        print(f"  {r['path']} : {r['rows']} lignes, {r['size'] / 1e6:.2f} Mo")
+    nb_rows = sum(r["rows"] for r in reports)
+    total_mb = sum(r["size"] for r in reports) / 1e6
+    print(f"  Lecture + normalisation : {nb_rows} lignes en {seconds:.2f}s "
+          f"({nb_rows / seconds:,.0f} lignes/s, {total_mb / seconds:.1f} Mo/s)")
+
+
+# ---------------------------
+# Export Parquet
+# ---------------------------
+def export_parquet(con, table_name, out_dir=PARQUET_DIR):
+    """
+    Exporte `table_name` en Parquet partitionné (hive), compressé zstd,
+    avec statistiques min/max par row group ; les rollups et le catalogue sont
+    exportés en un fichier chacun. Écrit `_export.json` (sert de version aux caches de l'app).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    derived = PARQUET_DERIVED_COLUMNS.get(table_name, {})
+    extra = "".join(f", {expr} AS {name}" for name, expr in derived.items())
+    partitions = ", ".join(PARQUET_PARTITIONS.get(table_name, []))
+    partition_opt = f"PARTITION_BY ({partitions}), OVERWRITE_OR_IGNORE, " if partitions else ""
+    target = os.path.join(out_dir, table_name if partitions else f"{table_name}.parquet")
+
+    if partitions and os.path.isdir(target):
+        # Les partitions d'un ancien export (stores / années disparus) ne doivent pas rester
+        shutil.rmtree(target)
+
+    start = time.perf_counter()
+    con.execute(f"""
+        COPY (SELECT *{extra} FROM {table_name}{order_by(table_name)})
+        TO '{target}'
+        ({partition_opt}FORMAT PARQUET, COMPRESSION ZSTD, ROW_GROUP_SIZE {PARQUET_ROW_GROUP_SIZE})
+    """)
+
+    # Rollups et catalogue (toutes tables) : un fichier chacun
+    for small_table in [*ROLLUPS.get(table_name, {}), CATALOG_VALUES_TABLE, CATALOG_COLUMNS_TABLE]:
+        if not table_exists(con, small_table):
+            continue
+        con.execute(f"""
+            COPY {small_table} TO '{os.path.join(out_dir, small_table + ".parquet")}'
+            (FORMAT PARQUET, COMPRESSION ZSTD)
+        """)
+
+    marker = os.path.join(out_dir, "_export.json")
+    exports = {}
+    if os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            exports = json.load(f)
+    exports[table_name] = {
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rows": con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0],
+        "partitions": PARQUET_PARTITIONS.get(table_name, []),
+    }
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(exports, f, indent=2)
+
+    nb_files = len(glob.glob(os.path.join(target, "**", "*.parquet"), recursive=True)) if partitions else 1
+    print(f" Export Parquet de '{table_name}' -> {target} ({nb_files} fichiers, "
+          f"{time.perf_counter() - start:.2f}s)")
+
+
+# ---------------------------
+# Chargement
+# ---------------------------
+def _types_option(table_name):
+    # Les colonnes à normaliser sont lues en texte brut, le typage se fait ensuite
+    raw_types = {col: "VARCHAR" for col in NUMERIC_TEXT_COLUMNS.get(table_name, [])}
+    raw_types.update({col: "VARCHAR" for col in DATE_COLUMNS.get(table_name, {})})
+    return f", types={raw_types}" if raw_types else ""
+
+
+def stage_csv(con, csv_paths, table_name):
+    """
+    Lit et normalise les CSV dans la table temporaire `_new` (une seule lecture)
+    Lecture multi-fichiers DuckDB : colonnes alignées par nom ; le fichier
+    d'origine sert à compter les lignes de chaque fichier (manifest), il n'est
+    pas gardé dans la table
+
+    Returns:
+        Dict chemin -> nombre de lignes lues
+    """
+    file_list = "[" + ", ".join(f"'{path}'" for path in csv_paths) + "]"
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP VIEW _raw AS
+        SELECT * FROM read_csv_auto({file_list}, union_by_name=true,
+                                    filename='{SOURCE_FILE_COLUMN}'{_types_option(table_name)})
+    """)
 
     con.execute(f"""
-        CREATE OR REPLACE TABLE {table_name} AS
-        SELECT * FROM read_csv_auto('{csv_path}')
+        CREATE OR REPLACE TEMP TABLE _new AS
+        {normalize_schema(con, table_name)}
     """)
+    rows = dict(con.execute(
+        f"SELECT {SOURCE_FILE_COLUMN}, COUNT(*) FROM _new GROUP BY {SOURCE_FILE_COLUMN}"
+    ).fetchall())
+    con.execute(f"ALTER TABLE _new DROP COLUMN {SOURCE_FILE_COLUMN}")
+    return {path: rows.get(path, 0) for path in csv_paths}
+
+
+def dedupe_staged(con, keys):
+    """
+    Une seule ligne par clé dans `_new` : la dernière lue (ordre des fichiers
+    puis des lignes), comme si les lignes étaient appliquées l'une après l'autre
+    Les clés NULL forment une seule clé, comme dans _join_on
+    """
+    nb_dropped = con.execute(f"""
+        DELETE FROM _new WHERE rowid IN (
+            SELECT rowid FROM _new
+            QUALIFY row_number() OVER (PARTITION BY {', '.join(keys)} ORDER BY rowid DESC) > 1
+        )
+    """).fetchone()[0]
+    if nb_dropped:
+        print(f" {nb_dropped} lignes en double (même clé {', '.join(keys)}) ignorées, dernière version gardée")
+
+
+def merge_rows(con, table_name, mode):
+    """
+    Fusionne `_new` dans la table selon sa clé (KEY_COLUMNS)
+    - append : n'insère que les clés absentes
+    - upsert : remplace les lignes des clés déjà présentes
+    Une clé présente plusieurs fois dans le lot n'est fusionnée qu'une fois (dedupe_staged)
+    Retourne le nombre de lignes insérées (tables temporaires `_inserted` / `_replaced`)
+    """
+    keys = KEY_COLUMNS[table_name]
+    on = _join_on(table_name, "_new", keys)
+    dedupe_staged(con, keys)
+
+    if mode == "upsert":
+        con.execute(f"CREATE OR REPLACE TEMP TABLE _replaced AS SELECT * FROM {table_name} SEMI JOIN _new ON {on}")
+        con.execute(f"DELETE FROM {table_name} USING _new WHERE {on}")
+        con.execute("CREATE OR REPLACE TEMP TABLE _inserted AS SELECT * FROM _new")
+    else:
+        con.execute("CREATE OR REPLACE TEMP TABLE _replaced AS SELECT * FROM _new LIMIT 0")
+        con.execute(f"CREATE OR REPLACE TEMP TABLE _inserted AS SELECT * FROM _new ANTI JOIN {table_name} ON {on}")
+
+    # Chaque lot est inséré trié : les nouvelles semaines restent groupées en fin de table
+    con.execute(f"INSERT INTO {table_name} BY NAME SELECT * FROM _inserted{order_by(table_name)}")
+
+    nb_inserted = con.execute("SELECT COUNT(*) FROM _inserted").fetchone()[0]
+    nb_replaced = con.execute("SELECT COUNT(*) FROM _replaced").fetchone()[0]
+    print(f" {nb_inserted} lignes insérées dont {nb_replaced} remplacées ({mode})")
+
+    if nb_inserted:
+        update_rollups(con, table_name)
+    return nb_inserted
+
+
+def table_exists(con, table_name):
+    return con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [table_name]
+    ).fetchone()[0] > 0
+
+
+def load_csv(csv_path, table_name, mode="replace", workers=DEFAULT_WORKERS, parquet=False, db_path=DB_PATH,
+             index=False):
+    """
+    Charge un ou plusieurs CSV dans `table_name`
+    - csv_path : fichier, glob, dossier ou liste de ceux-ci
+    - replace (défaut) : recrée la table et ses rollups
+    - append / upsert : ajoute les nouvelles lignes (clé KEY_COLUMNS) et met
+      à jour les rollups de façon incrémentale ; un fichier déjà ingéré
+      (même hash) est ignoré
+    - workers : taille du pool de validation des fichiers
+    - parquet : exporte ensuite la table en Parquet partitionné (PARQUET_DIR)
+    - db_path : base cible (data/project.db par défaut)
+    - index : crée un index ART sur la clé (KEY_COLUMNS)
+    La table est écrite triée selon SORT_COLUMNS (zone maps des filtres date / store)
+    et le catalogue des dimensions est recalculé (refresh_catalog) ou, en append / upsert,
+    mis à jour à partir des seules lignes du lot (update_catalog)
+    """
+    files = resolve_sources(csv_path)
+    missing = [path for path in files if not os.path.exists(path)]
+    for path in missing:
+        print(f" Fichier introuvable : {path}")
+    files = [path for path in files if path not in missing]
+    if not files:
+        return
+
+    reports = check_columns(validate_files(files, table_name, workers), table_name)
+    if not reports:
+        return
+
+    con = duckdb.connect(db_path)
+    ensure_manifest(con)
+
+    if mode != "replace":
+        for r in reports:
+            if already_ingested(con, table_name, r["hash"]):
+                print(f"\n {r['path']} déjà ingéré dans '{table_name}' (hash identique), ignoré")
+        reports = [r for r in reports if not already_ingested(con, table_name, r["hash"])]
+        if not reports:
+            con.close()
+            return
+
+    print(f"\n Chargement de {len(reports)} fichier(s) dans la table '{table_name}' ({mode}) ...")
+
+    start = time.perf_counter()
+    rows_by_file = stage_csv(con, [r["path"] for r in reports], table_name)
+    stage_seconds = max(time.perf_counter() - start, 1e-9)
+    for r in reports:
+        r["rows"] = rows_by_file[r["path"]]
+    nb_new = sum(rows_by_file.values())
+
+    if mode == "replace" or not table_exists(con, table_name):
+        con.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM _new{order_by(table_name)}")
+        con.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = ?", [table_name])
+        build_rollups(con, table_name)
+        refresh_catalog(con, table_name)
+    else:
+        # Colonne ajoutée par les anciennes versions du loader : l'origine est dans le manifest
+        con.execute(f"ALTER TABLE {table_name} DROP COLUMN IF EXISTS {SOURCE_FILE_COLUMN}")
+        if merge_rows(con, table_name, mode):
+            update_catalog(con, table_name)
+    if index:
+        create_key_index(con, table_name)
+
+    for r in reports:
+        record_ingest(con, table_name, r["path"], r["hash"], r["rows"], mode)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    print_throughput(reports, stage_seconds)
+    total_mb = sum(r["size"] for r in reports) / 1e6
+    print(f"\n Total : {nb_new} lignes, {total_mb:.2f} Mo chargés en {elapsed:.2f}s "
+          f"({nb_new / elapsed:,.0f} lignes/s, {total_mb / elapsed:.1f} Mo/s)")
 
     rows = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-    print(f" {rows} lignes chargées dans '{table_name}'")
+    print(f" {rows} lignes dans '{table_name}'")
 
     print(f"\n Colonnes de la table '{table_name}' :")
     print(con.execute(f"DESCRIBE {table_name}").fetchdf())
 
+    if parquet:
+        export_parquet(con, table_name)
+
     con.close()
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        sys.exit(1)
-
-    csv_file = sys.argv[1]
-    table = sys.argv[2]
+    parser = argparse.ArgumentParser(description="Chargement CSV -> DuckDB")
+    parser.add_argument("csv_files", nargs="+", help="fichiers, globs ou dossiers de CSV")
+    parser.add_argument("table")
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument("--append", dest="mode", action="store_const", const="append",
+                            help="ajoute les clés absentes (Store_Number, Date / brand, model)")
+    mode_group.add_argument("--upsert", dest="mode", action="store_const", const="upsert",
+                            help="remplace les lignes des clés déjà présentes")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="nombre de fichiers validés en parallèle")
+    parser.add_argument("--parquet", action="store_true",
+                        help=f"exporte aussi la table en Parquet partitionné dans {PARQUET_DIR}/")
+    parser.add_argument("--db", default=DB_PATH, help="base DuckDB cible")
+    parser.add_argument("--index", action="store_true",
+                        help="crée un index ART sur la clé (Store_Number, Date / brand, model)")
+    args = parser.parse_args()
 
-    load_csv(csv_file, table)
+    load_csv(args.csv_files, args.table, mode=args.mode or "replace", workers=args.workers,
+             parquet=args.parquet, db_path=args.db, index=args.index)
@@ -0,0 +1,319 @@
+"""
+Générateur de données synthétiques aux schémas walmart et ev
+
+Produit des volumes de 10k à plusieurs centaines de millions de lignes par
+blocs de taille fixe (mémoire bornée), générés en NumPy vectorisé :
+saisonnalité annuelle, pics Thanksgiving / Noël, semaines fériées
+(Super Bowl, Labor Day, Thanksgiving, Christmas) comme dans le fichier source.
+
+Formats de sortie :
+- duckdb  : table typée comme après duckdb_loader.py (+ rollups, catalogue), directement utilisable par l'app
+- parquet : fichiers typés part-00000.parquet, ... dans --out/<table>/
+- csv     : fichiers bruts fidèles aux CSV d'origine (Weekly_Sales "1,643,691",
+            dates M/D/YYYY, colonne " CPI ") à charger avec duckdb_loader.py
+
+    python sql/generate_data.py walmart --stores 2000 --weeks 520 --format duckdb --db data/synthetic.db
+    python sql/generate_data.py walmart --rows 50000000 --stores 5000 --format parquet --out data/synthetic
+    python sql/generate_data.py ev --rows 100000 --format csv --out data/synthetic
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from duckdb_loader import build_rollups, order_by, refresh_catalog
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+DEFAULT_SYNTHETIC_DB = "data/synthetic.db"
+DEFAULT_OUT_DIR = "data/synthetic"
+
+# Premier vendredi du fichier Walmart (une ligne par store et par semaine)
+WALMART_START = np.datetime64("2010-02-05")
+
+# Marques et segments du fichier EV d'origine (poids = fréquence observée)
+EV_BRANDS = [
+    "Mercedes-Benz", "Audi", "Porsche", "Volkswagen", "Ford", "BMW", "Peugeot", "Volvo",
+    "BYD", "Smart", "Kia", "Hyundai", "Opel", "Citroen", "Skoda", "MG", "NIO", "Renault",
+    "Tesla", "Zeekr", "Polestar", "XPENG", "Fiat", "Mini", "Toyota", "Lotus", "Nissan",
+    "GWM", "Genesis", "CUPRA", "DS", "Abarth", "Hongqi", "Lexus", "Maserati", "Lucid",
+]
+# segment -> (fréquence, batterie kWh moyenne, vitesse max moyenne, carrosserie)
+EV_SEGMENTS = {
+    "A - Mini": (3, 29, 127, "Hatchback"),
+    "B - Compact": (29, 40, 150, "Hatchback"),
+    "C - Medium": (34, 59, 166, "SUV"),
+    "D - Large": (28, 73, 194, "SUV"),
+    "E - Executive": (30, 86, 200, "Sedan"),
+    "F - Luxury": (51, 97, 240, "Sedan"),
+    "JA - Mini": (2, 42, 145, "SUV"),
+    "JB - Compact": (44, 54, 171, "SUV"),
+    "JC - Medium": (91, 71, 176, "SUV"),
+    "JD - Large": (58, 85, 197, "SUV"),
+    "JE - Executive": (28, 94, 210, "SUV"),
+    "JF - Luxury": (30, 101, 208, "SUV"),
+    "N - Passenger Van": (47, 60, 140, "Small Passenger Van"),
+}
+
+# Conversion vers le format brut des CSV d'origine
+RAW_SELECT = {
+    "walmart": """
+        SELECT
+          Store_Number,
+          strftime(Date, '%-m/%-d/%Y') AS Date,
+          format('{:,}', CAST(Weekly_Sales AS BIGINT)) AS Weekly_Sales,
+          Holiday_Flag,
+          Temperature,
+          Fuel_Price,
+          CPI AS " CPI ",
+          Unemployment
+        FROM chunk
+    """,
+    "ev": "SELECT * FROM chunk",
+}
+
+
+def _rng(seed, *stream):
+    # Un flux aléatoire par (seed, bloc) : même seed et même --chunk-rows => mêmes données
+    return np.random.default_rng([seed, *stream])
+
+
+# ---------------------------
+# Walmart
+# ---------------------------
+def holiday_dates(first_year, last_year):
+    """Super Bowl (1er dimanche de février), Labor Day, Thanksgiving, Noël"""
+    years = np.arange(first_year, last_year + 1).astype(str)
+    feb = (np.char.add(years, "-02-01")).astype("datetime64[D]")
+    sep = (np.char.add(years, "-09-01")).astype("datetime64[D]")
+    nov = (np.char.add(years, "-11-01")).astype("datetime64[D]")
+    dec = (np.char.add(years, "-12-25")).astype("datetime64[D]")
+    return np.sort(np.concatenate([
+        np.busday_offset(feb, 0, roll="forward", weekmask="Sun"),
+        np.busday_offset(sep, 0, roll="forward", weekmask="Mon"),
+        np.busday_offset(nov, 3, roll="forward", weekmask="Thu"),
+        dec,
+    ]))
+
+
+def walmart_calendar(weeks, seed):
+    """
+    Colonnes par semaine : date (vendredi), semaine fériée, facteur saisonnier,
+    prix du carburant
+    """
+    dates = WALMART_START + 7 * np.arange(weeks)
+    years = dates.astype("datetime64[Y]").astype(int) + 1970
+    holidays = holiday_dates(years[0], years[-1] + 1)
+
+    # Semaine samedi -> vendredi contenant un jour férié (comme Holiday_Flag du fichier source)
+    idx = np.searchsorted(holidays, dates - 6)
+    holiday_flag = (holidays[np.minimum(idx, len(holidays) - 1)] <= dates).astype(np.int64)
+
+    month = dates.astype("datetime64[M]").astype(int) % 12 + 1
+    day = (dates - dates.astype("datetime64[M]")).astype(int) + 1
+    day_of_year = (dates - dates.astype("datetime64[Y]")).astype(int)
+
+    season = 1 + 0.04 * np.sin(2 * np.pi * (day_of_year - 150) / 365.25)
+    season = np.where((holiday_flag == 1) & (month == 11), season * 1.35, season)   # Thanksgiving
+    season = np.where((month == 12) & (day >= 10) & (day <= 17), season * 1.25, season)
+    season = np.where((month == 12) & (day >= 18) & (day <= 24), season * 1.55, season)
+    season = np.where((holiday_flag == 1) & (month == 12), season * 0.85, season)   # semaine de Noël
+    season = np.where((holiday_flag == 1) & (month < 11), season * 1.05, season)
+
+    rng = _rng(seed, 0)
+    fuel = np.clip(2.6 + np.cumsum(rng.normal(0.004, 0.04, weeks)), 2.4, 4.5)
+
+    return {
+        "Date": dates,
+        "Holiday_Flag": holiday_flag,
+        "season": season,
+        "day_of_year": day_of_year,
+        "fuel": fuel,
+    }
+
+
+def walmart_stores(n_stores, seed):
+    """Paramètres par store : niveau de ventes, croissance, climat, CPI, chômage"""
+    rng = _rng(seed, 1)
+    sigma = 0.55
+    return {
+        "base_sales": np.clip(rng.lognormal(np.log(1.0e6) - sigma ** 2 / 2, sigma, n_stores), 1.5e5, 4.0e6),
+        "growth": rng.normal(0.01, 0.03, n_stores),
+        "temp_mean": rng.normal(58, 10, n_stores),
+        "temp_amplitude": rng.uniform(10, 25, n_stores),
+        "fuel_offset": rng.normal(0, 0.15, n_stores),
+        "cpi_base": np.where(rng.random(n_stores) < 0.6, rng.normal(212, 6, n_stores),
+                             rng.normal(128, 3, n_stores)),
+        "unemployment_base": rng.uniform(4, 14, n_stores),
+    }
+
+
+def walmart_chunk(calendar, stores, start, stop, seed, chunk_index):
+    """
+    Lignes [start, stop) : ligne i = semaine i // stores, store i % stores
+    (déjà dans l'ordre physique du loader, Date puis Store_Number)
+    """
+    n_stores = len(stores["base_sales"])
+    rows = np.arange(start, stop)
+    w = rows // n_stores
+    s = rows % n_stores
+    n = len(rows)
+    rng = _rng(seed, 2, chunk_index)
+
+    years_elapsed = w / 52.0
+    sales = (stores["base_sales"][s] * calendar["season"][w]
+             * (1 + stores["growth"][s]) ** years_elapsed
+             * rng.lognormal(0, 0.06, n))
+    temperature = (stores["temp_mean"][s]
+                   - stores["temp_amplitude"][s] * np.cos(2 * np.pi * (calendar["day_of_year"][w] - 15) / 365.25)
+                   + rng.normal(0, 4, n))
+    unemployment = np.clip(stores["unemployment_base"][s] * (1 - 0.0012 * w) + rng.normal(0, 0.05, n), 3, None)
+
+    return pa.table({
+        "Store_Number": s + 1,
+        "Date": calendar["Date"][w],
+        "Weekly_Sales": np.round(sales),
+        "Holiday_Flag": calendar["Holiday_Flag"][w],
+        "Temperature": np.round(np.clip(temperature, -10, 105), 2),
+        "Fuel_Price": np.round(calendar["fuel"][w] + stores["fuel_offset"][s], 3),
+        "CPI": np.round(stores["cpi_base"][s] * (1 + 0.0004 * w)).astype(np.int64),
+        "Unemployment": np.round(unemployment, 3),
+    })
+
+
+# ---------------------------
+# EV
+# ---------------------------
+def ev_chunk(start, stop, seed, chunk_index):
+    """Modèles [start, stop) ; (brand, model) est unique"""
+    rng = _rng(seed, 3, chunk_index)
+    n = stop - start
+    ids = np.arange(start, stop)
+
+    names = list(EV_SEGMENTS)
+    params = np.array([EV_SEGMENTS[name][:3] for name in names], dtype=float)
+    seg = rng.choice(len(names), n, p=params[:, 0] / params[:, 0].sum())
+    brand = np.array(EV_BRANDS)[rng.integers(0, len(EV_BRANDS), n)]
+    model = np.char.add("Model ", ids.astype(str))
+
+    battery = np.round(np.clip(rng.normal(params[seg, 1], params[seg, 1] * 0.12), 20, 130), 1)
+    efficiency = np.clip(rng.normal(165, 22, n), 110, 280).astype(np.int64)
+    top_speed = np.clip(rng.normal(params[seg, 2], 15), 120, 330).astype(np.int64)
+    drivetrain = np.array(["FWD", "RWD", "AWD"])[rng.choice(3, n, p=[0.33, 0.27, 0.40])]
+    torque = np.clip(rng.normal(180 + 4.5 * top_speed - 600 + (drivetrain == "AWD") * 250, 80), 150, 1200)
+
+    return pa.table({
+        "brand": brand,
+        "model": model,
+        "top_speed_kmh": top_speed,
+        "battery_capacity_kWh": battery,
+        "battery_type": np.full(n, "Lithium-ion"),
+        "number_of_cells": (np.round(battery * rng.uniform(2.5, 4.5, n) / 12) * 12).astype(np.int64),
+        "torque_nm": torque.astype(np.int64),
+        "efficiency_wh_per_km": efficiency,
+        "range_km": (battery * 1000 / efficiency * rng.uniform(0.88, 0.98, n)).astype(np.int64),
+        "acceleration_0_100_s": np.round(np.clip(rng.normal(15 - top_speed / 30, 1.0), 2.0, 14.0), 1),
+        "fast_charging_power_kw_dc": np.clip(rng.normal(battery * 1.8, 25), 30, 350).astype(np.int64),
+        "fast_charge_port": np.where(rng.random(n) < 0.995, "CCS", "CHAdeMO"),
+        "towing_capacity_kg": (np.round(rng.uniform(0, 2500, n) / 100) * 100).astype(np.int64),
+        "cargo_volume_l": rng.integers(180, 700, n).astype(str),
+        "seats": rng.choice([4, 5, 7], n, p=[0.1, 0.8, 0.1]).astype(np.int64),
+        "drivetrain": drivetrain,
+        "segment": np.array(names)[seg],
+        "length_mm": rng.normal(4500, 300, n).astype(np.int64),
+        "width_mm": rng.normal(1880, 60, n).astype(np.int64),
+        "height_mm": rng.normal(1580, 90, n).astype(np.int64),
+        "car_body_type": np.array([EV_SEGMENTS[name][3] for name in names])[seg],
+        "source_url": np.char.add("https://ev-database.org/car/synthetic/", ids.astype(str)),
+    })
+
+
+# ---------------------------
+# Écriture par blocs
+# ---------------------------
+def chunk_ranges(total_rows, chunk_rows):
+    for index, start in enumerate(range(0, total_rows, chunk_rows)):
+        yield index, start, min(start + chunk_rows, total_rows)
+
+
+def generate(table_name, rows=None, stores=45, weeks=143, fmt="duckdb", db_path=DEFAULT_SYNTHETIC_DB,
+             out_dir=DEFAULT_OUT_DIR, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42):
+    """
+    Génère `table_name` par blocs de `chunk_rows` lignes
+    - walmart : stores x weeks lignes (--rows fixe le nombre de semaines)
+    - ev : `rows` modèles
+    """
+    if table_name == "walmart":
+        if rows is not None:
+            weeks = max(1, -(-rows // stores))
+        total_rows = stores * weeks
+        calendar = walmart_calendar(weeks, seed)
+        store_params = walmart_stores(stores, seed)
+        make_chunk = lambda i, a, b: walmart_chunk(calendar, store_params, a, b, seed, i)
+    elif table_name == "ev":
+        total_rows = rows or 478
+        make_chunk = lambda i, a, b: ev_chunk(a, b, seed, i)
+    else:
+        raise ValueError(f"Table inconnue : {table_name} (walmart ou ev)")
+
+    if fmt == "duckdb":
+        con = duckdb.connect(db_path)
+        con.execute(f"DROP TABLE IF EXISTS {table_name}")
+    else:
+        con = duckdb.connect()
+        os.makedirs(os.path.join(out_dir, table_name), exist_ok=True)
+        # Les blocs d'une génération précédente (plus nombreux, autre format) ne doivent pas rester
+        for path in glob.glob(os.path.join(out_dir, table_name, "part-*")):
+            os.remove(path)
+
+    print(f"\n Génération de {total_rows:,} lignes '{table_name}' ({fmt}, blocs de {chunk_rows:,}) ...")
+    start_time = time.perf_counter()
+    for index, start, stop in chunk_ranges(total_rows, chunk_rows):
+        chunk = make_chunk(index, start, stop)
+        con.register("chunk", chunk)
+        if fmt == "duckdb":
+            if index == 0:
+                con.execute(f"CREATE TABLE {table_name} AS SELECT * FROM chunk")
+            else:
+                con.execute(f"INSERT INTO {table_name} SELECT * FROM chunk")
+        else:
+            target = os.path.join(out_dir, table_name, f"part-{index:05d}.{fmt}")
+            select = RAW_SELECT[table_name] if fmt == "csv" else "SELECT * FROM chunk"
+            options = "FORMAT CSV, HEADER" if fmt == "csv" else "FORMAT PARQUET, COMPRESSION ZSTD"
+            con.execute(f"COPY ({select}) TO '{target}' ({options})")
+        con.unregister("chunk")
+        elapsed = max(time.perf_counter() - start_time, 1e-9)
+        print(f"  bloc {index}: {stop:,}/{total_rows:,} lignes ({stop / elapsed:,.0f} lignes/s)")
+
+    if fmt == "duckdb":
+        if table_name == "ev":
+            # Blocs générés dans l'ordre des ids : tri final selon l'ordre du loader
+            con.execute(f"CREATE OR REPLACE TABLE ev AS SELECT * FROM ev{order_by('ev')}")
+        build_rollups(con, table_name)
+        refresh_catalog(con, table_name)
+    con.close()
+
+    elapsed = time.perf_counter() - start_time
+    target = db_path if fmt == "duckdb" else os.path.join(out_dir, table_name)
+    print(f" {total_rows:,} lignes écrites dans {target} en {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Données synthétiques walmart / ev")
+    parser.add_argument("table", choices=["walmart", "ev"])
+    parser.add_argument("--rows", type=int, help="nombre de lignes (walmart : arrondi à stores x semaines)")
+    parser.add_argument("--stores", type=int, default=45, help="nombre de stores (walmart)")
+    parser.add_argument("--weeks", type=int, default=143, help="nombre de semaines (walmart, ignoré avec --rows)")
+    parser.add_argument("--format", dest="fmt", choices=["duckdb", "parquet", "csv"], default="duckdb")
+    parser.add_argument("--db", default=DEFAULT_SYNTHETIC_DB, help="base cible (format duckdb)")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="dossier cible (formats parquet / csv)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="lignes par bloc")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generate(args.table, rows=args.rows, stores=args.stores, weeks=args.weeks, fmt=args.fmt,
+             db_path=args.db, out_dir=args.out, chunk_rows=args.chunk_rows, seed=args.seed)
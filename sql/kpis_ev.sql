@@ -1,38 +1,107 @@
 -- EV KPI (table: ev)
+-- Registre des KPI : voir l'en-tête de kpis_walmart.sql (name / filters / params)
 
 -- KPI 1 : Nombre de modèles par marque
+-- name: models_by_brand
+-- filters: brand, segment
 SELECT
   brand,
   COUNT(*) AS nb_models
 FROM ev
 WHERE brand IS NOT NULL
+  AND {where}
 GROUP BY brand
 ORDER BY nb_models DESC;
 
 -- KPI 2 : Autonomie moyenne par marque
+-- name: range_by_brand
+-- filters: brand, segment
 SELECT
   brand,
-  AVG(range_km) AS avg_range_km
+  AVG(range_km) AS avg_range_km,
+  COUNT(*) AS nb_models
 FROM ev
 WHERE brand IS NOT NULL AND range_km IS NOT NULL
+  AND {where}
 GROUP BY brand
 ORDER BY avg_range_km DESC;
 
 -- KPI 3 : Batterie moyenne (kWh) par segment
+-- name: battery_by_segment
+-- filters: brand, segment
 SELECT
   segment,
   AVG(battery_capacity_kWh) AS avg_battery_kWh
 FROM ev
 WHERE segment IS NOT NULL AND battery_capacity_kWh IS NOT NULL
+  AND {where}
 GROUP BY segment
 ORDER BY avg_battery_kWh DESC;
 
--- KPI 4 : Top 10 autonomies (marque + modèle)
+-- KPI 4 : Top n autonomies (marque + modèle)
+-- name: top_range
+-- filters: brand, segment
+-- params: n
 SELECT
   brand,
   model,
-  range_km
+  range_km,
+  segment
 FROM ev
 WHERE range_km IS NOT NULL
+  AND {where}
 ORDER BY range_km DESC
-LIMIT 10;
+LIMIT ?;
+
+-- KPI 5 : Cartes KPI (nombre de modèles, autonomie, batterie et vitesse moyennes)
+-- name: summary
+-- filters: brand, segment
+SELECT
+  COUNT(*) AS nb_models,
+  AVG(range_km) AS avg_range,
+  AVG(battery_capacity_kWh) AS avg_batt,
+  AVG(top_speed_kmh) AS avg_speed
+FROM ev
+WHERE {where};
+
+-- KPI 6 : Nombre de modèles, autonomie et batterie moyennes par segment
+-- name: segments
+-- filters: brand, segment
+SELECT
+  segment,
+  COUNT(*) AS nb_models,
+  AVG(range_km) AS avg_range,
+  AVG(battery_capacity_kWh) AS avg_battery
+FROM ev
+WHERE segment IS NOT NULL
+  AND {where}
+GROUP BY segment
+ORDER BY nb_models DESC;
+
+-- KPI 7 : Autonomie / batterie / vitesse de chaque modèle (nuage de points)
+-- name: range_vs_battery
+-- filters: brand, segment
+SELECT brand, model, range_km, battery_capacity_kWh, top_speed_kmh, segment
+FROM ev
+WHERE range_km IS NOT NULL
+  AND battery_capacity_kWh IS NOT NULL
+  AND {where};
+
+-- KPI 8 : Toutes les caractéristiques (comparateur)
+-- name: features
+-- filters: brand, segment
+SELECT
+  brand, model, top_speed_kmh, battery_capacity_kWh,
+  torque_nm, efficiency_wh_per_km, range_km, acceleration_0_100_s,
+  fast_charging_power_kw_dc, towing_capacity_kg, cargo_volume_l,
+  seats, segment, length_mm, width_mm, height_mm
+FROM ev
+WHERE {where};
+
+-- KPI 9 : Aperçu des données
+-- name: preview
+-- filters: brand, segment
+SELECT brand, model, segment, range_km, battery_capacity_kWh, top_speed_kmh, drivetrain, seats
+FROM ev
+WHERE {where}
+LIMIT 50;
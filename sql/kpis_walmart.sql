@@ -1,39 +1,74 @@
-
 -- Walmart KPI
--- Weekly_Sales est VARCHAR, on le convertit en DOUBLE
--- On enlève au passage d'éventuelles virgules
--- Remplace() ne gêne pas si y'a pas de virgules.
+-- Weekly_Sales est converti en DOUBLE au chargement (sql/duckdb_loader.py)
+-- => plus besoin de CAST(REPLACE(...)) dans les requêtes
+--
+-- Registre des KPI (APP/kpi_registry.py) : chaque requête est précédée de
+--   -- name: <nom>              exécutée sous le nom « walmart.<nom> »
+--   -- filters: <colonnes>      dimensions filtrables : {where} reçoit le WHERE compilé (filters.py)
+--   -- params: <noms>           paramètres « ? » supplémentaires, après ceux du filtre
 
 -- KPI 1 : Total des ventes
+-- name: total_sales
+-- filters: Store_Number, Holiday_Flag, Date
 SELECT
-  SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales
+  SUM(Weekly_Sales) AS total_sales
 FROM walmart
-WHERE Weekly_Sales IS NOT NULL;
+WHERE Weekly_Sales IS NOT NULL
+  AND {where};
 
 -- KPI 2 : Ventes par magasin (Store_Number)
+-- name: sales_by_store
+-- filters: Store_Number, Holiday_Flag, Date
 SELECT
   Store_Number,
-  SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales
+  SUM(Weekly_Sales) AS total_sales
 FROM walmart
 WHERE Weekly_Sales IS NOT NULL
+  AND {where}
 GROUP BY Store_Number
 ORDER BY total_sales DESC;
 
 -- KPI 3 : Ventes jour férié vs non férié
+-- name: sales_by_holiday
+-- filters: Store_Number, Holiday_Flag, Date
 SELECT
   Holiday_Flag,
-  SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales,
-  AVG(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS avg_weekly_sales
+  SUM(Weekly_Sales) AS total_sales,
+  AVG(Weekly_Sales) AS avg_weekly_sales
 FROM walmart
 WHERE Weekly_Sales IS NOT NULL
+  AND {where}
 GROUP BY Holiday_Flag
 ORDER BY Holiday_Flag;
 
 -- KPI 4 : Évolution des ventes dans le temps (par date)
+-- name: sales_by_date
+-- filters: Store_Number, Holiday_Flag, Date
 SELECT
   Date,
-  SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales
+  SUM(Weekly_Sales) AS total_sales
 FROM walmart
 WHERE Weekly_Sales IS NOT NULL
+  AND {where}
 GROUP BY Date
 ORDER BY Date;
+
+-- KPI 5 : Ventes hebdomadaires de chaque store (courbes par store, lignes brutes)
+-- Trié par store : chaque courbe est une tranche contiguë des colonnes Arrow
+-- name: weekly_sales
+-- filters: Store_Number, Holiday_Flag, Date
+SELECT
+  Date,
+  Store_Number,
+  Weekly_Sales AS sales
+FROM walmart
+WHERE {where}
+ORDER BY Store_Number, Date;
+
+-- KPI 6 : Aperçu des données
+-- name: preview
+-- filters: Store_Number, Holiday_Flag, Date
+SELECT Store_Number, Date, Weekly_Sales, Holiday_Flag, Temperature, Fuel_Price, CPI, Unemployment
+FROM walmart
+WHERE {where}
+LIMIT 50;
@@ -0,0 +1,85 @@
+"""
+Diagnostic des zone maps : combien de row groups un filtre permet d'ignorer
+
+DuckDB garde le min / max de chaque colonne par row group (122 880 lignes) et
+saute les row groups dont l'intervalle ne croise pas le filtre. Le gain dépend
+de l'ordre physique de la table (SORT_COLUMNS de duckdb_loader.py) :
+- lus : row groups réellement parcourus (profiling, lignes lues)
+- utiles : row groups contenant au moins une ligne du filtre (minimum possible)
+
+    python sql/row_groups.py walmart "Date BETWEEN '2012-03-01' AND '2012-03-31'"
+    python sql/row_groups.py walmart "Store_Number = 12" --db data/synthetic.db
+    python sql/row_groups.py ev "segment = 'D - Large'"
+"""
+
+import argparse
+import json
+import math
+
+import duckdb
+
+from duckdb_loader import DB_PATH, ROW_GROUP_SIZE, SORT_COLUMNS
+
+PROFILING_SETTINGS = json.dumps({"CUMULATIVE_ROWS_SCANNED": "true", "OPERATOR_CARDINALITY": "true"})
+
+
+def rows_scanned(con, sql, params=None):
+    """Lignes lues par `sql` après élagage par les zone maps (profiling DuckDB)"""
+    con.execute("PRAGMA enable_profiling = 'no_output'")
+    con.execute(f"PRAGMA custom_profiling_settings = '{PROFILING_SETTINGS}'")
+    try:
+        con.execute(sql, params or []).fetchall()
+        profile = json.loads(con.get_profiling_information())
+    finally:
+        con.execute("PRAGMA disable_profiling")
+    return int(profile.get("cumulative_rows_scanned", 0))
+
+
+def row_group_report(con, table_name, where="TRUE", params=None):
+    """
+    Row groups de `table_name` lus / ignorés pour le filtre `where`
+
+    Retourne un dict : row_groups, lus, ignorés, utiles, lignes, lignes du filtre, lignes lues
+    """
+    row_groups = con.execute(
+        "SELECT COUNT(DISTINCT row_group_id) FROM pragma_storage_info(?)", [table_name]
+    ).fetchone()[0]
+    total_rows = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    matching, useful = con.execute(f"""
+        SELECT COUNT(*), COUNT(DISTINCT rowid // {ROW_GROUP_SIZE})
+        FROM {table_name} WHERE {where}
+    """, params or []).fetchone()
+    scanned = rows_scanned(con, f"SELECT COUNT(rowid) FROM {table_name} WHERE {where}", params)
+    read = min(row_groups, math.ceil(scanned / ROW_GROUP_SIZE))
+    return {
+        "row_groups": row_groups,
+        "row_groups_read": read,
+        "row_groups_skipped": row_groups - read,
+        "row_groups_useful": useful,
+        "rows": total_rows,
+        "rows_matching": matching,
+        "rows_scanned": scanned,
+    }
+
+
+def print_report(table_name, where, report):
+    total = max(report["row_groups"], 1)
+    print(f"\n '{table_name}' WHERE {where}")
+    print(f" Ordre physique : {', '.join(SORT_COLUMNS.get(table_name, [])) or 'aucun'}")
+    print(f" Row groups : {report['row_groups']} "
+          f"| lus {report['row_groups_read']} | ignorés {report['row_groups_skipped']} "
+          f"({report['row_groups_skipped'] / total:.1%}) | utiles {report['row_groups_useful']}")
+    print(f" Lignes : {report['rows']:,} | du filtre {report['rows_matching']:,} "
+          f"| lues {report['rows_scanned']:,} ({report['rows_scanned'] / max(report['rows'], 1):.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Row groups ignorés par un filtre (zone maps)")
+    parser.add_argument("table")
+    parser.add_argument("where", nargs="?", default="TRUE", help="prédicat SQL (ex. \"Store_Number = 12\")")
+    parser.add_argument("--db", default=DB_PATH, help="base DuckDB")
+    args = parser.parse_args()
+
+    con = duckdb.connect(args.db, read_only=True)
+    print_report(args.table, args.where, row_group_report(con, args.table, args.where))
+    con.close()
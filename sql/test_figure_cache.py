@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "APP"))
+from figure_cache import fingerprint  # noqa: E402
+
+errors = []
+
+
+def check(label, ok):
+    print(f" {'ok ' if ok else 'ERREUR'} {label}")
+    if not ok:
+        errors.append(label)
+
+
+print("\n--- EMPREINTES DES DONNÉES (APP/figure_cache.py) ---")
+table = pa.table({
+    "store": list(range(20)),
+    "label": [f"s{i}" for i in range(20)],
+    "sales": [float(i) if i % 3 else None for i in range(20)],
+})
+first, second, both = table.slice(0, 10), table.slice(10, 10), table.slice(0, 20)
+check("deux tranches d'une même table => empreintes différentes",
+      fingerprint(first) != fingerprint(second))
+check("tranche plus courte => empreinte différente", fingerprint(first) != fingerprint(both))
+compact = pa.table({name: pa.concat_arrays(second[name].chunks) for name in second.column_names})
+check("tranche et copie compacte => même empreinte", fingerprint(second) == fingerprint(compact))
+
+df = table.to_pandas()
+check("DataFrames différents => empreintes différentes",
+      fingerprint(df.iloc[:10]) != fingerprint(df.iloc[10:]))
+check("options différentes => empreintes différentes",
+      fingerprint(df, {"x": "store"}) != fingerprint(df, {"x": "label"}))
+check("mêmes données et options => même empreinte",
+      fingerprint(df.copy(), {"x": "store"}) == fingerprint(pd.DataFrame(df), {"x": "store"}))
+
+print(f"\n Tests terminés, {len(errors)} erreur(s)")
+if errors:
+    sys.exit(1)
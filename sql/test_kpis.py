@@ -1,23 +1,32 @@
+import os
+import sys
+
 import duckdb
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "APP"))
+from kpi_registry import load_registry, run_kpi, validate_registry  # noqa: E402
+
 con = duckdb.connect("data/project.db")
+run_query = lambda sql, params: con.execute(sql, params).fetchdf()
+
+print("\n--- VALIDATION DU REGISTRE (sql/kpis_*.sql) ---")
+errors = validate_registry(con)
+for error in errors:
+    print(" ", error)
+print(f" {len(load_registry())} KPI, {len(errors)} erreur(s)")
 
 print("\n--- TEST KPI WALMART: total_sales ---")
-print(con.execute("""
-    SELECT SUM(CAST(REPLACE(Weekly_Sales, ',', '') AS DOUBLE)) AS total_sales
-    FROM walmart
-    WHERE Weekly_Sales IS NOT NULL;
-""").fetchall())
+print(run_kpi(run_query, "walmart.total_sales").values.tolist())
 
 print("\n--- TEST KPI EV: top 5 range ---")
-print(con.execute("""
-    SELECT brand, model, range_km
-    FROM ev
-    WHERE range_km IS NOT NULL
-    ORDER BY range_km DESC
-    LIMIT 5;
-""").fetchall())
+print(run_kpi(run_query, "ev.top_range", args=[5])[["brand", "model", "range_km"]].values.tolist())
+
+print("\n--- TOUS LES KPI (sans filtre) ---")
+for name, kpi in load_registry().items():
+    df = run_kpi(run_query, name, args=[5] * len(kpi["params"]))
+    print(f" {name:<28} {len(df):>6} ligne(s)  {kpi['title']}")
 
 con.close()
 print("\n Tests terminés")
-
+if errors:
+    sys.exit(1)